@@ -7,13 +7,31 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
+from models import db
+from services.alert_counters import alert_counters
+from services.archive import reading_archive
+from services.cold_storage import cold_readings
+from services.compression import response_compressor
+from services.hot_window import hot_window
+from services.ingest_buffer import reading_buffer
+from services.ingest_dedup import recent_keys
+from services.json_provider import FastJSONProvider
+from services.partitions import partition_manager
+from services.rollups import rollups_cli
+from services.sensor_cache import sensor_cache
+from services.sqlite_tuning import sqlite_tuning
+
 # Initialize extensions
 migrate = Migrate()
 jwt = JWTManager()
 
 
-def create_app(config_name=None):
-    """Application factory pattern."""
+def create_app(config_name=None, **overrides):
+    """Application factory pattern.
+    
+    Keyword arguments override settings of the selected configuration
+    before extensions are initialized.
+    """
     app = Flask(__name__)
     
     # Configuration
@@ -24,16 +42,30 @@ def create_app(config_name=None):
         app.config.from_object('config.ProductionConfig')
     elif config_name == 'testing':
         app.config.from_object('config.TestingConfig')
+    elif config_name == 'edge':
+        app.config.from_object('config.EdgeConfig')
     else:
         app.config.from_object('config.DevelopmentConfig')
+    app.config.update(overrides)
     
-    # Import db from models after app config is set
-    from models import db
+    # JSON responses use orjson when it is installed
+    app.json = FastJSONProvider(app, use_orjson=app.config.get('JSON_ORJSON_ENABLED', True))
     
     # Initialize extensions with app
     db.init_app(app)
+    sqlite_tuning.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    sensor_cache.init_app(app)
+    alert_counters.init_app(app)
+    reading_buffer.init_app(app)
+    recent_keys.init_app(app)
+    partition_manager.init_app(app)
+    reading_archive.init_app(app)
+    cold_readings.init_app(app)
+    app.cli.add_command(rollups_cli)
+    hot_window.init_app(app)
+    response_compressor.init_app(app)
     
     # Setup logging
     setup_logging(app)
@@ -52,6 +84,16 @@ def create_app(config_name=None):
     with app.app_context():
         db.create_all()
         app.logger.info("Database tables created successfully")
+        
+        try:
+            partition_manager.maintain()
+        except Exception as e:
+            app.logger.warning(f"Reading partition maintenance failed: {str(e)}")
+        
+        try:
+            hot_window.warm()
+        except Exception as e:
+            app.logger.warning(f"Hot window warm-up failed: {str(e)}")
     
     # Setup error handlers
     setup_error_handlers(app)
@@ -68,6 +110,8 @@ def register_blueprints(app):
     from routes.alerts import alerts_bp
     from routes.auth import auth_bp
     from routes.reports import reports_bp
+    from routes.devices import devices_bp
+    from routes.dashboard import dashboard_bp
     
     app.register_blueprint(health_bp, url_prefix='/api/v1')
     app.register_blueprint(farms_bp, url_prefix='/api/v1')
@@ -75,6 +119,8 @@ def register_blueprints(app):
     app.register_blueprint(recommendations_bp, url_prefix='/api/v1')
     app.register_blueprint(alerts_bp, url_prefix='/api/v1')
     app.register_blueprint(auth_bp, url_prefix='/api/v1')
+    app.register_blueprint(devices_bp, url_prefix='/api/v1')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/v1')
     app.register_blueprint(reports_bp)  # already has /api/v1 prefix in blueprint
 
 
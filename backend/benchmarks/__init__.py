@@ -0,0 +1 @@
+"""Performance benchmarks for HydroAI backend hot paths."""
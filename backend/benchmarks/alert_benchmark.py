@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare per-reading and vectorized threshold alert evaluation.
+
+Both paths run against the same batch and must create identical alerts.
+
+Usage:
+    python benchmarks/alert_benchmark.py [--readings 10000] [--sensors 200]
+"""
+
+import argparse
+from datetime import datetime
+import random
+from types import SimpleNamespace
+
+from common import create_benchmark_app, report, timed
+from models import db, Alert, Sensor
+from services.alert_service import check_threshold_alerts, check_threshold_alerts_batch
+
+
+def make_readings(sensors, count, breach_rate):
+    now = datetime.utcnow()
+    readings = []
+    for i in range(count):
+        sensor = sensors[i % len(sensors)]
+        if random.random() < breach_rate:
+            value = sensor.min_threshold * random.uniform(0.5, 0.99)
+        else:
+            value = random.uniform(sensor.min_threshold, sensor.max_threshold)
+        readings.append({
+            'sensor_id': sensor.id,
+            'farm_id': sensor.farm_id,
+            'value': round(value, 2),
+            'timestamp': now
+        })
+    return readings
+
+
+def run_scalar(readings, sensors_by_id):
+    for row in readings:
+        # check_threshold_alerts only reads these attributes of the reading
+        reading = SimpleNamespace(sensor=sensors_by_id[row['sensor_id']], **row)
+        check_threshold_alerts(reading)
+
+
+def created_alerts():
+    alerts = sorted(
+        (a.farm_id, a.sensor_id, a.title, a.message, a.severity) for a in Alert.query.all()
+    )
+    Alert.query.delete()
+    db.session.commit()
+    return alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=10000)
+    parser.add_argument('--sensors', type=int, default=200)
+    parser.add_argument('--breach-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    create_benchmark_app(sensors_per_farm=args.sensors, ALERT_EMAIL_ENABLED=False)
+    sensors = Sensor.query.all()
+    sensors_by_id = {sensor.id: sensor for sensor in sensors}
+    metadata = {
+        sensor.id: SimpleNamespace(**sensor.to_dict()) for sensor in sensors
+    }
+    readings = make_readings(sensors, args.readings, args.breach_rate)
+
+    scalar_time, _ = timed(run_scalar, readings, sensors_by_id)
+    scalar_alerts = created_alerts()
+
+    batch_time, _ = timed(check_threshold_alerts_batch, readings, metadata)
+    batch_alerts = created_alerts()
+
+    report(f'Threshold alerts for {args.readings:,} readings', [
+        ('per-reading', f'{scalar_time * 1000:,.1f} ms'),
+        ('vectorized batch', f'{batch_time * 1000:,.1f} ms'),
+        ('speedup', f'{scalar_time / batch_time:.1f}x'),
+        ('alerts created', f'{len(batch_alerts)}'),
+        ('outputs identical', str(scalar_alerts == batch_alerts)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
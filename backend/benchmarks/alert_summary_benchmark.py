@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Measure alert summary latency on a large alerts table.
+
+Stores ``--alerts`` alerts spread over ``--farms`` farms and times one
+farm's summary computed as the five COUNT queries the endpoint used to
+issue and as the single filtered-aggregate query, each with and without
+the covering ``ix_alerts_farm_summary`` index, and through the
+``/alerts/summary`` endpoint with the counter cache disabled and warm.
+All of them must return the same counts.
+
+Usage:
+    python benchmarks/alert_summary_benchmark.py [--alerts 1000000] [--farms 10]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import random
+
+from sqlalchemy import insert
+
+from common import create_benchmark_app, report, timed
+from models import db, Alert, Farm
+from services.alert_counters import alert_counters
+from services.alert_service import alert_counts
+
+CHUNK_SIZE = 50000
+
+
+def seed(user_id, farm_ids, farms, total):
+    """Add farms up to ``farms`` and spread ``total`` alerts over them."""
+    while len(farm_ids) < farms:
+        farm = Farm(name=f'Benchmark Farm {len(farm_ids) + 1}', user_id=user_id)
+        db.session.add(farm)
+        db.session.commit()
+        farm_ids.append(farm.id)
+
+    now = datetime.utcnow()
+    for offset in range(0, total, CHUNK_SIZE):
+        db.session.execute(insert(Alert), [{
+            'title': 'Temperature Alert',
+            'message': 'Value out of range',
+            'alert_type': 'threshold',
+            'severity': random.choice(['low', 'medium', 'high', 'critical']),
+            'is_read': random.random() < 0.8,
+            'is_resolved': random.random() < 0.7,
+            'created_at': now - timedelta(minutes=random.randint(0, 90 * 1440)),
+            'farm_id': farm_ids[i % len(farm_ids)]
+        } for i in range(offset, min(offset + CHUNK_SIZE, total))])
+        db.session.commit()
+
+
+def five_counts(farm_id):
+    """The summary as computed before, one COUNT per figure."""
+    yesterday = datetime.utcnow() - timedelta(hours=24)
+    return {
+        'total_alerts': Alert.query.filter_by(farm_id=farm_id).count(),
+        'unread_alerts': Alert.query.filter_by(farm_id=farm_id, is_read=False).count(),
+        'unresolved_alerts': Alert.query.filter_by(farm_id=farm_id, is_resolved=False).count(),
+        'critical_alerts': Alert.query.filter_by(farm_id=farm_id, severity='critical', is_resolved=False).count(),
+        'recent_alerts_24h': Alert.query.filter(Alert.farm_id == farm_id, Alert.created_at >= yesterday).count()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--alerts', type=int, default=1000000)
+    parser.add_argument('--farms', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    _, client, headers, farm_ids, _ = create_benchmark_app(
+        sensors_per_farm=0, JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1)
+    )
+    user_id = db.session.get(Farm, farm_ids[0]).user_id
+    seed(user_id, farm_ids, args.farms, args.alerts)
+    farm_id = farm_ids[0]
+    path = f'/api/v1/farms/{farm_id}/alerts/summary'
+
+    def endpoint():
+        return client.get(path, headers=headers).json['data']
+
+    def single_query():
+        return alert_counts([farm_id])[farm_id]
+
+    summary_index = next(index for index in Alert.__table__.indexes if index.name == 'ix_alerts_farm_summary')
+    summary_index.drop(db.engine)
+    before, expected = timed(five_counts, farm_id, repeat=args.repeat)
+    grouped_before, counts = timed(single_query, repeat=args.repeat)
+    summary_index.create(db.engine)
+    indexed, indexed_counts = timed(five_counts, farm_id, repeat=args.repeat)
+    grouped, grouped_counts = timed(single_query, repeat=args.repeat)
+    every_farm, _ = timed(alert_counts, farm_ids, repeat=args.repeat)
+
+    alert_counters.enabled = False
+    uncached, uncached_counts = timed(endpoint, repeat=args.repeat)
+    alert_counters.enabled = True
+    endpoint()  # warm the cache
+    cached, cached_counts = timed(endpoint, repeat=args.repeat)
+
+    results = [expected, counts, indexed_counts, grouped_counts, uncached_counts, cached_counts]
+    if any(result != expected for result in results):
+        raise SystemExit(f'Summaries differ: {results}')
+
+    report(f'Alert summary, {args.alerts:,} alerts over {args.farms} farms ({args.alerts // args.farms:,} per farm)', [
+        ('five COUNT queries (before)', f'{before * 1000:,.1f} ms'),
+        ('one query, no covering index', f'{grouped_before * 1000:,.1f} ms ({before / grouped_before:.1f}x)'),
+        ('five COUNT queries, covering index', f'{indexed * 1000:,.1f} ms ({before / indexed:.1f}x)'),
+        ('one query, covering index', f'{grouped * 1000:,.1f} ms ({before / grouped:.1f}x)'),
+        (f'one query, all {args.farms} farms', f'{every_farm * 1000:,.1f} ms'),
+        ('endpoint, cache disabled', f'{uncached * 1000:,.1f} ms'),
+        ('endpoint, cache warm', f'{cached * 1000:,.1f} ms ({before / cached:,.0f}x)'),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Measure compression and decode throughput of the reading archive.
+
+Stores synthetic readings, seals them into archive blocks and reports the
+database size before and after, the block compression ratio against raw
+int64 timestamp + float64 value columns, and how fast blocks decode back
+into NumPy arrays. Decoded readings must match the stored ones exactly.
+
+Usage:
+    python benchmarks/archive_benchmark.py [--sensors 20] [--days 7] [--interval 60]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import math
+import random
+
+import numpy as np
+from sqlalchemy import insert, text
+
+from common import create_benchmark_app, report, timed
+from models import db, ReadingArchiveBlock, SensorReading
+from services.archive import RAW_COLUMN_BYTES, reading_archive
+from services.archive_codec import decode_block
+from services.hot_window import to_epoch_us
+
+
+def make_readings(farm_id, sensor_ids, days, interval):
+    """Smooth per-sensor signals at a fixed interval with device clock jitter."""
+    start = datetime(2026, 1, 1)
+    steps = days * 86400 // interval
+    readings = []
+    for sensor_id in sensor_ids:
+        base = random.uniform(5, 25)
+        for step in range(steps):
+            jitter = timedelta(milliseconds=random.randint(-50, 50))
+            value = base + math.sin(step / 500) + random.gauss(0, 0.02)
+            readings.append({
+                'sensor_id': sensor_id,
+                'farm_id': farm_id,
+                'value': round(value, 2),
+                'timestamp': start + timedelta(seconds=step * interval) + jitter
+            })
+    return readings
+
+
+def database_bytes():
+    db.session.execute(text('VACUUM'))
+    pages = db.session.execute(text('PRAGMA page_count')).scalar()
+    return pages * db.session.execute(text('PRAGMA page_size')).scalar()
+
+
+def decode_all(blocks):
+    return [decode_block(block) for block in blocks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=20)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--interval', type=int, default=60, help='Seconds between readings.')
+    args = parser.parse_args()
+
+    _, _, _, farm_ids, sensor_ids = create_benchmark_app(sensors_per_farm=args.sensors)
+    readings = make_readings(farm_ids[0], sensor_ids, args.days, args.interval)
+    db.session.execute(insert(SensorReading), readings)
+    db.session.commit()
+    raw_size = database_bytes()
+
+    reading_archive.after_days = 1
+    seal_time, _ = timed(reading_archive.seal, now=datetime(2026, 1, 1) + timedelta(days=args.days + 1))
+    archived_size = database_bytes()
+    stats = reading_archive.stats()
+
+    blocks = [block.data for block in ReadingArchiveBlock.query.order_by(
+        ReadingArchiveBlock.sensor_id, ReadingArchiveBlock.day
+    )]
+    decode_time, decoded = timed(decode_all, blocks, repeat=3)
+
+    timestamps = np.concatenate([block[0] for block in decoded])
+    values = np.concatenate([block[1] for block in decoded])
+    expected = sorted((row['sensor_id'], to_epoch_us(row['timestamp']), row['value']) for row in readings)
+    identical = (
+        timestamps.tolist() == [row[1] for row in expected]
+        and values.tolist() == [row[2] for row in expected]
+    )
+
+    report(f'Archive of {len(readings):,} readings ({args.sensors} sensors, {args.days} days)', [
+        ('database before', f'{raw_size / 1024:,.0f} KiB'),
+        ('database after', f'{archived_size / 1024:,.0f} KiB'),
+        ('blocks', f"{stats['blocks']:,}"),
+        ('bytes per reading', f"{stats['bytes_per_reading']} (raw columns {RAW_COLUMN_BYTES})"),
+        ('compression ratio', f"{stats['compression_ratio']}x vs raw columns, "
+                              f"{raw_size / archived_size:.1f}x database"),
+        ('seal', f'{len(readings) / seal_time:,.0f} readings/sec'),
+        ('decode', f'{len(readings) / decode_time:,.0f} readings/sec'),
+        ('round trip identical', str(identical)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
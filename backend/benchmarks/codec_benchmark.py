@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compare parse throughput and wire size of reading batch encodings.
+
+Measures decoding only (no database work) for the JSON batch payload,
+line protocol and packed binary frames. Binary frames decode to a zero-copy
+view, so their rate only reflects frame validation.
+
+Usage:
+    python benchmarks/codec_benchmark.py [--readings 100000]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from common import report, timed
+from services.ingest_codecs import (
+    decode_binary_frame, decode_line_protocol, encode_binary_frame, encode_line_protocol
+)
+from services.ingest_service import parse_batch_payload
+
+
+def decode_json(payload):
+    items = parse_batch_payload(json.loads(payload))
+    return [float(item['value']) for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=100000)
+    parser.add_argument('--sensors', type=int, default=200)
+    args = parser.parse_args()
+
+    now = time.time()
+    sensor_ids = [random.randint(1, args.sensors) for _ in range(args.readings)]
+    timestamps = [now - i * 5 for i in range(args.readings)]
+    values = [round(random.uniform(5.5, 7.0), 2) for _ in range(args.readings)]
+
+    payloads = {
+        'json': json.dumps({'readings': [
+            {'sensor_id': sensor_id, 'value': value, 'timestamp': timestamp}
+            for sensor_id, timestamp, value in zip(sensor_ids, timestamps, values)
+        ]}).encode(),
+        'line protocol': encode_line_protocol(sensor_ids, timestamps, values).encode(),
+        'binary frame': encode_binary_frame(sensor_ids, timestamps, values),
+    }
+    decoders = {
+        'json': decode_json,
+        'line protocol': decode_line_protocol,
+        'binary frame': decode_binary_frame,
+    }
+
+    rows = []
+    for name, payload in payloads.items():
+        seconds, _ = timed(decoders[name], payload, repeat=3)
+        rows.append((
+            name,
+            f'{args.readings / seconds:>14,.0f} readings/sec  '
+            f'{len(payload) / args.readings:6.1f} bytes/reading'
+        ))
+
+    report(f'Decoding {args.readings:,} readings', rows)
+
+
+if __name__ == '__main__':
+    main()
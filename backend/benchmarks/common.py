@@ -0,0 +1,86 @@
+"""Shared setup helpers for HydroAI benchmarks."""
+
+import os
+import sys
+import time
+
+# Allow running as ``python benchmarks/<name>.py`` from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.ProductionConfig refuses to import without a database URL
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import db, User, Farm, Sensor  # noqa: E402
+
+SENSOR_TYPES = [
+    {'type': 'temperature', 'unit': '°C', 'min_threshold': 18.0, 'max_threshold': 28.0},
+    {'type': 'humidity', 'unit': '%', 'min_threshold': 50.0, 'max_threshold': 80.0},
+    {'type': 'ph', 'unit': 'pH', 'min_threshold': 5.5, 'max_threshold': 7.0},
+    {'type': 'nutrients', 'unit': 'ppm', 'min_threshold': 800.0, 'max_threshold': 1200.0},
+]
+
+
+def create_benchmark_app(config_name='testing', sensors_per_farm=4, farms=1, **overrides):
+    """Create an app with a seeded user, farms and sensors.
+
+    Returns:
+        Tuple of (app, test client, auth headers, farm ids, sensor ids). The
+        app context is pushed and left active for the caller.
+    """
+    app = create_app(config_name)
+    app.config.update(overrides)
+    app.app_context().push()
+
+    user = User(email='bench@hydroai.com', name='Benchmark User')
+    user.set_password(os.environ.get('BENCH_PASSWORD', 'benchmark'))
+    db.session.add(user)
+    db.session.commit()
+
+    farm_ids = []
+    sensor_ids = []
+    for i in range(farms):
+        farm = Farm(name=f'Benchmark Farm {i + 1}', user_id=user.id)
+        db.session.add(farm)
+        db.session.commit()
+        farm_ids.append(farm.id)
+
+        for j in range(sensors_per_farm):
+            spec = SENSOR_TYPES[j % len(SENSOR_TYPES)]
+            sensor = Sensor(
+                name=f"{spec['type'].title()} Sensor {i + 1}-{j + 1}",
+                sensor_type=spec['type'],
+                unit=spec['unit'],
+                min_threshold=spec['min_threshold'],
+                max_threshold=spec['max_threshold'],
+                farm_id=farm.id
+            )
+            db.session.add(sensor)
+            db.session.commit()
+            sensor_ids.append(sensor.id)
+
+    token = create_access_token(identity=user.id)
+    headers = {'Authorization': f'Bearer {token}'}
+    return app, app.test_client(), headers, farm_ids, sensor_ids
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """Run ``fn`` ``repeat`` times and return (best seconds, last result)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(title, rows):
+    """Print a simple aligned table of (label, value) rows."""
+    print(f"\n{title}")
+    print('-' * len(title))
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label.ljust(width)}  {value}")
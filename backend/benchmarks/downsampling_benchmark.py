@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Compare fetching a long range raw against downsampled chart series.
+
+Stores a week of readings, builds the rollups and reports the payload size
+and latency of paging through every raw reading with ``cursor`` against a
+single ``points=N`` request per downsampling method. ``lttb`` reads raw
+readings; ``minmax`` and ``avg`` are also timed without the rollups. The
+raw reading limit is lifted to the seeded count for the run.
+
+The hot window is disabled so every request reads the database.
+
+Usage:
+    python benchmarks/downsampling_benchmark.py [--sensors 4] [--days 7] [--interval 5] [--points 1000]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import math
+import random
+
+from sqlalchemy import insert
+
+from common import create_benchmark_app, report, timed
+from models import db, SensorReading
+import services.downsampling as downsampling
+from services.hot_window import hot_window
+from services.rollups import backfill_rollups
+
+
+def seed(farm_id, sensor_ids, days, interval):
+    """Store smooth signals with noise and a few spikes; return the reading count."""
+    now = datetime.utcnow()
+    steps = days * 86400 // interval
+    for sensor_id in sensor_ids:
+        base = random.uniform(5, 25)
+        spikes = set(random.sample(range(steps), 5))
+        db.session.execute(insert(SensorReading), [{
+            'sensor_id': sensor_id,
+            'farm_id': farm_id,
+            'value': base + math.sin(step / 2000) + random.gauss(0, 0.05) + (10 if step in spikes else 0),
+            'timestamp': now - timedelta(seconds=step * interval)
+        } for step in range(steps)])
+        db.session.commit()
+    backfill_rollups(now - timedelta(days=days + 1), now + timedelta(days=1))
+    db.session.commit()
+    return steps * len(sensor_ids)
+
+
+def crawl(client, headers, path):
+    """Page through every raw reading; return (pages, bytes, readings)."""
+    pages = size = count = 0
+    cursor = None
+    while True:
+        response = client.get(path + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        pages += 1
+        size += len(response.data)
+        count += response.json['count']
+        cursor = response.json['next_cursor']
+        if not cursor:
+            return pages, size, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=4)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--interval', type=int, default=5, help='Seconds between readings.')
+    parser.add_argument('--points', type=int, default=1000, help='Points per sensor.')
+    args = parser.parse_args()
+
+    app, client, headers, farm_ids, sensor_ids = create_benchmark_app(
+        sensors_per_farm=args.sensors, JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1)
+    )
+    total = seed(farm_ids[0], sensor_ids, args.days, args.interval)
+    hot_window.enabled = False
+    # Raw reads are refused past MAX_RAW_POINTS; lift it so every method is timed on the whole range
+    downsampling.MAX_RAW_POINTS = max(downsampling.MAX_RAW_POINTS, total)
+    path = f'/api/v1/farms/{farm_ids[0]}/readings?hours={args.days * 24}'
+
+    seconds, (pages, size, count) = timed(crawl, client, headers, f'{path}&limit=1000')
+    rows = [
+        ('readings stored', f'{total:,}'),
+        ('raw, paged', f'{count:,} points, {size / 1e6:.1f} MB in {pages} pages, {seconds * 1000:,.0f} ms'),
+    ]
+
+    def fetch(method):
+        return client.get(f'{path}&points={args.points}&method={method}', headers=headers)
+
+    for method, use_rollups in (('lttb', False), ('minmax', True), ('minmax', False), ('avg', True), ('avg', False)):
+        app.config['READINGS_ROLLUPS_ENABLED'] = use_rollups
+        seconds, response = timed(fetch, method, repeat=3)
+        rows.append((f"{method} ({response.json['source']})", (
+            f"{response.json['count']:,} points, {len(response.data) / 1e3:,.0f} KB, "
+            f"{seconds * 1000:,.0f} ms ({size / len(response.data):,.0f}x smaller)"
+        )))
+
+    report(f'{args.days} days of {args.interval}s readings, {args.sensors} sensors, points={args.points}', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Measure small-message throughput of the TCP/UDP ingest gateway.
+
+Runs the gateway and an in-process client on one event loop, sends one
+reading per UDP datagram and one reading per TCP line, and reports
+messages/sec up to the point where every reading is in the database.
+The readings carry no timestamp, so each is stamped by the server; the
+stored row count is checked against the messages sent.
+
+Usage:
+    python benchmarks/gateway_benchmark.py [--messages 50000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from common import create_benchmark_app, report
+from ingest_gateway import IngestGateway
+from models import db, Device, SensorReading
+
+
+class _Client(asyncio.DatagramProtocol):
+    pass
+
+
+async def wait_for_rows(gateway, expected, timeout=60):
+    # Poll the gateway's counter: the in-memory test database shares one
+    # connection between threads, so querying it here would interfere
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if gateway.stats.written >= expected:
+            return True
+        await asyncio.sleep(0.005)
+    return False
+
+
+async def run(app, farm_id, sensor_ids, messages):
+    device = Device(name='Benchmark gateway', farm_id=farm_id)
+    device.set_key('benchmark-device-key')
+    db.session.add(device)
+    db.session.commit()
+    header = f'{device.id} benchmark-device-key'
+
+    gateway = IngestGateway(app)
+    await gateway.start('127.0.0.1', 0, 0)
+    tcp_port = gateway.tcp_server.sockets[0].getsockname()[1]
+    udp_addr = gateway.udp_transport.get_extra_info('sockname')
+    loop = asyncio.get_running_loop()
+    results = []
+
+    # UDP: one reading per datagram. The loop reads one datagram per
+    # iteration, so yield after each send to keep the socket buffer from
+    # overflowing (the client shares the core with the gateway).
+    transport, _ = await loop.create_datagram_endpoint(_Client, remote_addr=udp_addr)
+    start = time.perf_counter()
+    for i in range(messages):
+        sensor_id = sensor_ids[i % len(sensor_ids)]
+        transport.sendto(f'{header}\n{sensor_id} 6.2\n'.encode())
+        await asyncio.sleep(0)
+    ok = await wait_for_rows(gateway, messages)
+    results.append(('UDP datagrams', messages / (time.perf_counter() - start), ok))
+    transport.close()
+
+    # TCP: one authenticated connection streaming one reading per line
+    reader, writer = await asyncio.open_connection('127.0.0.1', tcp_port)
+    writer.write(f'AUTH {header}\n'.encode())
+    await reader.readline()
+    start = time.perf_counter()
+    for i in range(messages):
+        writer.write(f'{sensor_ids[i % len(sensor_ids)]} 6.2\n'.encode())
+        if i % 1000 == 0:
+            await writer.drain()
+    await writer.drain()
+    writer.close()
+    ok = await wait_for_rows(gateway, 2 * messages)
+    results.append(('TCP lines', messages / (time.perf_counter() - start), ok))
+
+    await gateway.stop()
+    return results, gateway.stats.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=50000)
+    args = parser.parse_args()
+
+    app, _, _, farm_ids, sensor_ids = create_benchmark_app(sensors_per_farm=20)
+    results, stats = asyncio.run(run(app, farm_ids[0], sensor_ids, args.messages))
+    stored = SensorReading.query.count()
+    if stored != 2 * args.messages:
+        raise SystemExit(f'Sent {2 * args.messages:,} readings but {stored:,} were stored: {stats}')
+
+    rows = [
+        (name, f'{rate:,.0f} messages/sec' + ('' if ok else ' (incomplete)'))
+        for name, rate, ok in results
+    ]
+    rows.append(('rows stored', f'{stored:,}'))
+    rows.append(('gateway stats', str(stats)))
+    report(f'Ingest gateway, {args.messages:,} single-reading messages', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Compare rows/sec of single-reading and batch ingestion.
+
+Usage:
+    python benchmarks/ingest_benchmark.py [--readings 5000] [--batch-size 1000]
+"""
+
+import argparse
+import random
+
+from common import create_benchmark_app, report, timed
+
+
+def ingest_single(client, headers, sensor_ids, count):
+    for i in range(count):
+        client.post('/api/v1/readings', json={
+            'sensor_id': sensor_ids[i % len(sensor_ids)],
+            'value': round(random.uniform(18, 28), 2)
+        }, headers=headers)
+
+
+def ingest_batch(client, headers, sensor_ids, count, batch_size):
+    for start in range(0, count, batch_size):
+        readings = [{
+            'sensor_id': sensor_ids[i % len(sensor_ids)],
+            'value': round(random.uniform(18, 28), 2)
+        } for i in range(start, min(start + batch_size, count))]
+        client.post('/api/v1/readings/batch', json={'readings': readings}, headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    app, client, headers, _, sensor_ids = create_benchmark_app(sensors_per_farm=20)
+
+    single_count = max(1, args.readings // 10)
+    single_time, _ = timed(ingest_single, client, headers, sensor_ids, single_count)
+    batch_time, _ = timed(ingest_batch, client, headers, sensor_ids, args.readings, args.batch_size)
+
+    single_rate = single_count / single_time
+    batch_rate = args.readings / batch_time
+    report('Sensor reading ingestion', [
+        ('POST /readings', f'{single_rate:,.0f} rows/sec ({single_count} rows)'),
+        ('POST /readings/batch', f'{batch_rate:,.0f} rows/sec ({args.readings} rows, batch {args.batch_size})'),
+        ('speedup', f'{batch_rate / single_rate:.1f}x'),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare payload size and parse time of the readings response formats.
+
+Stores a week of readings and fetches all of them as ``format=rows``
+(paging with ``cursor``), ``columnar`` and ``binary``, reporting the bytes
+sent with and without gzip, the request time and the time a client takes
+to parse the payload. All formats must return the same readings.
+
+The hot window is disabled so every request reads the database.
+
+Usage:
+    python benchmarks/readings_format_benchmark.py [--sensors 4] [--days 7] [--interval 30]
+"""
+
+import argparse
+from datetime import timedelta
+import gzip
+import json
+import time
+
+from common import create_benchmark_app, report, timed
+from downsampling_benchmark import seed
+from services.hot_window import hot_window
+from services.ingest_codecs import READ_RECORD_DTYPE, decode_binary_frame
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def fetch_rows(client, headers, path):
+    """Page through every reading; return (pages, bytes, parse seconds, sorted readings).
+
+    With gzip in ``headers``, bytes are as sent and parsing includes decompression.
+    """
+    pages = size = 0
+    parse = 0.0
+    readings = []
+    cursor = None
+    while True:
+        response = client.get(path + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        pages += 1
+        size += len(response.data)
+        start = time.perf_counter()
+        data = response.data
+        if response.headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        body = json.loads(data)
+        parse += time.perf_counter() - start
+        readings += [(reading['sensor_id'], reading['value']) for reading in body['data']]
+        cursor = body['next_cursor']
+        if not cursor:
+            return pages, size, parse, sorted(readings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=4)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--interval', type=int, default=30, help='Seconds between readings.')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app, client, headers, farm_ids, sensor_ids = create_benchmark_app(
+        sensors_per_farm=args.sensors, JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1)
+    )
+    app.json.compact = True
+    total = seed(farm_ids[0], sensor_ids, args.days, args.interval)
+    hot_window.enabled = False
+    path = f'/api/v1/farms/{farm_ids[0]}/readings?hours={args.days * 24 + 1}'
+
+    rows_seconds, (pages, rows_size, rows_parse, expected) = timed(fetch_rows, client, headers, f'{path}&limit=1000')
+    _, rows_gzip, _, _ = fetch_rows(client, {**headers, **GZIP}, f'{path}&limit=1000')
+
+    def fetch(response_format, extra=None):
+        return client.get(f'{path}&format={response_format}', headers={**headers, **(extra or {})})
+
+    columnar_seconds, columnar = timed(fetch, 'columnar', repeat=args.repeat)
+    columnar_parse, body = timed(json.loads, columnar.data, repeat=args.repeat)
+    columnar_gzip = len(fetch('columnar', GZIP).data)
+    got_columnar = sorted(
+        (entry['meta']['sensor_id'], value) for entry in body['data'] for value in entry['values']
+    )
+
+    binary_seconds, binary = timed(fetch, 'binary', repeat=args.repeat)
+    binary_parse, frame = timed(decode_binary_frame, binary.data, READ_RECORD_DTYPE, repeat=args.repeat)
+    got_binary = sorted(zip(frame.sensor_ids.tolist(), frame.values.tolist()))
+
+    if got_columnar != expected:
+        raise SystemExit('Columnar readings differ from rows')
+    if got_binary != expected:
+        raise SystemExit('Binary readings differ from rows')
+
+    report(f'{total:,} readings over {args.days} days, {args.sensors} sensors', [
+        ('rows, paged', f'{rows_size / 1e6:,.2f} MB in {pages} pages ({rows_gzip / 1e6:,.2f} MB gzip), '
+                        f'{rows_seconds * 1000:,.0f} ms, parse {rows_parse * 1000:,.1f} ms'),
+        ('columnar', f'{len(columnar.data) / 1e6:,.2f} MB ({rows_size / len(columnar.data):.1f}x smaller, '
+                     f'{columnar_gzip / 1e6:,.2f} MB gzip), {columnar_seconds * 1000:,.0f} ms, '
+                     f'parse {columnar_parse * 1000:,.1f} ms ({rows_parse / columnar_parse:.1f}x)'),
+        ('binary', f'{len(binary.data) / 1e6:,.2f} MB ({rows_size / len(binary.data):.1f}x smaller), '
+                   f'{binary_seconds * 1000:,.0f} ms, parse {binary_parse * 1000:,.3f} ms (zero-copy view)'),
+    ])
+
+
+if __name__ == '__main__':
+    main()
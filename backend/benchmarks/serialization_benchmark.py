@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compare JSON encoding and compression of readings responses.
+
+Builds pages of 1,000 and 10,000 readings shaped like the ``/readings``
+response and times encoding them with Flask's default provider and with
+:class:`FastJSONProvider` (orjson when installed), with timestamps given
+as ``isoformat()`` strings and as datetimes. All encodings must decode to
+the same data. The encoded page is then compressed with each encoding the
+server supports. Compact output is used throughout, as in production.
+
+Usage:
+    python benchmarks/serialization_benchmark.py [--rows 1000 10000]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import json
+import random
+
+from flask.json.provider import DefaultJSONProvider
+
+from common import create_benchmark_app, report, timed, SENSOR_TYPES
+from services.compression import response_compressor
+from services.json_provider import FastJSONProvider, orjson
+
+
+def readings_page(rows, start, native_timestamps=False):
+    """A ``/readings`` response body of ``rows`` readings over four sensors from ``start``."""
+    data = []
+    for i in range(rows):
+        spec = SENSOR_TYPES[i % len(SENSOR_TYPES)]
+        timestamp = start + timedelta(seconds=5 * i, microseconds=random.randint(0, 999999))
+        data.append({
+            'id': i + 1,
+            'value': round(random.uniform(spec['min_threshold'], spec['max_threshold']), 2),
+            'timestamp': timestamp if native_timestamps else timestamp.isoformat(),
+            'sensor_id': i % len(SENSOR_TYPES) + 1,
+            'sensor_name': f"{spec['type'].title()} Sensor 1-{i % len(SENSOR_TYPES) + 1}",
+            'sensor_type': spec['type'],
+            'unit': spec['unit']
+        })
+    return {'success': True, 'data': data, 'count': rows, 'has_more': False, 'next_cursor': None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app, _, _, _, _ = create_benchmark_app(sensors_per_farm=0)
+    providers = {
+        'stdlib': DefaultJSONProvider(app),
+        'fast': FastJSONProvider(app),
+    }
+    for provider in providers.values():
+        provider.compact = True
+
+    for rows in args.rows:
+        start = datetime.utcnow() - timedelta(seconds=5 * rows)
+        random.seed(rows)
+        strings = readings_page(rows, start)
+        random.seed(rows)
+        native = readings_page(rows, start, native_timestamps=True)
+
+        with app.test_request_context():
+            baseline, response = timed(providers['stdlib'].response, strings, repeat=args.repeat)
+            fast, fast_response = timed(providers['fast'].response, strings, repeat=args.repeat)
+            fast_native, native_response = timed(providers['fast'].response, native, repeat=args.repeat)
+
+        body = fast_response.get_data()
+        decoded = [json.loads(r.get_data()) for r in (response, fast_response, native_response)]
+        if any(result != decoded[0] for result in decoded):
+            raise SystemExit('Encoders disagree')
+
+        encoder = 'orjson' if orjson is not None else 'stdlib fallback, orjson not installed'
+        results = [
+            ('Flask default provider', f'{baseline * 1000:,.2f} ms, {len(response.get_data()):,} bytes'),
+            (f'FastJSONProvider ({encoder})', f'{fast * 1000:,.2f} ms ({baseline / fast:.1f}x)'),
+            ('FastJSONProvider, datetime values', f'{fast_native * 1000:,.2f} ms ({baseline / fast_native:.1f}x)'),
+        ]
+        for encoding in response_compressor.encodings:
+            seconds, compressed = timed(response_compressor.encode, body, encoding, repeat=args.repeat)
+            results.append((
+                f'{encoding} of {len(body):,} bytes',
+                f'{len(compressed):,} bytes ({len(body) / len(compressed):.1f}x smaller) in {seconds * 1000:,.2f} ms'
+            ))
+
+        report(f'Readings response, {rows:,} rows', results)
+
+
+if __name__ == '__main__':
+    main()
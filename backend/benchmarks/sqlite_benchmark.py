@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Compare SQLite ingest and read throughput of the default and edge profiles.
+
+Each profile gets a fresh database file seeded with a day of readings.
+Writer processes post reading batches and reader processes query the
+readings endpoint at the same time, each building its own app like a
+gunicorn worker. ``development`` is the current SQLite default (rollback
+journal, synchronous=FULL, no mmap); ``edge`` is config.EdgeConfig.
+
+The hot window is disabled so reads go to SQLite. Run with ``--dir`` on
+the device's real disk: tmpfs hides the cost of fsync.
+
+Usage:
+    python benchmarks/sqlite_benchmark.py [--writers 3] [--readers 3] [--seconds 5] [--dir /var/lib/hydroai]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from common import create_benchmark_app, report
+from app import create_app
+from models import db, SensorReading
+
+PROFILES = {
+    'development': 'DEV_DATABASE_URL',
+    'edge': 'EDGE_DATABASE_URL',
+}
+
+
+def seed(profile, sensors, readings_per_sensor):
+    """Create the profile's database and return (auth headers, farm id, sensor ids)."""
+    _, _, headers, farm_ids, sensor_ids = create_benchmark_app(profile, sensors_per_farm=sensors)
+    now = datetime.utcnow()
+    rows = [{
+        'sensor_id': sensor_id,
+        'farm_id': farm_ids[0],
+        'value': round(random.uniform(18, 28), 2),
+        'timestamp': now - timedelta(seconds=i * 86400 / readings_per_sensor)
+    } for sensor_id in sensor_ids for i in range(readings_per_sensor)]
+    db.session.execute(insert(SensorReading), rows)
+    db.session.commit()
+    db.session.remove()
+    db.engine.dispose()
+    return headers, farm_ids[0], sensor_ids
+
+
+def worker(profile, role, headers, farm_id, sensor_ids, batch_size, deadline, start):
+    """Run writes or reads until ``deadline``; return (operations, rows, errors, latencies)."""
+    app = create_app(profile)
+    client = app.test_client()
+    operations = rows = errors = 0
+    latencies = []
+    while time.time() < start:
+        time.sleep(0.01)
+
+    while time.time() < deadline:
+        began = time.perf_counter()
+        if role == 'writer':
+            response = client.post('/api/v1/readings/batch', json={'readings': [{
+                'sensor_id': random.choice(sensor_ids),
+                'value': round(random.uniform(18, 28), 2)
+            } for _ in range(batch_size)]}, headers=headers)
+            ok = response.status_code == 201
+            count = batch_size
+        else:
+            response = client.get(f'/api/v1/farms/{farm_id}/readings?hours=6&limit=500', headers=headers)
+            ok = response.status_code == 200
+            count = response.json['count'] if ok else 0
+        latencies.append(time.perf_counter() - began)
+        if ok:
+            operations += 1
+            rows += count
+        else:
+            errors += 1
+    return operations, rows, errors, latencies
+
+
+def run_profile(profile, args, directory):
+    headers, farm_id, sensor_ids = seed(profile, args.sensors, args.readings)
+
+    start = time.time() + 2  # let every worker finish create_app first
+    deadline = start + args.seconds
+    roles = ['writer'] * args.writers + ['reader'] * args.readers
+    with multiprocessing.get_context('fork').Pool(len(roles)) as pool:
+        results = pool.starmap(worker, [
+            (profile, role, headers, farm_id, sensor_ids, args.batch_size, deadline, start) for role in roles
+        ])
+
+    summary = {}
+    for role in ('writer', 'reader'):
+        mine = [result for result, name in zip(results, roles) if name == role]
+        latencies = sorted(latency for result in mine for latency in result[3])
+        summary[role] = {
+            'operations': sum(result[0] for result in mine),
+            'rows': sum(result[1] for result in mine),
+            'errors': sum(result[2] for result in mine),
+            'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=3)
+    parser.add_argument('--readers', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--batch-size', type=int, default=25)
+    parser.add_argument('--sensors', type=int, default=20)
+    parser.add_argument('--readings', type=int, default=2880, help='Seeded readings per sensor.')
+    parser.add_argument('--dir', help='Directory for the database files (default: a temporary directory).')
+    args = parser.parse_args()
+
+    os.environ['HOT_WINDOW_ENABLED'] = 'false'
+    directory = tempfile.mkdtemp(dir=args.dir)
+    # Config reads these once, when the first app is created
+    for profile, variable in PROFILES.items():
+        os.environ[variable] = f"sqlite:///{os.path.join(directory, f'{profile}.db')}"
+    try:
+        results = {profile: run_profile(profile, args, directory) for profile in PROFILES}
+    finally:
+        shutil.rmtree(directory)
+
+    rows = []
+    for profile, summary in results.items():
+        writes, reads = summary['writer'], summary['reader']
+        rows.append((f'{profile} ingest', (
+            f"{writes['rows'] / args.seconds:,.0f} rows/sec, p95 {writes['p95_ms']:.1f} ms, "
+            f"{writes['errors']} errors"
+        )))
+        rows.append((f'{profile} reads', (
+            f"{reads['operations'] / args.seconds:,.0f} queries/sec, p95 {reads['p95_ms']:.1f} ms, "
+            f"{reads['errors']} errors"
+        )))
+    default, edge = results['development'], results['edge']
+    rows.append(('edge ingest speedup', f"{edge['writer']['rows'] / max(default['writer']['rows'], 1):.1f}x"))
+    rows.append(('edge read speedup', (
+        f"{edge['reader']['operations'] / max(default['reader']['operations'], 1):.1f}x"
+    )))
+    report(f'SQLite profiles ({args.writers} writers, {args.readers} readers, {args.seconds:g}s)', rows)
+
+
+if __name__ == '__main__':
+    main()
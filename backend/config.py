@@ -20,6 +20,7 @@ class Config:
         'pool_recycle': 300,
         'pool_pre_ping': True
     }
+    SQLITE_PRAGMAS = {}  # applied to every new SQLite connection (services/sqlite_tuning.py)
     
     # JWT settings
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
@@ -30,6 +31,11 @@ class Config:
     API_VERSION = 'v1'
     PAGINATION_PER_PAGE = 20
     MAX_PAGINATION_PER_PAGE = 100
+    JSON_ORJSON_ENABLED = True  # encode responses with orjson when installed (services/json_provider.py)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'  # off behind a compressing proxy
+    COMPRESSION_MIN_SIZE = 1024  # bytes; smaller responses are sent uncompressed
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4  # used when the brotli package is installed
     
     # ML Model settings
     ML_MODEL_PATH = os.environ.get('ML_MODEL_PATH', 'ml_models/')
@@ -38,6 +44,49 @@ class Config:
     # Alert settings
     ALERT_EMAIL_ENABLED = True
     ALERT_SMS_ENABLED = False
+    ALERT_COUNTER_CACHE_ENABLED = os.environ.get('ALERT_COUNTER_CACHE_ENABLED', 'true').lower() == 'true'
+    ALERT_COUNTER_CACHE_TTL = 30  # seconds; bounds staleness across worker processes
+    
+    # Ingestion settings
+    INGEST_MAX_BATCH_SIZE = int(os.environ.get('INGEST_MAX_BATCH_SIZE', 5000))
+    SENSOR_CACHE_SIZE = int(os.environ.get('SENSOR_CACHE_SIZE', 10000))
+    SENSOR_CACHE_TTL = 60  # seconds; bounds staleness across worker processes
+    INGEST_DEDUP_CAPACITY = int(os.environ.get('INGEST_DEDUP_CAPACITY', 100000))  # recent reading keys kept
+    INGEST_MAX_CLOCK_SKEW = 300  # seconds a device timestamp may run ahead of the server
+    
+    # Write-behind ingestion: readings are queued and committed in groups
+    INGEST_BUFFER_ENABLED = os.environ.get('INGEST_BUFFER_ENABLED', 'false').lower() == 'true'
+    INGEST_BUFFER_DURABILITY = os.environ.get('INGEST_BUFFER_DURABILITY', 'flush')  # flush or enqueue
+    INGEST_BUFFER_MAX_SIZE = 10000  # queued readings before returning 429
+    INGEST_BUFFER_BATCH_SIZE = 500  # readings per group commit
+    INGEST_BUFFER_FLUSH_MS = 5  # max wait before flushing a partial group
+    INGEST_BUFFER_ACK_TIMEOUT = 5.0  # seconds to wait for a flush acknowledgement
+    
+    # Standalone TCP/UDP ingest gateway (ingest_gateway.py)
+    GATEWAY_HOST = os.environ.get('GATEWAY_HOST', 'localhost')
+    GATEWAY_TCP_PORT = int(os.environ.get('GATEWAY_TCP_PORT', 8766))
+    GATEWAY_UDP_PORT = int(os.environ.get('GATEWAY_UDP_PORT', 8766))
+    GATEWAY_BATCH_SIZE = 5000  # readings per bulk insert
+    GATEWAY_FLUSH_INTERVAL_MS = 50  # max time readings wait in memory
+    GATEWAY_MAX_PENDING = 100000  # readings held before UDP drops / TCP pauses
+    GATEWAY_DEVICE_REFRESH = 60  # seconds between device key reloads
+    
+    # Monthly reading partitions (services/partitions.py)
+    READINGS_PARTITION_MONTHS_AHEAD = 3  # empty partitions kept ready on PostgreSQL
+    READINGS_RETENTION_MONTHS = int(os.environ.get('READINGS_RETENTION_MONTHS', 0))  # 0 keeps everything
+    READINGS_ROLLUPS_ENABLED = True  # maintain 1m/1h/1d rollups as readings are stored
+    READINGS_ARCHIVE_AFTER_DAYS = int(os.environ.get('READINGS_ARCHIVE_AFTER_DAYS', 0))  # 0 disables archiving
+    READINGS_COLD_AFTER_MONTHS = int(os.environ.get('READINGS_COLD_AFTER_MONTHS', 0))  # 0 disables cold export
+    READINGS_COLD_STORAGE_DIR = os.environ.get('READINGS_COLD_STORAGE_DIR')  # defaults to instance/cold_readings
+    READINGS_AGGREGATE_SLICE_HOURS = 24  # readings loaded at once when aggregates are computed in NumPy
+    
+    # In-memory hot window of recent readings (services/hot_window.py); each
+    # worker holds HOT_WINDOW_CAPACITY * 24 bytes per sensor, so it is opt-in
+    HOT_WINDOW_ENABLED = os.environ.get('HOT_WINDOW_ENABLED', 'false').lower() == 'true'
+    HOT_WINDOW_HOURS = 24  # window served from memory
+    HOT_WINDOW_CAPACITY = int(os.environ.get('HOT_WINDOW_CAPACITY', 17280))  # readings per sensor, 24 bytes each
+    HOT_WINDOW_SYNC_INTERVAL = 1.0  # seconds between polls for readings stored by other workers
+    HOT_WINDOW_SYNC_SLACK = 5.0  # seconds a transaction may commit behind a later reading id
     
 
 class DevelopmentConfig(Config):
@@ -76,6 +125,42 @@ class ProductionConfig(Config):
     LOG_LEVEL = 'INFO'
     
 
+class EdgeConfig(Config):
+    """Greenhouse edge box configuration: a local SQLite file shared by gunicorn workers."""
+    
+    DEBUG = False
+    TESTING = False
+    
+    # Edge database file
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'EDGE_DATABASE_URL',
+        'sqlite:///hydroai_edge.db'
+    )
+    
+    # Each worker process holds a few connections; SQLite serializes writers
+    # anyway, so a large pool only adds lock contention. No pre-ping or
+    # recycling is needed for a local file.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 4,
+        'max_overflow': 4,
+        'pool_timeout': 10
+    }
+    
+    # Applied in this order on every new connection
+    SQLITE_PRAGMAS = {
+        'busy_timeout': 5000,  # ms to wait for another worker's write lock instead of failing
+        'journal_mode': 'WAL',  # readers and the writer no longer block each other
+        'synchronous': 'NORMAL',  # fsync at checkpoints; a crash may lose the last commits, never corrupts
+        'cache_size': -65536,  # 64 MiB page cache per connection (negative means KiB)
+        'mmap_size': 268435456,  # map up to 256 MiB of the file for reads
+        'temp_store': 'MEMORY',  # sorts and temporary indexes stay in memory
+        'wal_autocheckpoint': 1000  # pages written before the WAL is folded back
+    }
+    
+    # Logging
+    LOG_LEVEL = 'INFO'
+    
+
 class TestingConfig(Config):
     """Testing configuration."""
     
@@ -92,6 +177,9 @@ class TestingConfig(Config):
     ALERT_EMAIL_ENABLED = False
     ALERT_SMS_ENABLED = False
     
+    # Write readings synchronously in testing
+    INGEST_BUFFER_ENABLED = False
+    
     # Logging
     LOG_LEVEL = 'ERROR'
 
@@ -101,5 +189,6 @@ config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'edge': EdgeConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""Standalone TCP/UDP ingestion gateway for sensor devices.
+
+Devices authenticate with the per-device keys issued by
+``POST /api/v1/farms/<farm_id>/devices`` and send readings in line protocol
+(``sensor_id value [timestamp]`` per line) or packed binary records, see
+``services/ingest_codecs.py``. Readings are batched in memory and written to
+``sensor_readings`` with bulk inserts.
+
+TCP: the first line is ``AUTH <device_id> <key> [line|bin]``; the gateway
+answers ``OK`` or ``ERR <reason>`` and then reads records until the
+connection closes.
+
+UDP: every datagram starts with a ``<device_id> <key> [line|bin]`` header
+line followed by the records.
+"""
+
+import argparse
+import asyncio
+import hmac
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from services.ingest_codecs import RECORD_DTYPE, ReadingColumns
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMAT_LINE = 'line'
+FORMAT_BINARY = 'bin'
+
+# Longest line protocol record accepted; a connection sending more without
+# a newline is dropped
+MAX_LINE_LENGTH = 1024
+
+
+class GatewayStats:
+    """Counters reported periodically by the gateway."""
+
+    def __init__(self):
+        self.messages = 0
+        self.readings = 0
+        self.written = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.malformed = 0
+        self.dropped = 0
+        self.auth_failures = 0
+
+    def snapshot(self):
+        return dict(self.__dict__)
+
+
+class DeviceAuthenticator:
+    """Verify device keys against an in-memory copy of the devices table.
+
+    Active devices are reloaded every ``refresh_interval`` seconds, and
+    on demand (at most once per second) when an unknown device connects.
+    """
+
+    def __init__(self, app, executor, refresh_interval=60):
+        self.app = app
+        self.executor = executor
+        self.refresh_interval = refresh_interval
+        self._devices = {}  # device id -> (key hash, farm id)
+        self._last_refresh = 0.0
+        self._refreshing = None
+
+    def verify(self, device_id, key):
+        """Return the device's farm id if the key is valid, else None."""
+        from models import Device
+
+        device = self._devices.get(device_id)
+        if device is None:
+            self.request_refresh()
+            return None
+
+        key_hash, farm_id = device
+        if not hmac.compare_digest(key_hash, Device.hash_key(key)):
+            return None
+        return farm_id
+
+    async def verify_async(self, device_id, key):
+        """Like :meth:`verify`, but waits for a reload if the device is unknown."""
+        if device_id not in self._devices:
+            await self.refresh()
+        return self.verify(device_id, key)
+
+    def request_refresh(self):
+        """Schedule a reload unless one ran in the last second."""
+        if time.monotonic() - self._last_refresh >= 1.0:
+            asyncio.ensure_future(self.refresh())
+
+    async def refresh(self):
+        """Reload active devices from the database."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._reload())
+        try:
+            await self._refreshing
+        finally:
+            self._refreshing = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def _reload(self):
+        self._last_refresh = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            self._devices = await loop.run_in_executor(self.executor, self._load)
+        except Exception as e:
+            logger.error(f"Failed to load devices: {e}")
+
+    def _load(self):
+        from models import db, Device, Farm
+
+        with self.app.app_context():
+            rows = db.session.query(Device.id, Device.key_hash, Device.farm_id).join(
+                Farm, Farm.id == Device.farm_id
+            ).filter(
+                Device.is_active == True,
+                Farm.is_active == True
+            ).all()
+            return {row.id: (row.key_hash, row.farm_id) for row in rows}
+
+
+class ReadingBatcher:
+    """Accumulate readings per farm and write them in bulk.
+
+    A flush runs every ``flush_interval`` seconds, or as soon as
+    ``batch_size`` readings are pending. Database work runs on a single
+    worker thread so the event loop never blocks on I/O.
+    """
+
+    def __init__(self, app, executor, stats, batch_size=5000, flush_interval=0.05, max_pending=100000):
+        self.app = app
+        self.executor = executor
+        self.stats = stats
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = 0
+        self._groups = {}  # farm id -> (sensor ids, timestamps, values)
+        self._flush_due = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+
+    def add(self, farm_id, sensor_ids, timestamps, values):
+        """Queue readings for a farm; returns False if there is no room."""
+        if self.pending + len(sensor_ids) > self.max_pending:
+            self._room.clear()
+            return False
+
+        group = self._groups.get(farm_id)
+        if group is None:
+            group = self._groups[farm_id] = ([], [], [])
+        group[0].extend(sensor_ids)
+        group[1].extend(timestamps)
+        group[2].extend(values)
+
+        self.pending += len(sensor_ids)
+        self.stats.readings += len(sensor_ids)
+        if self.pending >= self.batch_size:
+            self._flush_due.set()
+        return True
+
+    async def wait_for_room(self):
+        await self._room.wait()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_due.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        """Write everything queued so far."""
+        self._flush_due.clear()
+        if not self._groups:
+            return
+
+        groups, self._groups = self._groups, {}
+        count, self.pending = self.pending, 0
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._write, groups)
+        except Exception as e:
+            logger.error(f"Failed to write {count} readings: {e}")
+        finally:
+            self._room.set()
+
+    def _write(self, groups):
+        from services.ingest_service import ingest_columns
+
+        with self.app.app_context():
+            for farm_id, (sensor_ids, timestamps, values) in groups.items():
+                columns = ReadingColumns(
+                    np.array(sensor_ids, dtype=np.int64),
+                    np.array(timestamps, dtype=np.float64),
+                    np.array(values, dtype=np.float64)
+                )
+                accepted, duplicates, rejected, _ = ingest_columns(columns, farm_id=farm_id)
+                self.stats.written += accepted - duplicates
+                self.stats.duplicates += duplicates
+                self.stats.rejected += len(rejected)
+
+
+class IngestGateway:
+    """Receive device frames over TCP and UDP and hand them to the batcher."""
+
+    def __init__(self, app):
+        self.app = app
+        self.stats = GatewayStats()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gateway-db')
+        self.auth = DeviceAuthenticator(
+            app, self.executor, refresh_interval=app.config.get('GATEWAY_DEVICE_REFRESH', 60)
+        )
+        self.batcher = ReadingBatcher(
+            app,
+            self.executor,
+            self.stats,
+            batch_size=app.config.get('GATEWAY_BATCH_SIZE', 5000),
+            flush_interval=app.config.get('GATEWAY_FLUSH_INTERVAL_MS', 50) / 1000.0,
+            max_pending=app.config.get('GATEWAY_MAX_PENDING', 100000)
+        )
+        self._tasks = []
+
+    async def start(self, host, tcp_port, udp_port):
+        """Load devices and start listeners and background tasks."""
+        await self.auth.refresh()
+
+        loop = asyncio.get_running_loop()
+        self.tcp_server = await asyncio.start_server(self.handle_tcp, host, tcp_port)
+        self.udp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: UDPProtocol(self), local_addr=(host, udp_port)
+        )
+        self._tasks = [
+            asyncio.ensure_future(self.batcher.run()),
+            asyncio.ensure_future(self.auth.run()),
+        ]
+
+    async def stop(self):
+        """Stop listening and flush readings still held in memory."""
+        self.tcp_server.close()
+        self.udp_transport.close()
+        for task in self._tasks:
+            task.cancel()
+        await self.batcher.flush()
+        self.executor.shutdown(wait=True)
+
+    def parse_header(self, header):
+        """Parse ``<device_id> <key> [format]`` into its parts, or None."""
+        parts = header.split()
+        if len(parts) not in (2, 3):
+            return None
+        fmt = parts[2] if len(parts) == 3 else FORMAT_LINE
+        if fmt not in (FORMAT_LINE, FORMAT_BINARY):
+            return None
+        try:
+            return int(parts[0]), parts[1], fmt
+        except ValueError:
+            return None
+
+    def parse_lines(self, lines):
+        """Parse line protocol records into column lists.
+
+        Missing timestamps are left as NaN so that each reading is stamped
+        with its own server time when written; malformed lines are counted
+        and skipped.
+        """
+        sensor_ids = []
+        timestamps = []
+        values = []
+
+        for line in lines:
+            fields = line.split()
+            if not fields:
+                continue
+            try:
+                sensor_id = int(fields[0])
+                value = float(fields[1])
+                timestamp = float(fields[2]) if len(fields) == 3 else math.nan
+                if len(fields) > 3:
+                    raise ValueError
+            except (ValueError, IndexError):
+                self.stats.malformed += 1
+                continue
+            sensor_ids.append(sensor_id)
+            timestamps.append(timestamp)
+            values.append(value)
+
+        return sensor_ids, timestamps, values
+
+    def parse_records(self, payload):
+        """Parse packed binary records into column lists.
+
+        Timestamps of 0 are kept; they are replaced by the server time per
+        reading when written.
+        """
+        usable = len(payload) - len(payload) % RECORD_DTYPE.itemsize
+        if usable != len(payload):
+            self.stats.malformed += 1
+        records = np.frombuffer(payload[:usable], dtype=RECORD_DTYPE)
+
+        return (
+            records['sensor_id'].tolist(),
+            records['timestamp'].astype(np.float64).tolist(),
+            records['value'].astype(np.float64).tolist()
+        )
+
+    def handle_datagram(self, data):
+        """Authenticate and queue one UDP datagram."""
+        self.stats.messages += 1
+
+        header, _, body = data.partition(b'\n')
+        parsed = self.parse_header(header.decode('ascii', 'replace'))
+        if parsed is None:
+            self.stats.malformed += 1
+            return
+
+        device_id, key, fmt = parsed
+        farm_id = self.auth.verify(device_id, key)
+        if farm_id is None:
+            self.stats.auth_failures += 1
+            return
+
+        if fmt == FORMAT_BINARY:
+            columns = self.parse_records(body)
+        else:
+            columns = self.parse_lines(body.decode('ascii', 'replace').splitlines())
+
+        if columns[0] and not self.batcher.add(farm_id, *columns):
+            # UDP has no flow control: shed load instead of buffering forever
+            self.stats.dropped += len(columns[0])
+
+    async def handle_tcp(self, reader, writer):
+        """Authenticate a TCP connection and stream its records."""
+        try:
+            header = await asyncio.wait_for(reader.readline(), timeout=10)
+            parts = header.decode('ascii', 'replace').split(maxsplit=1)
+            parsed = self.parse_header(parts[1]) if len(parts) == 2 and parts[0] == 'AUTH' else None
+            if parsed is None:
+                writer.write(b'ERR expected AUTH <device_id> <key> [line|bin]\n')
+                return
+
+            device_id, key, fmt = parsed
+            farm_id = await self.auth.verify_async(device_id, key)
+            if farm_id is None:
+                self.stats.auth_failures += 1
+                writer.write(b'ERR unauthorized\n')
+                return
+
+            writer.write(b'OK\n')
+            await writer.drain()
+
+            if fmt == FORMAT_BINARY:
+                await self._stream_records(reader, farm_id)
+            else:
+                await self._stream_lines(reader, farm_id)
+
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error handling TCP connection: {e}")
+        finally:
+            writer.close()
+
+    async def _stream_lines(self, reader, farm_id):
+        pending = b''
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                # The last line may end without a newline
+                if pending:
+                    await self._queue_lines(farm_id, pending)
+                return
+            pending += chunk
+
+            # Parse complete lines now; keep a trailing partial line for the next read
+            end = pending.rfind(b'\n') + 1
+            if end:
+                await self._queue_lines(farm_id, pending[:end])
+                pending = pending[end:]
+            if len(pending) > MAX_LINE_LENGTH:
+                self.stats.malformed += 1
+                logger.warning(
+                    f"Dropping connection of farm {farm_id}: line longer than {MAX_LINE_LENGTH} bytes"
+                )
+                return
+
+    async def _queue_lines(self, farm_id, data):
+        lines = data.decode('ascii', 'replace').splitlines()
+        self.stats.messages += len(lines)
+        await self._queue(farm_id, self.parse_lines(lines))
+
+    async def _stream_records(self, reader, farm_id):
+        pending = b''
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            pending += chunk
+            usable = len(pending) - len(pending) % RECORD_DTYPE.itemsize
+            if usable:
+                self.stats.messages += 1
+                await self._queue(farm_id, self.parse_records(pending[:usable]))
+                pending = pending[usable:]
+
+    async def _queue(self, farm_id, columns):
+        # TCP applies backpressure: stop reading until a flush frees room
+        while columns[0] and not self.batcher.add(farm_id, *columns):
+            await self.batcher.wait_for_room()
+
+    async def report_stats(self, interval=10):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Gateway stats: {self.stats.snapshot()}")
+
+
+class UDPProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint forwarding every packet to the gateway."""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        try:
+            self.gateway.handle_datagram(data)
+        except Exception as e:
+            logger.error(f"Error handling datagram from {addr}: {e}")
+
+
+async def main(host=None, tcp_port=None, udp_port=None):
+    """Start the ingestion gateway."""
+    from app import create_app
+
+    # The gateway only writes readings, so it keeps no hot window, and it
+    # batches and applies backpressure itself, so it bypasses the write-behind
+    # buffer whose flushes it could not see
+    app = create_app(HOT_WINDOW_ENABLED=False, INGEST_BUFFER_ENABLED=False)
+    host = host or app.config['GATEWAY_HOST']
+    tcp_port = tcp_port or app.config['GATEWAY_TCP_PORT']
+    udp_port = udp_port or app.config['GATEWAY_UDP_PORT']
+
+    gateway = IngestGateway(app)
+    await gateway.start(host, tcp_port, udp_port)
+    logger.info(f"Ingest gateway listening on tcp://{host}:{tcp_port} and udp://{host}:{udp_port}")
+
+    try:
+        await gateway.report_stats()
+    finally:
+        await gateway.stop()
+        logger.info(f"Ingest gateway stopped: {gateway.stats.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='HydroAI TCP/UDP ingestion gateway')
+    parser.add_argument('--host', help='Address to listen on')
+    parser.add_argument('--tcp-port', type=int, help='TCP port')
+    parser.add_argument('--udp-port', type=int, help='UDP port')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.host, args.tcp_port, args.udp_port))
+    except KeyboardInterrupt:
+        logger.info("Ingest gateway stopped")
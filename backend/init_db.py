@@ -4,7 +4,8 @@
 import os
 import sys
 from app import create_app
-from models import db, User, Farm, Sensor, SensorReading, Recommendation, Alert
+from models import db, User, Farm, Sensor, Recommendation, Alert
+from services.partitions import readings_source
 from seed_demo_data import seed_demo_data
 from datetime import datetime, timezone
 
@@ -52,7 +53,7 @@ def init_database(drop_existing=False):
             print(f"   Users: {User.query.count()}")
             print(f"   Farms: {Farm.query.count()}")
             print(f"   Sensors: {Sensor.query.count()}")
-            print(f"   Readings: {SensorReading.query.count()}")
+            print(f"   Readings: {db.session.query(readings_source()).count()}")
             print(f"   Recommendations: {Recommendation.query.count()}")
             print(f"   Alerts: {Alert.query.count()}")
             
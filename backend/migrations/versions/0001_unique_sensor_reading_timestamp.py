@@ -0,0 +1,39 @@
+"""Unique (sensor_id, timestamp) index on sensor_readings
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {index['name'] for index in inspector.get_indexes('sensor_readings')}
+    if 'uq_sensor_readings_sensor_timestamp' in existing:
+        return
+
+    # Drop duplicates left by retried uploads, keeping the first copy
+    op.execute(
+        'DELETE FROM sensor_readings WHERE id NOT IN ('
+        'SELECT MIN(id) FROM sensor_readings GROUP BY sensor_id, timestamp)'
+    )
+    op.create_index(
+        'uq_sensor_readings_sensor_timestamp',
+        'sensor_readings',
+        ['sensor_id', 'timestamp'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_sensor_readings_sensor_timestamp', table_name='sensor_readings')
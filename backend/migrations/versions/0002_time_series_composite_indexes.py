@@ -0,0 +1,41 @@
+"""Composite indexes for farm time-series and alert queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    existing = {index['name'] for index in inspector.get_indexes('sensor_readings')}
+    if 'ix_sensor_readings_farm_timestamp' not in existing:
+        op.create_index(
+            'ix_sensor_readings_farm_timestamp',
+            'sensor_readings',
+            ['farm_id', sa.text('timestamp DESC')]
+        )
+
+    existing = {index['name'] for index in inspector.get_indexes('alerts')}
+    if 'ix_alerts_farm_resolved_created' not in existing:
+        op.create_index(
+            'ix_alerts_farm_resolved_created',
+            'alerts',
+            ['farm_id', 'is_resolved', 'created_at']
+        )
+
+
+def downgrade():
+    op.drop_index('ix_alerts_farm_resolved_created', table_name='alerts')
+    op.drop_index('ix_sensor_readings_farm_timestamp', table_name='sensor_readings')
@@ -0,0 +1,150 @@
+"""Partition sensor_readings by month
+
+On PostgreSQL the table is rebuilt as a range-partitioned table with one
+partition per month of existing data, the next few months and a default
+partition. The primary key becomes (id, timestamp), as PostgreSQL requires
+the partition key in every unique constraint. On SQLite the table is
+rebuilt with AUTOINCREMENT so ids stay unique once rows are moved into
+period tables.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment, months):
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def is_partitioned(bind):
+    return bool(bind.execute(sa.text(
+        'SELECT 1 FROM pg_partitioned_table '
+        'JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid '
+        "WHERE pg_class.relname = 'sensor_readings'"
+    )).scalar())
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        upgrade_postgresql(bind)
+    elif bind.dialect.name == 'sqlite':
+        upgrade_sqlite(bind)
+
+
+def upgrade_postgresql(bind):
+    if is_partitioned(bind):
+        return
+
+    op.execute('ALTER TABLE sensor_readings RENAME TO sensor_readings_unpartitioned')
+    op.execute('ALTER TABLE sensor_readings_unpartitioned DROP CONSTRAINT sensor_readings_pkey')
+    op.execute('DROP INDEX IF EXISTS ix_sensor_readings_timestamp')
+    op.execute('DROP INDEX IF EXISTS ix_sensor_readings_farm_timestamp')
+    op.execute('DROP INDEX IF EXISTS uq_sensor_readings_sensor_timestamp')
+    # Keep the id sequence alive when the old table is dropped
+    op.execute('ALTER SEQUENCE sensor_readings_id_seq OWNED BY NONE')
+
+    op.execute("""
+        CREATE TABLE sensor_readings (
+            id INTEGER NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+            value DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            sensor_id INTEGER NOT NULL REFERENCES sensors (id),
+            farm_id INTEGER NOT NULL REFERENCES farms (id),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute('ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id')
+    op.execute('CREATE INDEX ix_sensor_readings_timestamp ON sensor_readings (timestamp)')
+    op.execute('CREATE INDEX ix_sensor_readings_farm_timestamp ON sensor_readings (farm_id, timestamp DESC)')
+    op.execute('CREATE UNIQUE INDEX uq_sensor_readings_sensor_timestamp ON sensor_readings (sensor_id, timestamp)')
+    op.execute('CREATE TABLE sensor_readings_default PARTITION OF sensor_readings DEFAULT')
+
+    oldest = bind.execute(sa.text('SELECT MIN(timestamp) FROM sensor_readings_unpartitioned')).scalar()
+    current = month_start(datetime.utcnow())
+    start = month_start(oldest) if oldest and oldest < current else current
+    last = add_months(current, MONTHS_AHEAD)
+    while start <= last:
+        end = add_months(start, 1)
+        op.execute(
+            f'CREATE TABLE sensor_readings_p{start:%Y%m} PARTITION OF sensor_readings '
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        start = end
+
+    op.execute(
+        'INSERT INTO sensor_readings (id, value, timestamp, sensor_id, farm_id) '
+        'SELECT id, value, timestamp, sensor_id, farm_id FROM sensor_readings_unpartitioned'
+    )
+    op.execute('DROP TABLE sensor_readings_unpartitioned')
+
+
+def upgrade_sqlite(bind):
+    sql = bind.execute(sa.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'sensor_readings'"
+    )).scalar()
+    if 'AUTOINCREMENT' in (sql or '').upper():
+        return
+
+    with op.batch_alter_table(
+        'sensor_readings', recreate='always', table_kwargs={'sqlite_autoincrement': True}
+    ):
+        pass
+
+    # Reflection loses the DESC ordering, so rebuild that index as declared
+    op.drop_index('ix_sensor_readings_farm_timestamp', table_name='sensor_readings')
+    op.create_index(
+        'ix_sensor_readings_farm_timestamp',
+        'sensor_readings',
+        ['farm_id', sa.text('timestamp DESC')]
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not is_partitioned(bind):
+        return
+
+    op.execute('ALTER TABLE sensor_readings RENAME TO sensor_readings_partitioned')
+    op.execute('ALTER SEQUENCE sensor_readings_id_seq OWNED BY NONE')
+    op.execute('DROP INDEX IF EXISTS ix_sensor_readings_timestamp')
+    op.execute('DROP INDEX IF EXISTS ix_sensor_readings_farm_timestamp')
+    op.execute('DROP INDEX IF EXISTS uq_sensor_readings_sensor_timestamp')
+    op.execute("""
+        CREATE TABLE sensor_readings (
+            id INTEGER NOT NULL DEFAULT nextval('sensor_readings_id_seq') PRIMARY KEY,
+            value DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            sensor_id INTEGER NOT NULL REFERENCES sensors (id),
+            farm_id INTEGER NOT NULL REFERENCES farms (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE sensor_readings_id_seq OWNED BY sensor_readings.id')
+    op.execute(
+        'INSERT INTO sensor_readings (id, value, timestamp, sensor_id, farm_id) '
+        'SELECT id, value, timestamp, sensor_id, farm_id FROM sensor_readings_partitioned'
+    )
+    op.execute('DROP TABLE sensor_readings_partitioned CASCADE')
+    op.execute('CREATE INDEX ix_sensor_readings_timestamp ON sensor_readings (timestamp)')
+    op.execute('CREATE INDEX ix_sensor_readings_farm_timestamp ON sensor_readings (farm_id, timestamp DESC)')
+    op.execute('CREATE UNIQUE INDEX uq_sensor_readings_sensor_timestamp ON sensor_readings (sensor_id, timestamp)')
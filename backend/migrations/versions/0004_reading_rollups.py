@@ -0,0 +1,48 @@
+"""Reading rollups at 1 minute, 1 hour and 1 day
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('reading_rollups'):
+        return
+
+    op.create_table(
+        'reading_rollups',
+        sa.Column('sensor_id', sa.Integer(), sa.ForeignKey('sensors.id'), nullable=False),
+        sa.Column('resolution', sa.String(length=4), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+        sa.Column('reading_count', sa.Integer(), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=False),
+        sa.Column('max_value', sa.Float(), nullable=False),
+        sa.Column('sum_value', sa.Float(), nullable=False),
+        sa.Column('sum_squares', sa.Float(), nullable=False),
+        sa.Column('last_value', sa.Float(), nullable=False),
+        sa.Column('last_timestamp', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('sensor_id', 'resolution', 'bucket_start')
+    )
+    op.create_index(
+        'ix_reading_rollups_farm_resolution_bucket',
+        'reading_rollups',
+        ['farm_id', 'resolution', 'bucket_start']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_reading_rollups_farm_resolution_bucket', table_name='reading_rollups')
+    op.drop_table('reading_rollups')
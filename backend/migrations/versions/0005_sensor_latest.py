@@ -0,0 +1,70 @@
+"""Latest reading per sensor
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def readings_tables(bind):
+    """Tables holding readings: the parent table, plus SQLite period tables."""
+    if bind.dialect.name != 'sqlite':
+        return ['sensor_readings']
+    return ['sensor_readings'] + list(bind.execute(sa.text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sensor_readings_p%'"
+    )).scalars())
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('sensor_latest'):
+        op.create_table(
+            'sensor_latest',
+            sa.Column('sensor_id', sa.Integer(), sa.ForeignKey('sensors.id'), nullable=False),
+            sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+            sa.Column('value', sa.Float(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.Column('status', sa.String(length=10), nullable=False),
+            sa.PrimaryKeyConstraint('sensor_id')
+        )
+        op.create_index('ix_sensor_latest_farm_id', 'sensor_latest', ['farm_id'])
+
+    if bind.execute(sa.text('SELECT 1 FROM sensor_latest LIMIT 1')).scalar():
+        return
+
+    readings = ' UNION ALL '.join(
+        f'SELECT sensor_id, farm_id, value, timestamp FROM {table}' for table in readings_tables(bind)
+    )
+    op.execute(f"""
+        INSERT INTO sensor_latest (sensor_id, farm_id, value, timestamp, status)
+        SELECT ranked.sensor_id, ranked.farm_id, ranked.value, ranked.timestamp,
+            CASE
+                WHEN ranked.value < sensors.min_threshold THEN 'low'
+                WHEN ranked.value > sensors.max_threshold THEN 'high'
+                ELSE 'normal'
+            END
+        FROM (
+            SELECT readings.*, ROW_NUMBER() OVER (
+                PARTITION BY sensor_id ORDER BY timestamp DESC
+            ) AS rank
+            FROM ({readings}) AS readings
+        ) AS ranked
+        JOIN sensors ON sensors.id = ranked.sensor_id
+        WHERE ranked.rank = 1
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_sensor_latest_farm_id', table_name='sensor_latest')
+    op.drop_table('sensor_latest')
@@ -0,0 +1,42 @@
+"""Compressed reading archive blocks
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('reading_archive_blocks'):
+        return
+
+    op.create_table(
+        'reading_archive_blocks',
+        sa.Column('sensor_id', sa.Integer(), sa.ForeignKey('sensors.id'), nullable=False),
+        sa.Column('day', sa.DateTime(), nullable=False),
+        sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+        sa.Column('reading_count', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('sensor_id', 'day')
+    )
+    op.create_index(
+        'ix_reading_archive_blocks_farm_day',
+        'reading_archive_blocks',
+        ['farm_id', 'day']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_reading_archive_blocks_farm_day', table_name='reading_archive_blocks')
+    op.drop_table('reading_archive_blocks')
@@ -0,0 +1,33 @@
+"""Indexes on farms.user_id and sensors.farm_id
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    existing = {index['name'] for index in inspector.get_indexes('farms')}
+    if 'ix_farms_user_id' not in existing:
+        op.create_index('ix_farms_user_id', 'farms', ['user_id'])
+
+    existing = {index['name'] for index in inspector.get_indexes('sensors')}
+    if 'ix_sensors_farm_id' not in existing:
+        op.create_index('ix_sensors_farm_id', 'sensors', ['farm_id'])
+
+
+def downgrade():
+    op.drop_index('ix_sensors_farm_id', table_name='sensors')
+    op.drop_index('ix_farms_user_id', table_name='farms')
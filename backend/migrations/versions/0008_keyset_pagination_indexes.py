@@ -0,0 +1,37 @@
+"""Indexes matching the keyset pagination order of alerts and recommendations
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    existing = {index['name'] for index in inspector.get_indexes('alerts')}
+    if 'ix_alerts_farm_created_id' not in existing:
+        op.create_index('ix_alerts_farm_created_id', 'alerts', ['farm_id', 'created_at', 'id'])
+
+    existing = {index['name'] for index in inspector.get_indexes('recommendations')}
+    if 'ix_recommendations_farm_priority_created_id' not in existing:
+        op.create_index(
+            'ix_recommendations_farm_priority_created_id',
+            'recommendations',
+            ['farm_id', 'priority', 'created_at', 'id']
+        )
+
+
+def downgrade():
+    op.drop_index('ix_recommendations_farm_priority_created_id', table_name='recommendations')
+    op.drop_index('ix_alerts_farm_created_id', table_name='alerts')
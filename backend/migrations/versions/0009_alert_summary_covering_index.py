@@ -0,0 +1,32 @@
+"""Covering index for the alert summary counts
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    existing = {index['name'] for index in inspector.get_indexes('alerts')}
+    if 'ix_alerts_farm_summary' not in existing:
+        op.create_index(
+            'ix_alerts_farm_summary',
+            'alerts',
+            ['farm_id', 'is_resolved', 'is_read', 'severity', 'created_at']
+        )
+
+
+def downgrade():
+    op.drop_index('ix_alerts_farm_summary', table_name='alerts')
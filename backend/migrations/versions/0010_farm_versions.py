@@ -0,0 +1,35 @@
+"""Per-farm version stamps for conditional GET
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('farm_versions'):
+        op.create_table(
+            'farm_versions',
+            sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+            sa.Column('readings_version', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('alerts_version', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('metadata_version', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('farm_id')
+        )
+
+
+def downgrade():
+    op.drop_table('farm_versions')
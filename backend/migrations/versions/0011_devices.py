@@ -0,0 +1,45 @@
+"""Devices allowed to push readings to the ingest gateway
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('devices'):
+        op.create_table(
+            'devices',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('key_hash', sa.String(length=64), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    # A table made by create_all before this migration may lack the key index
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('devices')}
+    if 'ix_devices_farm_id' not in existing:
+        op.create_index('ix_devices_farm_id', 'devices', ['farm_id'])
+    if 'ix_devices_key_hash' not in existing:
+        op.create_index('ix_devices_key_hash', 'devices', ['key_hash'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_devices_key_hash', table_name='devices')
+    op.drop_index('ix_devices_farm_id', table_name='devices')
+    op.drop_table('devices')
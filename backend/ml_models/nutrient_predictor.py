@@ -7,6 +7,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Newest readings per sensor type the rules look at
+RECENT_READINGS = 10
+
 
 class NutrientPredictor:
     """AI-powered nutrient recommendation system using rule-based logic.
@@ -177,7 +180,7 @@ class NutrientPredictor:
             return 0.6  # Low confidence with limited data
         
         # Calculate variance to assess data stability
-        values = [r['value'] for r in readings[:10]]  # Last 10 readings
+        values = [r['value'] for r in readings[:RECENT_READINGS]]
         variance = np.var(values) if len(values) > 1 else 0
         
         # Higher variance = lower confidence
@@ -1,5 +1,7 @@
 """SQLAlchemy models for HydroAI application."""
 
+import hashlib
+import hmac
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -63,7 +65,7 @@ class Farm(db.Model):
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
     # Foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Relationships
     sensors = db.relationship('Sensor', backref='farm', lazy=True, cascade='all, delete-orphan')
@@ -71,8 +73,24 @@ class Farm(db.Model):
     recommendations = db.relationship('Recommendation', backref='farm', lazy=True)
     alerts = db.relationship('Alert', backref='farm', lazy=True)
     
-    def to_dict(self):
-        """Convert farm to dictionary for JSON serialization."""
+    @classmethod
+    def sensor_count_subquery(cls):
+        """Correlated count of a farm's sensors, to select alongside farms."""
+        return db.select(db.func.count(Sensor.id)).where(
+            Sensor.farm_id == cls.id
+        ).correlate(cls).scalar_subquery()
+    
+    def to_dict(self, sensor_count=None):
+        """Convert farm to dictionary for JSON serialization.
+        
+        Args:
+            sensor_count: Number of sensors, e.g. selected with
+                :meth:`sensor_count_subquery`; counted in SQL if omitted
+        """
+        if sensor_count is None:
+            sensor_count = db.session.scalar(
+                db.select(db.func.count(Sensor.id)).where(Sensor.farm_id == self.id)
+            )
         return {
             'id': self.id,
             'name': self.name,
@@ -82,7 +100,7 @@ class Farm(db.Model):
             'farm_type': self.farm_type,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'sensor_count': len(self.sensors)
+            'sensor_count': sensor_count
         }
 
 
@@ -101,7 +119,7 @@ class Sensor(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     
     # Foreign keys
-    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False)
+    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False, index=True)
     
     # Relationships
     readings = db.relationship('SensorReading', backref='sensor', lazy=True)
@@ -120,8 +138,58 @@ class Sensor(db.Model):
         }
 
 
+class Device(db.Model):
+    """IoT device or gateway allowed to push readings to the ingest gateway."""
+    
+    __tablename__ = 'devices'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    key_hash = db.Column(db.String(64), nullable=False, unique=True, index=True)  # SHA-256 hex of the device key
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    
+    # Foreign keys
+    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False, index=True)
+    
+    # Relationships
+    farm = db.relationship('Farm', backref=db.backref('devices', lazy=True))
+    
+    @staticmethod
+    def hash_key(key):
+        """Hash a device key for storage and comparison.
+        
+        Device keys are long random tokens rather than user passwords, so a
+        fast digest is enough and keeps per-message authentication cheap.
+        """
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def set_key(self, key):
+        """Hash and set the device key."""
+        self.key_hash = self.hash_key(key)
+    
+    def check_key(self, key):
+        """Check if provided key matches the stored hash."""
+        return hmac.compare_digest(self.key_hash, self.hash_key(key))
+    
+    def to_dict(self):
+        """Convert device to dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'farm_id': self.farm_id
+        }
+
+
 class SensorReading(db.Model):
-    """Sensor reading model for storing time-series data."""
+    """Sensor reading model for storing time-series data.
+    
+    Stored partitioned by month; see services.partitions. Range queries
+    should go through ``readings_source`` to also see archived months on
+    SQLite.
+    """
     
     __tablename__ = 'sensor_readings'
     
@@ -133,19 +201,132 @@ class SensorReading(db.Model):
     sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), nullable=False)
     farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False)
     
-    def to_dict(self):
-        """Convert reading to dictionary for JSON serialization."""
+    __table_args__ = (
+        # One reading per sensor per instant: makes retried uploads idempotent
+        # Also serves per-sensor "latest first" queries via a backward scan
+        db.Index('uq_sensor_readings_sensor_timestamp', 'sensor_id', 'timestamp', unique=True),
+        db.Index('ix_sensor_readings_farm_timestamp', 'farm_id', db.desc('timestamp')),
+        # Rows move between period tables on SQLite, so ids must never be reused
+        {'sqlite_autoincrement': True},
+    )
+    
+    def to_dict(self, sensor=None):
+        """Convert reading to dictionary for JSON serialization.
+        
+        Args:
+            sensor: Optional sensor (or cached sensor metadata) to describe the
+                reading with instead of loading the relationship
+        """
+        sensor = sensor or self.sensor
         return {
             'id': self.id,
             'value': self.value,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'sensor_id': self.sensor_id,
-            'sensor_name': self.sensor.name if self.sensor else None,
-            'sensor_type': self.sensor.sensor_type if self.sensor else None,
-            'unit': self.sensor.unit if self.sensor else None
+            'sensor_name': sensor.name if sensor else None,
+            'sensor_type': sensor.sensor_type if sensor else None,
+            'unit': sensor.unit if sensor else None
+        }
+
+
+class ReadingRollup(db.Model):
+    """Per-sensor reading statistics for one time bucket (1m, 1h or 1d).
+    
+    Maintained incrementally by services.rollups as readings are stored.
+    """
+    
+    __tablename__ = 'reading_rollups'
+    
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), primary_key=True)
+    resolution = db.Column(db.String(4), primary_key=True)  # 1m, 1h, 1d
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False)
+    
+    reading_count = db.Column(db.Integer, nullable=False)
+    min_value = db.Column(db.Float, nullable=False)
+    max_value = db.Column(db.Float, nullable=False)
+    sum_value = db.Column(db.Float, nullable=False)
+    sum_squares = db.Column(db.Float, nullable=False)
+    last_value = db.Column(db.Float, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_reading_rollups_farm_resolution_bucket', 'farm_id', 'resolution', 'bucket_start'),
+    )
+    
+    def to_dict(self, sensor=None):
+        """Convert rollup to dictionary for JSON serialization."""
+        mean = self.sum_value / self.reading_count
+        variance = max(self.sum_squares / self.reading_count - mean * mean, 0.0)
+        return {
+            'sensor_id': self.sensor_id,
+            'sensor_name': sensor.name if sensor else None,
+            'sensor_type': sensor.sensor_type if sensor else None,
+            'unit': sensor.unit if sensor else None,
+            'timestamp': self.bucket_start.isoformat(),
+            'count': self.reading_count,
+            'min': self.min_value,
+            'max': self.max_value,
+            'avg': mean,
+            'stddev': variance ** 0.5,
+            'last': self.last_value
         }
 
 
+class ReadingArchiveBlock(db.Model):
+    """One sensor's readings for one UTC day, compressed.
+
+    Written by services.archive when readings age out of the raw table;
+    ``data`` is decoded with services.archive_codec.
+    """
+
+    __tablename__ = 'reading_archive_blocks'
+
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), primary_key=True)
+    day = db.Column(db.DateTime, primary_key=True)
+    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False)
+    reading_count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_reading_archive_blocks_farm_day', 'farm_id', 'day'),
+    )
+
+
+class SensorLatest(db.Model):
+    """Latest reading of each sensor and its threshold status.
+
+    Upserted by services.sensor_latest as readings are stored, so dashboard
+    summaries need no per-sensor reading queries.
+    """
+
+    __tablename__ = 'sensor_latest'
+
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'), primary_key=True)
+    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False, index=True)
+    value = db.Column(db.Float, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(10), nullable=False)  # low, normal, high
+
+
+class FarmVersion(db.Model):
+    """Per-farm version stamps used as HTTP validators.
+
+    Maintained by services.versions: ``readings_version`` is bumped in the
+    transaction that stores readings, ``alerts_version`` when alerts change
+    and ``metadata_version`` when the farm or its sensors change. A farm
+    without a row has never changed since versions were introduced.
+    """
+
+    __tablename__ = 'farm_versions'
+
+    farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), primary_key=True)
+    readings_version = db.Column(db.BigInteger, nullable=False, default=0)
+    alerts_version = db.Column(db.BigInteger, nullable=False, default=0)
+    metadata_version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
 class Recommendation(db.Model):
     """AI-generated recommendations for farm optimization."""
     
@@ -163,6 +344,11 @@ class Recommendation(db.Model):
     # Foreign keys
     farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False)
     
+    __table_args__ = (
+        # Listing order, so keyset pages are index range scans
+        db.Index('ix_recommendations_farm_priority_created_id', 'farm_id', 'priority', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         """Convert recommendation to dictionary for JSON serialization."""
         return {
@@ -197,6 +383,13 @@ class Alert(db.Model):
     farm_id = db.Column(db.Integer, db.ForeignKey('farms.id'), nullable=False)
     sensor_id = db.Column(db.Integer, db.ForeignKey('sensors.id'))  # Optional: specific sensor
     
+    __table_args__ = (
+        db.Index('ix_alerts_farm_resolved_created', 'farm_id', 'is_resolved', 'created_at'),
+        db.Index('ix_alerts_farm_created_id', 'farm_id', 'created_at', 'id'),
+        # Every column the summary counts read, so they never visit the table
+        db.Index('ix_alerts_farm_summary', 'farm_id', 'is_resolved', 'is_read', 'severity', 'created_at'),
+    )
+    
     def to_dict(self):
         """Convert alert to dictionary for JSON serialization."""
         return {
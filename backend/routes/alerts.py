@@ -1,11 +1,15 @@
 """Alert management routes for HydroAI API."""
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from models import Alert, Farm
 from datetime import datetime, timedelta
+import time
 from sqlalchemy import desc
+from services.alert_counters import alert_counters
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
+from services.versions import farm_versions, not_modified, stamps, version_tag, with_validators
 
 alerts_bp = Blueprint('alerts', __name__)
 
@@ -13,7 +17,10 @@ alerts_bp = Blueprint('alerts', __name__)
 @alerts_bp.route('/farms/<int:farm_id>/alerts', methods=['GET'])
 @jwt_required()
 def get_alerts(farm_id):
-    """Get alerts for a specific farm."""
+    """Get alerts for a specific farm, newest first.
+    
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the next page.
+    """
     try:
         user_id = get_jwt_identity()
         
@@ -31,6 +38,7 @@ def get_alerts(farm_id):
         severity = request.args.get('severity')
         days = int(request.args.get('days', 7))  # Default last 7 days
         limit = min(int(request.args.get('limit', 50)), 200)
+        cursor = request.args.get('cursor')
         
         # Build query
         query = Alert.query.filter_by(farm_id=farm_id)
@@ -49,15 +57,32 @@ def get_alerts(farm_id):
         if severity:
             query = query.filter_by(severity=severity)
         
-        alerts = query.order_by(desc(Alert.created_at)).limit(limit).all()
+        # Continue after the last alert of the previous page
+        if cursor:
+            query = query.filter(keyset_after(
+                (Alert.created_at, Alert.id), decode_cursor(cursor, datetime, int)
+            ))
+        
+        # Fetch one extra row to know whether another page exists
+        alerts = query.order_by(desc(Alert.created_at), desc(Alert.id)).limit(limit + 1).all()
+        next_cursor = None
+        if len(alerts) > limit:
+            alerts = alerts[:limit]
+            next_cursor = encode_cursor(alerts[-1].created_at, alerts[-1].id)
         
         return jsonify({
             'success': True,
             'data': [alert.to_dict() for alert in alerts],
             'count': len(alerts),
+            'next_cursor': next_cursor,
             'farm_id': farm_id
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -154,35 +179,26 @@ def get_alerts_summary(farm_id):
                 'error': 'Farm not found'
             }), 404
         
-        # Count alerts by status
-        total_alerts = Alert.query.filter_by(farm_id=farm_id).count()
-        unread_alerts = Alert.query.filter_by(farm_id=farm_id, is_read=False).count()
-        unresolved_alerts = Alert.query.filter_by(farm_id=farm_id, is_resolved=False).count()
-        critical_alerts = Alert.query.filter_by(
-            farm_id=farm_id, 
-            severity='critical', 
-            is_resolved=False
-        ).count()
-        
-        # Recent alerts (last 24 hours)
-        yesterday = datetime.utcnow() - timedelta(hours=24)
-        recent_alerts = Alert.query.filter(
-            Alert.farm_id == farm_id,
-            Alert.created_at >= yesterday
-        ).count()
+        # recent_alerts_24h changes as alerts age, so the tag also rolls
+        # over with each counter cache period; no Last-Modified for that reason
+        version = farm_versions([farm_id])[farm_id]
+        period = int(time.time() // current_app.config.get('ALERT_COUNTER_CACHE_TTL', 30))
+        etag = version_tag('alerts-summary', [farm_id, *stamps(version, 'alerts'), period])
+        response = not_modified(etag)
+        if response:
+            return response
         
-        return jsonify({
+        # All counts come from one conditional-aggregation query, or from
+        # the counter cache without touching the alerts table
+        summary = alert_counters.get(farm_id)
+        
+        response = jsonify({
             'success': True,
-            'data': {
-                'total_alerts': total_alerts,
-                'unread_alerts': unread_alerts,
-                'unresolved_alerts': unresolved_alerts,
-                'critical_alerts': critical_alerts,
-                'recent_alerts_24h': recent_alerts
-            },
+            'data': summary,
             'farm_id': farm_id,
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        })
+        return with_validators(response, etag), 200
         
     except Exception as e:
         return jsonify({
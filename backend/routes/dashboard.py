@@ -0,0 +1,97 @@
+"""Dashboard routes for HydroAI API."""
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from models import Alert, Farm, Recommendation
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from services.alert_counters import alert_counters
+from services.sensor_latest import sensor_summaries
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    """Get the dashboard of every farm the user owns in one request.
+
+    Returns each farm with its sensor summary, alert counts, most recent
+    alerts and top open recommendations, as the per-farm
+    ``/readings/summary``, ``/alerts/summary``, ``/alerts`` and
+    ``/recommendations`` endpoints would. The number of queries does not
+    depend on the number of farms.
+    """
+    try:
+        user_id = get_jwt_identity()
+        alerts_per_farm = min(int(request.args.get('alerts', 5)), 20)
+        recommendations_per_farm = min(int(request.args.get('recommendations', 5)), 20)
+
+        # Ownership is checked once for all farms
+        farms = db.session.query(Farm, Farm.sensor_count_subquery()).filter(
+            Farm.user_id == user_id,
+            Farm.is_active == True
+        ).order_by(Farm.id).all()
+        farm_ids = [farm.id for farm, _ in farms]
+
+        summaries = counts = alerts = recommendations = {}
+        if farm_ids:
+            summaries = sensor_summaries(farm_ids)
+            counts = alert_counters.get_many(farm_ids)
+            alerts = top_per_farm(
+                Alert, farm_ids, alerts_per_farm, (Alert.created_at.desc(), Alert.id.desc()),
+                Alert.created_at >= datetime.utcnow() - timedelta(days=7)
+            )
+            recommendations = top_per_farm(
+                Recommendation, farm_ids, recommendations_per_farm,
+                (Recommendation.priority.desc(), Recommendation.created_at.desc(), Recommendation.id.desc()),
+                Recommendation.is_implemented == False
+            )
+
+        data = []
+        for farm, sensor_count in farms:
+            entry = farm.to_dict(sensor_count=sensor_count)
+            entry.update({
+                'readings_summary': summaries[farm.id],
+                'alerts_summary': counts[farm.id],
+                'recent_alerts': [alert.to_dict() for alert in alerts.get(farm.id, [])],
+                'recommendations': [rec.to_dict() for rec in recommendations.get(farm.id, [])]
+            })
+            data.append(entry)
+
+        return jsonify({
+            'success': True,
+            'data': data,
+            'totals': {
+                'farms': len(data),
+                'sensors': sum(entry['sensor_count'] for entry in data),
+                'unresolved_alerts': sum(entry['alerts_summary']['unresolved_alerts'] for entry in data),
+                'critical_alerts': sum(entry['alerts_summary']['critical_alerts'] for entry in data)
+            },
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def top_per_farm(model, farm_ids, limit, order_by, *filters):
+    """Return the first ``limit`` rows of each farm in one ranked query.
+
+    Returns:
+        Dict of farm id to a list of ``model`` instances in ``order_by`` order
+    """
+    rank = func.row_number().over(partition_by=model.farm_id, order_by=order_by).label('rank')
+    ranked = select(model.id, rank).where(model.farm_id.in_(farm_ids), *filters).subquery()
+    rows = db.session.query(model).join(ranked, model.id == ranked.c.id).filter(
+        ranked.c.rank <= limit
+    ).order_by(model.farm_id, ranked.c.rank).all()
+
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.farm_id, []).append(row)
+    return grouped
@@ -0,0 +1,122 @@
+"""Device management routes for HydroAI API."""
+
+import secrets
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Device, Farm
+
+devices_bp = Blueprint('devices', __name__)
+
+
+@devices_bp.route('/farms/<int:farm_id>/devices', methods=['GET'])
+@jwt_required()
+def get_devices(farm_id):
+    """Get devices registered for a farm."""
+    try:
+        user_id = get_jwt_identity()
+        
+        # Verify farm ownership
+        farm = Farm.query.filter_by(id=farm_id, user_id=user_id, is_active=True).first()
+        if not farm:
+            return jsonify({
+                'success': False,
+                'error': 'Farm not found'
+            }), 404
+        
+        devices = Device.query.filter_by(farm_id=farm_id, is_active=True).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [device.to_dict() for device in devices],
+            'count': len(devices),
+            'farm_id': farm_id
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@devices_bp.route('/farms/<int:farm_id>/devices', methods=['POST'])
+@jwt_required()
+def create_device(farm_id):
+    """Register a device for the ingest gateway and issue its key."""
+    try:
+        user_id = get_jwt_identity()
+        
+        # Verify farm ownership
+        farm = Farm.query.filter_by(id=farm_id, user_id=user_id, is_active=True).first()
+        if not farm:
+            return jsonify({
+                'success': False,
+                'error': 'Farm not found'
+            }), 404
+        
+        data = request.get_json() or {}
+        if not data.get('name'):
+            return jsonify({
+                'success': False,
+                'error': 'Device name is required'
+            }), 400
+        
+        key = secrets.token_urlsafe(32)
+        device = Device(name=data['name'], farm_id=farm_id)
+        device.set_key(key)
+        
+        db.session.add(device)
+        db.session.commit()
+        
+        # The key is only ever returned here; only its hash is stored
+        device_data = device.to_dict()
+        device_data['key'] = key
+        
+        return jsonify({
+            'success': True,
+            'data': device_data,
+            'message': 'Device registered successfully'
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@devices_bp.route('/devices/<int:device_id>', methods=['DELETE'])
+@jwt_required()
+def delete_device(device_id):
+    """Revoke a device key."""
+    try:
+        user_id = get_jwt_identity()
+        
+        # Find device and verify ownership
+        device = Device.query.join(Farm).filter(
+            Device.id == device_id,
+            Farm.user_id == user_id
+        ).first()
+        
+        if not device:
+            return jsonify({
+                'success': False,
+                'error': 'Device not found'
+            }), 404
+        
+        device.is_active = False
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Device revoked successfully'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
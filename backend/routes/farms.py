@@ -3,8 +3,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from models import Farm, User, Sensor
+from models import Farm, FarmVersion, User, Sensor
 from datetime import datetime
+from services.versions import not_modified, version_tag, with_validators
 
 farms_bp = Blueprint('farms', __name__)
 
@@ -15,13 +16,33 @@ def get_farms():
     """Get all farms for authenticated user."""
     try:
         user_id = get_jwt_identity()
-        farms = Farm.query.filter_by(user_id=user_id, is_active=True).all()
         
-        return jsonify({
+        # The list only changes with its farms' metadata versions, read in
+        # one narrow query before loading the farms and sensor counts. No
+        # Last-Modified: a farm leaving the list takes its timestamp with it
+        versions = db.session.query(Farm.id, FarmVersion.metadata_version).outerjoin(
+            FarmVersion, FarmVersion.farm_id == Farm.id
+        ).filter(
+            Farm.user_id == user_id,
+            Farm.is_active == True
+        ).order_by(Farm.id).all()
+        etag = version_tag('farms', [(farm_id, version or 0) for farm_id, version in versions])
+        response = not_modified(etag)
+        if response:
+            return response
+        
+        # Sensor counts come from a correlated subquery in the same statement
+        farms = db.session.query(Farm, Farm.sensor_count_subquery()).filter(
+            Farm.user_id == user_id,
+            Farm.is_active == True
+        ).all()
+        
+        response = jsonify({
             'success': True,
-            'data': [farm.to_dict() for farm in farms],
+            'data': [farm.to_dict(sensor_count=sensor_count) for farm, sensor_count in farms],
             'count': len(farms)
-        }), 200
+        })
+        return with_validators(response, etag), 200
         
     except Exception as e:
         return jsonify({
@@ -60,7 +81,7 @@ def create_farm():
         
         return jsonify({
             'success': True,
-            'data': farm.to_dict(),
+            'data': farm.to_dict(sensor_count=0),
             'message': 'Farm created successfully'
         }), 201
         
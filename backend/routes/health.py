@@ -29,6 +29,12 @@ def detailed_health_check():
     except Exception as e:
         db_status = f'error: {str(e)}'
     
+    from services.alert_counters import alert_counters
+    from services.hot_window import hot_window
+    from services.ingest_buffer import reading_buffer
+    from services.ingest_dedup import recent_keys
+    from services.sensor_cache import sensor_cache
+    
     return jsonify({
         'status': 'healthy' if db_status == 'connected' else 'unhealthy',
         'timestamp': datetime.utcnow().isoformat(),
@@ -36,6 +42,11 @@ def detailed_health_check():
         'version': '1.0.0',
         'environment': os.environ.get('FLASK_ENV', 'development'),
         'database': db_status,
+        'sensor_cache': sensor_cache.stats(),
+        'alert_counters': alert_counters.stats(),
+        'ingest_buffer': reading_buffer.stats(),
+        'ingest_dedup': recent_keys.stats(),
+        'hot_window': hot_window.stats(),
         'uptime': 'Not implemented yet'
     }), 200 if db_status == 'connected' else 503
 
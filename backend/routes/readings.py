@@ -1,19 +1,66 @@
 """Sensor readings routes for HydroAI API."""
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from models import SensorReading, Sensor, Farm
+from services.aggregation import aggregate_buckets, parse_functions
+from services.archive import archived_readings, may_be_archived
+from services.cold_storage import cold_readings
+from services.downsampling import MAX_RAW_POINTS, downsample_readings, raw_series
+from services.hot_window import from_epoch_us, hot_window
+from services.ingest_buffer import BufferFullError, reading_buffer
+from services.ingest_codecs import (
+    BINARY_FRAME_MIMETYPE, LINE_PROTOCOL_MIMETYPE, READ_RECORD_DTYPE, DecodeError, decode_payload,
+    encode_binary_frame
+)
+from services.ingest_dedup import recent_keys
+from services.ingest_service import (
+    BatchPayloadError, parse_batch_payload, parse_reading_timestamp, reading_key,
+    exclude_stored, ingest_columns, ingest_readings, submit_readings
+)
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
+from services.partitions import readings_source
+from services.rollups import auto_step, parse_resolution, read_rollups, update_rollups
+from services.sensor_cache import sensor_cache
+from services.sensor_latest import sensor_summaries, update_sensor_latest
+from services.versions import bump_versions, farm_versions, last_modified_of, not_modified, stamps, version_tag, with_validators
 from datetime import datetime, timedelta
 from sqlalchemy import and_, desc
+from sqlalchemy.exc import IntegrityError
+import numpy as np
 
 readings_bp = Blueprint('readings', __name__)
 
+READINGS_FORMATS = ('rows', 'columnar', 'binary')
+
 
 @readings_bp.route('/farms/<int:farm_id>/readings', methods=['GET'])
 @jwt_required()
 def get_readings(farm_id):
-    """Get sensor readings for a specific farm."""
+    """Get sensor readings for a specific farm, newest first.
+    
+    Raw readings are paged: when ``truncated`` is true, pass the returned
+    ``next_cursor`` as ``cursor`` to fetch the next page.
+    
+    With ``resolution`` (e.g. ``5m``, ``1h``, ``1d`` or ``auto``) the readings
+    are returned as per-sensor bucket statistics read from the rollups, so
+    long ranges are not truncated by ``limit``; a range of more than
+    ``MAX_BUCKETS`` buckets per sensor is refused with 400.
+    
+    With ``points`` each sensor's series is downsampled to about that many
+    points for charting, using ``method`` ``lttb`` (default), ``minmax`` or
+    ``avg``.
+    
+    ``format`` selects the representation of raw or downsampled readings:
+    ``rows`` (default) is an object per reading; ``columnar`` returns the
+    whole range, unpaged, as one ``{meta, timestamps, values}`` entry per
+    sensor with epoch-millisecond timestamps; ``binary`` returns the same
+    readings as packed records in the ingest binary layout with a float64
+    value (``READ_RECORD_DTYPE`` in services/ingest_codecs.py), ordered by
+    sensor then timestamp. Unpaged ranges of more than ``MAX_RAW_POINTS``
+    readings are refused with 400; use ``points`` for longer ranges.
+    """
     try:
         user_id = get_jwt_identity()
         
@@ -29,29 +76,296 @@ def get_readings(farm_id):
         sensor_type = request.args.get('sensor_type')
         hours = int(request.args.get('hours', 24))  # Default last 24 hours
         limit = min(int(request.args.get('limit', 100)), 1000)  # Max 1000 readings
-        
-        # Build query
-        query = SensorReading.query.filter_by(farm_id=farm_id)
-        
-        # Filter by time range
+        resolution = request.args.get('resolution')
+        cursor = request.args.get('cursor')
+        points = request.args.get('points')
+        response_format = request.args.get('format', 'rows')
         since = datetime.utcnow() - timedelta(hours=hours)
-        query = query.filter(SensorReading.timestamp >= since)
         
-        # Filter by sensor type if specified
+        if response_format not in READINGS_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Format must be one of {', '.join(READINGS_FORMATS)}"
+            }), 400
+        if resolution:
+            if response_format != 'rows':
+                return jsonify({
+                    'success': False,
+                    'error': 'Format is not supported with resolution'
+                }), 400
+            return get_rollup_readings(farm_id, since, hours, limit, sensor_type, resolution)
+        if points:
+            points = min(int(points), 5000)  # Max 5000 points per sensor
+            method = request.args.get('method', 'lttb')
+            return get_downsampled_readings(farm_id, since, hours, sensor_type, points, method, response_format)
+        if response_format != 'rows':
+            return get_columnar_readings(farm_id, since, hours, sensor_type, response_format)
+        
+        # Sensors are loaded once; readings are serialized from plain columns
+        sensors = Sensor.query.filter_by(farm_id=farm_id)
         if sensor_type:
-            query = query.join(Sensor).filter(Sensor.sensor_type == sensor_type)
+            sensors = sensors.filter_by(sensor_type=sensor_type)
+        sensors = {sensor.id: sensor for sensor in sensors.all()}
+        
+        # Continue after the last reading of the previous page
+        before = decode_cursor(cursor, datetime, int) if cursor else None
+        
+        # Serve recent windows from the in-memory hot window when it covers them
+        readings = None
+        if hot_window.covers(since):
+            readings = hot_window.farm_readings(list(sensors), since, limit + 1, before=before)
+        if readings is None:
+            readings = query_readings(farm_id, since, limit + 1, sensor_type, sensors, before)
         
-        # Order by timestamp and limit
-        readings = query.order_by(desc(SensorReading.timestamp)).limit(limit).all()
+        # One extra reading was fetched to know whether another page exists
+        truncated = len(readings) > limit
+        readings = readings[:limit]
+        next_cursor = encode_cursor(readings[-1][2], readings[-1][1]) if truncated else None
         
         return jsonify({
             'success': True,
-            'data': [reading.to_dict() for reading in readings],
+            'data': [reading_dict(reading, sensors.get(reading[1])) for reading in readings],
             'count': len(readings),
+            'truncated': truncated,
+            'next_cursor': next_cursor,
             'farm_id': farm_id,
             'time_range_hours': hours
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def query_readings(farm_id, since, limit, sensor_type, sensors, before=None):
+    """Read a page of readings from the database, archive and cold storage.
+    
+    Returns:
+        Up to ``limit`` (id, sensor_id, timestamp, value) rows ordered by
+        (timestamp, sensor_id) descending; archived and cold rows have no id
+    """
+    # Build query over the partitions covering the time range
+    Reading = readings_source(since)
+    query = db.session.query(Reading.id, Reading.sensor_id, Reading.timestamp, Reading.value).filter(
+        Reading.farm_id == farm_id,
+        Reading.timestamp >= since
+    )
+    
+    # Filter by sensor type if specified
+    if sensor_type:
+        query = query.join(Sensor, Sensor.id == Reading.sensor_id).filter(Sensor.sensor_type == sensor_type)
+    
+    if before is not None:
+        query = query.filter(keyset_after((Reading.timestamp, Reading.sensor_id), before))
+    
+    readings = query.order_by(desc(Reading.timestamp), desc(Reading.sensor_id)).limit(limit).all()
+    
+    # Older ranges also read the compressed archive and cold storage
+    if may_be_archived(since):
+        sensor_ids = list(sensors) if sensor_type else None
+        end = before[0] + timedelta(microseconds=1) if before is not None else None
+        # Readings sharing the cursor's timestamp are dropped below, at most one per sensor
+        wanted = limit + (len(sensors) if before is not None else 0)
+        archived = archived_readings(
+            since, end, farm_id=farm_id, sensor_ids=sensor_ids, newest_first=True, limit=wanted
+        )
+        if cold_readings.may_cover(since):
+            archived += cold_readings.newest(farm_id, since, wanted, sensor_ids=sensor_ids, end=end)
+        archived = [
+            (None, reading.sensor_id, reading.timestamp, reading.value) for reading in archived
+            if before is None or (reading.timestamp, reading.sensor_id) < before
+        ]
+        if archived:
+            readings = sorted(
+                readings + archived, key=lambda reading: (reading[2], reading[1]), reverse=True
+            )[:limit]
+    
+    return readings
+
+
+def get_rollup_readings(farm_id, since, hours, limit, sensor_type, resolution):
+    """Build the readings response from rollups at the requested resolution."""
+    try:
+        if resolution == 'auto':
+            step = auto_step(hours * 3600, limit)
+        else:
+            step = parse_resolution(resolution)
+        
+        sensors = Sensor.query.filter_by(farm_id=farm_id)
+        if sensor_type:
+            sensors = sensors.filter_by(sensor_type=sensor_type)
+        sensors = {sensor.id: sensor for sensor in sensors.all()}
+        
+        source, rollups = read_rollups(
+            farm_id, since, None, step,
+            sensor_ids=list(sensors) if sensor_type else None
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'data': [rollup.to_dict(sensor=sensors.get(rollup.sensor_id)) for rollup in rollups],
+        'count': len(rollups),
+        'farm_id': farm_id,
+        'time_range_hours': hours,
+        'step_seconds': step,
+        'rollup': source
+    }), 200
+
+
+def get_columnar_readings(farm_id, since, hours, sensor_type, response_format):
+    """Build the readings response as every reading of each sensor in columns."""
+    sensors = Sensor.query.filter_by(farm_id=farm_id)
+    if sensor_type:
+        sensors = sensors.filter_by(sensor_type=sensor_type)
+    sensors = {sensor.id: sensor for sensor in sensors.all()}
+    
+    try:
+        source, series = raw_series(farm_id, since, list(sensors), max_points=MAX_RAW_POINTS)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return columnar_response(
+        sensors, series, response_format,
+        farm_id=farm_id,
+        time_range_hours=hours,
+        source=source
+    )
+
+
+def get_downsampled_readings(farm_id, since, hours, sensor_type, points, method, response_format='rows'):
+    """Build the readings response as one downsampled series per sensor."""
+    if points < 3:
+        return jsonify({
+            'success': False,
+            'error': 'Points must be at least 3'
+        }), 400
+    
+    sensors = Sensor.query.filter_by(farm_id=farm_id)
+    if sensor_type:
+        sensors = sensors.filter_by(sensor_type=sensor_type)
+    sensors = {sensor.id: sensor for sensor in sensors.all()}
+    
+    try:
+        source, step, series = downsample_readings(
+            farm_id, since, list(sensors), method, points,
+            use_rollups=current_app.config.get('READINGS_ROLLUPS_ENABLED', True)
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    if response_format != 'rows':
+        return columnar_response(
+            sensors, series, response_format,
+            farm_id=farm_id,
+            time_range_hours=hours,
+            points=points,
+            method=method,
+            step_seconds=step,
+            source=source
+        )
+    
+    # Columns per sensor instead of an object per reading keep the payload small
+    data = []
+    for sensor_id, (timestamps, values) in sorted(series.items()):
+        sensor = sensors[sensor_id]
+        data.append({
+            'sensor_id': sensor_id,
+            'sensor_name': sensor.name,
+            'sensor_type': sensor.sensor_type,
+            'unit': sensor.unit,
+            'timestamps': [timestamp.isoformat() for timestamp in from_epoch_us(timestamps)],
+            'values': values.tolist()
+        })
+    
+    return jsonify({
+        'success': True,
+        'data': data,
+        'count': sum(len(entry['values']) for entry in data),
+        'farm_id': farm_id,
+        'time_range_hours': hours,
+        'points': points,
+        'method': method,
+        'step_seconds': step,
+        'source': source
+    }), 200
+
+
+@readings_bp.route('/farms/<int:farm_id>/readings/aggregate', methods=['GET'])
+@jwt_required()
+def get_readings_aggregate(farm_id):
+    """Get per-sensor statistics of readings in time buckets.
+    
+    ``bucket`` is a width such as ``15m``, ``1h`` or ``1d`` and ``fn`` a
+    comma-separated list of ``count``, ``sum``, ``avg``, ``min``, ``max``,
+    ``stddev`` and percentiles ``p1`` to ``p99``.
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        # Verify farm ownership
+        farm = Farm.query.filter_by(id=farm_id, user_id=user_id, is_active=True).first()
+        if not farm:
+            return jsonify({
+                'success': False,
+                'error': 'Farm not found'
+            }), 404
+        
+        sensor_type = request.args.get('sensor_type')
+        hours = int(request.args.get('hours', 24))  # Default last 24 hours
+        end = datetime.utcnow()
+        since = end - timedelta(hours=hours)
+        
+        sensors = Sensor.query.filter_by(farm_id=farm_id)
+        if sensor_type:
+            sensors = sensors.filter_by(sensor_type=sensor_type)
+        sensors = {sensor.id: sensor for sensor in sensors.all()}
+        
+        try:
+            step = parse_resolution(request.args.get('bucket', '1h'))
+            functions = parse_functions(request.args.get('fn'))
+            method, rows = aggregate_buckets(
+                farm_id, since, end, step, functions, list(sensors),
+                slice_seconds=current_app.config.get('READINGS_AGGREGATE_SLICE_HOURS', 24) * 3600
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        for row in rows:
+            sensor = sensors[row['sensor_id']]
+            row.update(sensor_name=sensor.name, sensor_type=sensor.sensor_type, unit=sensor.unit)
+        
+        return jsonify({
+            'success': True,
+            'data': rows,
+            'count': len(rows),
+            'farm_id': farm_id,
+            'time_range_hours': hours,
+            'bucket_seconds': step,
+            'functions': functions,
+            'computed_by': method
+        }), 200
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -62,7 +376,12 @@ def get_readings(farm_id):
 @readings_bp.route('/readings', methods=['POST'])
 @jwt_required()
 def create_reading():
-    """Create a new sensor reading (for IoT devices)."""
+    """Create a new sensor reading (for IoT devices).
+    
+    An optional device ``timestamp`` and ``message_id`` make the request
+    idempotent: a retry of an already recorded reading returns 200 without
+    storing it again.
+    """
     try:
         data = request.get_json()
         
@@ -74,7 +393,7 @@ def create_reading():
             }), 400
         
         # Verify sensor exists and get farm_id
-        sensor = Sensor.query.get(data['sensor_id'])
+        sensor = sensor_cache.get(int(data['sensor_id']))
         if not sensor or not sensor.is_active:
             return jsonify({
                 'success': False,
@@ -83,22 +402,88 @@ def create_reading():
         
         # Verify farm ownership
         user_id = get_jwt_identity()
-        if sensor.farm.user_id != user_id:
+        if sensor.user_id != user_id:
             return jsonify({
                 'success': False,
                 'error': 'Unauthorized access to sensor'
             }), 403
         
+        value = float(data['value'])
+        
+        timestamp = None
+        if data.get('timestamp') is not None:
+            try:
+                timestamp = parse_reading_timestamp(data['timestamp'])
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
+        # Drop retries of a reading that was already recorded
+        key = reading_key(sensor.id, timestamp, data.get('message_id'))
+        if recent_keys.claim([key])[0]:
+            return duplicate_reading_response()
+        
         # Create reading
         reading = SensorReading(
-            sensor_id=data['sensor_id'],
+            sensor_id=sensor.id,
             farm_id=sensor.farm_id,
-            value=float(data['value']),
-            timestamp=datetime.utcnow()
+            value=value,
+            timestamp=timestamp or datetime.utcnow()
         )
         
-        db.session.add(reading)
-        db.session.commit()
+        # Write-behind mode: hand the row to the group-commit buffer
+        if reading_buffer.enabled:
+            row = {
+                'sensor_id': reading.sensor_id,
+                'farm_id': reading.farm_id,
+                'value': reading.value,
+                'timestamp': reading.timestamp
+            }
+            stored = submit_readings([row], {sensor.id: sensor}, [key])
+            if stored == []:
+                return duplicate_reading_response()
+            committed = stored is not None
+            return jsonify({
+                'success': True,
+                'data': reading.to_dict(sensor=sensor),
+                'message': 'Reading recorded successfully' if committed else 'Reading accepted for processing'
+            }), 201 if committed else 202
+        
+        try:
+            # The live table's unique index cannot see moved, archived or exported readings
+            if not exclude_stored([{
+                'sensor_id': reading.sensor_id, 'farm_id': reading.farm_id, 'timestamp': reading.timestamp
+            }]):
+                return duplicate_reading_response()
+            db.session.add(reading)
+            db.session.flush()
+            reading_data = reading.to_dict(sensor=sensor)
+            row = {
+                'sensor_id': reading.sensor_id,
+                'farm_id': reading.farm_id,
+                'timestamp': reading.timestamp,
+                'value': reading.value
+            }
+            if current_app.config.get('READINGS_ROLLUPS_ENABLED', True):
+                update_rollups([row])
+            update_sensor_latest([row])
+            bump_versions([reading.farm_id], 'readings')
+            db.session.commit()
+            hot_window.append([{
+                'id': reading.id,
+                'sensor_id': reading.sensor_id,
+                'timestamp': reading.timestamp,
+                'value': reading.value
+            }])
+        except IntegrityError:
+            # Same sensor and timestamp already stored, older than the filter window
+            db.session.rollback()
+            return duplicate_reading_response()
+        except Exception:
+            recent_keys.release([key])
+            raise
         
         # Check if reading triggers any alerts (threshold monitoring)
         from services.alert_service import check_threshold_alerts
@@ -106,7 +491,7 @@ def create_reading():
         
         return jsonify({
             'success': True,
-            'data': reading.to_dict(),
+            'data': reading_data,
             'message': 'Reading recorded successfully'
         }), 201
         
@@ -115,6 +500,8 @@ def create_reading():
             'success': False,
             'error': 'Invalid value format'
         }), 400
+    except BufferFullError as e:
+        return buffer_full_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -123,6 +510,103 @@ def create_reading():
         }), 500
 
 
+@readings_bp.route('/readings/batch', methods=['POST'])
+@jwt_required()
+def create_readings_batch():
+    """Create many sensor readings in one request (for IoT gateways).
+    
+    Accepts JSON, line protocol (text/plain) or packed binary frames
+    (application/octet-stream); see services.ingest_codecs for the formats.
+    """
+    try:
+        if request.mimetype in (LINE_PROTOCOL_MIMETYPE, BINARY_FRAME_MIMETYPE):
+            return create_readings_batch_compact()
+        
+        try:
+            items = parse_batch_payload(request.get_json(silent=True))
+        except BatchPayloadError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        max_batch_size = current_app.config.get('INGEST_MAX_BATCH_SIZE', 5000)
+        if len(items) > max_batch_size:
+            return jsonify({
+                'success': False,
+                'error': f'Batch exceeds maximum size of {max_batch_size} readings'
+            }), 413
+        
+        results, committed = ingest_readings(items, get_jwt_identity())
+        accepted = sum(1 for result in results if 'error' not in result)
+        duplicates = sum(1 for result in results if result['status'] == 'duplicate')
+        
+        if not committed:
+            status_code = 202
+        else:
+            status_code = 201 if accepted == len(results) else 207
+        
+        return jsonify({
+            'success': accepted > 0,
+            'data': results,
+            'accepted': accepted,
+            'rejected': len(results) - accepted,
+            'duplicates': duplicates,
+            'message': f"{'Recorded' if committed else 'Accepted'} {accepted} of {len(results)} readings"
+        }), status_code
+        
+    except BufferFullError as e:
+        return buffer_full_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def create_readings_batch_compact():
+    """Handle a batch sent as line protocol or a packed binary frame."""
+    try:
+        columns = decode_payload(request.mimetype, request.get_data(cache=False))
+    except DecodeError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    total = len(columns.sensor_ids)
+    if not total:
+        return jsonify({
+            'success': False,
+            'error': 'Batch contains no readings'
+        }), 400
+    
+    max_batch_size = current_app.config.get('INGEST_MAX_BATCH_SIZE', 5000)
+    if total > max_batch_size:
+        return jsonify({
+            'success': False,
+            'error': f'Batch exceeds maximum size of {max_batch_size} readings'
+        }), 413
+    
+    accepted, duplicates, rejected, committed = ingest_columns(columns, get_jwt_identity())
+    
+    if not committed:
+        status_code = 202
+    else:
+        status_code = 201 if accepted == total else 207
+    
+    # Only rejected records are listed, to keep responses small for devices
+    return jsonify({
+        'success': accepted > 0,
+        'data': rejected,
+        'accepted': accepted,
+        'rejected': len(rejected),
+        'duplicates': duplicates,
+        'message': f"{'Recorded' if committed else 'Accepted'} {accepted} of {total} readings"
+    }), status_code
+
+
 @readings_bp.route('/farms/<int:farm_id>/readings/summary', methods=['GET'])
 @jwt_required()
 def get_readings_summary(farm_id):
@@ -138,34 +622,24 @@ def get_readings_summary(farm_id):
                 'error': 'Farm not found'
             }), 404
         
-        # Get latest reading for each sensor
-        sensors = Sensor.query.filter_by(farm_id=farm_id, is_active=True).all()
-        summary = []
-        
-        for sensor in sensors:
-            latest_reading = SensorReading.query.filter_by(
-                sensor_id=sensor.id
-            ).order_by(desc(SensorReading.timestamp)).first()
-            
-            if latest_reading:
-                summary.append({
-                    'sensor_id': sensor.id,
-                    'sensor_name': sensor.name,
-                    'sensor_type': sensor.sensor_type,
-                    'unit': sensor.unit,
-                    'current_value': latest_reading.value,
-                    'last_reading': latest_reading.timestamp.isoformat(),
-                    'min_threshold': sensor.min_threshold,
-                    'max_threshold': sensor.max_threshold,
-                    'status': get_sensor_status(latest_reading.value, sensor)
-                })
+        # Unchanged since the client's copy: answer before any summary query
+        version = farm_versions([farm_id])[farm_id]
+        etag = version_tag('readings-summary', [farm_id, *stamps(version, 'readings', 'metadata')])
+        last_modified = last_modified_of([version])
+        response = not_modified(etag, last_modified)
+        if response:
+            return response
         
-        return jsonify({
+        # Latest reading of every active sensor in one indexed join
+        summary = sensor_summaries([farm_id])[farm_id]
+        
+        response = jsonify({
             'success': True,
             'data': summary,
             'farm_id': farm_id,
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        })
+        return with_validators(response, etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
@@ -174,11 +648,82 @@ def get_readings_summary(farm_id):
         }), 500
 
 
-def get_sensor_status(value, sensor):
-    """Determine sensor status based on thresholds."""
-    if sensor.min_threshold is not None and value < sensor.min_threshold:
-        return 'low'
-    elif sensor.max_threshold is not None and value > sensor.max_threshold:
-        return 'high'
-    else:
-        return 'normal'
+def columnar_response(sensors, series, response_format, **fields):
+    """Build a ``columnar`` JSON or ``binary`` frame response from per-sensor columns.
+    
+    Args:
+        sensors: Dict of sensor id to Sensor
+        series: Dict of sensor id to (epoch microsecond array, value array)
+        response_format: ``columnar`` or ``binary``
+        fields: Extra top-level fields of the JSON response
+    """
+    sensor_ids = sorted(series)
+    count = sum(len(series[sensor_id][1]) for sensor_id in sensor_ids)
+    
+    if response_format == 'binary':
+        # Sensor details are not repeated; clients look them up by sensor id
+        empty = [np.empty(0)]
+        response = current_app.response_class(encode_binary_frame(
+            np.concatenate([np.full(len(series[sensor_id][1]), sensor_id) for sensor_id in sensor_ids] or empty),
+            np.concatenate([series[sensor_id][0] for sensor_id in sensor_ids] or empty) / 1e6,
+            np.concatenate([series[sensor_id][1] for sensor_id in sensor_ids] or empty),
+            dtype=READ_RECORD_DTYPE
+        ), mimetype=BINARY_FRAME_MIMETYPE)
+        response.headers['X-Reading-Count'] = str(count)
+        return response, 200
+    
+    data = []
+    for sensor_id in sensor_ids:
+        timestamps, values = series[sensor_id]
+        sensor = sensors[sensor_id]
+        data.append({
+            'meta': {
+                'sensor_id': sensor_id,
+                'sensor_name': sensor.name,
+                'sensor_type': sensor.sensor_type,
+                'unit': sensor.unit
+            },
+            'timestamps': (np.asarray(timestamps) // 1000).tolist(),
+            'values': np.asarray(values).tolist()
+        })
+    
+    return jsonify({
+        'success': True,
+        'format': 'columnar',
+        'data': data,
+        'count': count,
+        **fields
+    }), 200
+
+
+def reading_dict(reading, sensor):
+    """Serialize an (id, sensor_id, timestamp, value) row like SensorReading.to_dict."""
+    reading_id, sensor_id, timestamp, value = reading
+    return {
+        'id': reading_id,
+        'value': value,
+        'timestamp': timestamp.isoformat(),
+        'sensor_id': sensor_id,
+        'sensor_name': sensor.name if sensor else None,
+        'sensor_type': sensor.sensor_type if sensor else None,
+        'unit': sensor.unit if sensor else None
+    }
+
+
+def duplicate_reading_response():
+    """Build the response for a reading that was already recorded."""
+    return jsonify({
+        'success': True,
+        'duplicate': True,
+        'message': 'Reading already recorded'
+    }), 200
+
+
+def buffer_full_response(error):
+    """Build the backpressure response for a full write-behind buffer."""
+    response = jsonify({
+        'success': False,
+        'error': str(error)
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 429
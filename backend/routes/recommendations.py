@@ -3,9 +3,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from models import Recommendation, Farm, SensorReading, Sensor
+from models import Recommendation, Farm, Sensor
 from datetime import datetime, timedelta
-from ml_models.nutrient_predictor import NutrientPredictor
+from ml_models.nutrient_predictor import RECENT_READINGS, NutrientPredictor
+from services.hot_window import hot_window
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
+from services.sensor_latest import latest_readings
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
@@ -13,7 +16,10 @@ recommendations_bp = Blueprint('recommendations', __name__)
 @recommendations_bp.route('/farms/<int:farm_id>/recommendations', methods=['GET'])
 @jwt_required()
 def get_recommendations(farm_id):
-    """Get AI recommendations for a specific farm."""
+    """Get AI recommendations for a specific farm.
+    
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the next page.
+    """
     try:
         user_id = get_jwt_identity()
         
@@ -29,6 +35,7 @@ def get_recommendations(farm_id):
         implemented = request.args.get('implemented')
         priority = request.args.get('priority')
         limit = min(int(request.args.get('limit', 20)), 100)
+        cursor = request.args.get('cursor')
         
         # Build query
         query = Recommendation.query.filter_by(farm_id=farm_id)
@@ -39,18 +46,32 @@ def get_recommendations(farm_id):
         if priority:
             query = query.filter_by(priority=priority)
         
-        recommendations = query.order_by(
-            Recommendation.priority.desc(),
-            Recommendation.created_at.desc()
-        ).limit(limit).all()
+        # Continue after the last recommendation of the previous page
+        sort_key = (Recommendation.priority, Recommendation.created_at, Recommendation.id)
+        if cursor:
+            query = query.filter(keyset_after(sort_key, decode_cursor(cursor, str, datetime, int)))
+        
+        # Fetch one extra row to know whether another page exists
+        recommendations = query.order_by(*[column.desc() for column in sort_key]).limit(limit + 1).all()
+        next_cursor = None
+        if len(recommendations) > limit:
+            recommendations = recommendations[:limit]
+            last = recommendations[-1]
+            next_cursor = encode_cursor(last.priority, last.created_at, last.id)
         
         return jsonify({
             'success': True,
             'data': [rec.to_dict() for rec in recommendations],
             'count': len(recommendations),
+            'next_cursor': next_cursor,
             'farm_id': farm_id
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -156,31 +177,48 @@ def mark_recommendation_implemented(rec_id):
         }), 500
 
 
-def get_recent_sensor_data(farm_id, hours=24):
-    """Get recent sensor readings for ML analysis."""
+def get_recent_sensor_data(farm_id, hours=24, per_type=RECENT_READINGS):
+    """Get the newest readings of each sensor type for ML analysis.
+    
+    Only the ``per_type`` newest values of each type are loaded, as that is
+    all the predictor reads.
+    
+    Returns:
+        Dict of sensor type to ``{'value': ...}`` dicts, newest first
+    """
     since = datetime.utcnow() - timedelta(hours=hours)
+    sensors = {
+        sensor.id: sensor for sensor in Sensor.query.filter_by(farm_id=farm_id, is_active=True)
+    }
+    if not sensors:
+        return {}
+    
+    # (sensor_id, timestamp, value) of each sensor's newest readings
+    latest = None
+    if hot_window.covers(since):
+        latest = []
+        for sensor_id in sensors:
+            selected = hot_window.readings(sensor_id, since)
+            if selected is None:
+                latest = None
+                break
+            _, timestamps, values = selected
+            latest.extend(
+                (sensor_id, timestamp, value)
+                for timestamp, value in zip(timestamps[-per_type:].tolist(), values[-per_type:].tolist())
+            )
     
-    readings = db.session.query(
-        SensorReading.value,
-        SensorReading.timestamp,
-        Sensor.sensor_type,
-        Sensor.unit
-    ).join(Sensor).filter(
-        SensorReading.farm_id == farm_id,
-        SensorReading.timestamp >= since,
-        Sensor.is_active == True
-    ).order_by(SensorReading.timestamp.desc()).all()
+    if latest is None:
+        latest = [
+            (row.sensor_id, row.timestamp, row.value)
+            for row in db.session.execute(latest_readings(per_type, since=since, sensor_ids=list(sensors)))
+        ]
     
-    # Convert to dictionary format for ML model
+    # Several sensors may share a type; keep the newest readings across them
     sensor_data = {}
-    for reading in readings:
-        if reading.sensor_type not in sensor_data:
-            sensor_data[reading.sensor_type] = []
-        
-        sensor_data[reading.sensor_type].append({
-            'value': reading.value,
-            'timestamp': reading.timestamp.isoformat(),
-            'unit': reading.unit
-        })
+    for sensor_id, _, value in sorted(latest, key=lambda reading: reading[1], reverse=True):
+        readings = sensor_data.setdefault(sensors[sensor_id].sensor_type, [])
+        if len(readings) < per_type:
+            readings.append({'value': value})
     
     return sensor_data
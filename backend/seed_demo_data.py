@@ -11,6 +11,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app, db
 from models import User, Farm, Sensor, SensorReading, Recommendation, Alert
+from services.sensor_latest import rebuild_sensor_latest
 
 
 def seed_demo_data():
@@ -137,6 +138,7 @@ def seed_demo_data():
                 db.session.add(reading)
         
         db.session.commit()
+        rebuild_sensor_latest()
         
         # Create demo recommendations
         print("Creating recommendations...")
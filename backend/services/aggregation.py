@@ -0,0 +1,267 @@
+"""Time-bucketed statistics of readings for reports.
+
+Buckets are aligned to the Unix epoch like the rollups. Count, sum, mean,
+minimum, maximum and population standard deviation are computed by the
+database with GROUP BY on a bucket expression (``strftime('%s')`` on
+SQLite, ``extract(epoch)`` on PostgreSQL). Percentiles use
+``percentile_cont`` on PostgreSQL; SQLite has no percentile aggregate, so
+they are computed with NumPy.
+
+The NumPy path loads the range in slices of whole buckets, so memory is
+bounded by the readings of one slice rather than the whole range. It also
+reads the archive and cold storage, which SQL cannot see.
+"""
+
+from datetime import timedelta
+import re
+
+import numpy as np
+from sqlalchemy import BigInteger, cast, func, select
+
+from models import db
+from services.archive import archived_readings, may_be_archived
+from services.cold_storage import cold_readings
+from services.downsampling import columns_of
+from services.hot_window import EPOCH, from_epoch_us, to_epoch_us
+from services.partitions import readings_source, to_naive_utc
+from services.rollups import MAX_BUCKETS
+
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'avg', 'min', 'max', 'stddev')
+PERCENTILE_PATTERN = re.compile(r'^p([1-9][0-9]?)$')
+
+# Partial statistics every group carries; percentiles are added by name
+PARTIAL_COLUMNS = ('count', 'sum', 'sum_squares', 'min', 'max')
+
+
+def parse_functions(spec):
+    """Parse ``avg,min,max,p95`` into a list of function names.
+
+    Raises:
+        ValueError: If a function is unknown
+    """
+    functions = []
+    for name in (spec or 'avg,min,max').lower().split(','):
+        name = name.strip()
+        if name not in AGGREGATE_FUNCTIONS and not PERCENTILE_PATTERN.match(name):
+            raise ValueError(
+                f"Unknown function {name!r}; use {', '.join(AGGREGATE_FUNCTIONS)} or p1 to p99"
+            )
+        if name not in functions:
+            functions.append(name)
+    return functions
+
+
+def percentiles_of(functions):
+    """Percentile function names mapped to their fraction, e.g. ``{'p95': 0.95}``."""
+    return {
+        name: int(PERCENTILE_PATTERN.match(name).group(1)) / 100
+        for name in functions if PERCENTILE_PATTERN.match(name)
+    }
+
+
+def bucket_expression(column, step_seconds, dialect):
+    """SQL expression of the epoch second a timestamp's bucket starts at, or None."""
+    if dialect == 'sqlite':
+        return cast(func.strftime('%s', column), BigInteger) // step_seconds * step_seconds
+    if dialect == 'postgresql':
+        return cast(func.floor(func.extract('epoch', column) / step_seconds), BigInteger) * step_seconds
+    return None
+
+
+def aggregate_buckets(farm_id, start, end, step_seconds, functions, sensor_ids, slice_seconds=86400):
+    """Compute ``functions`` over each sensor's readings per bucket.
+
+    Args:
+        farm_id: Farm to read
+        start: Inclusive start of the range
+        end: Exclusive end of the range
+        step_seconds: Bucket width
+        functions: Names from :func:`parse_functions`
+        sensor_ids: Sensors to include
+        slice_seconds: Range the NumPy path loads at once, rounded up to
+            whole buckets
+
+    Returns:
+        Tuple of (method used, list of dicts with ``sensor_id``,
+        ``timestamp``, ``count`` and one key per function), ordered by
+        sensor and bucket; buckets without readings are omitted
+
+    Raises:
+        ValueError: If the range holds more than :data:`MAX_BUCKETS` buckets
+    """
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if (end - start).total_seconds() / step_seconds > MAX_BUCKETS:
+        raise ValueError(f'Range holds more than {MAX_BUCKETS} buckets; use a wider bucket')
+    if not sensor_ids:
+        return 'sql', []
+
+    percentiles = percentiles_of(functions)
+    archived = may_be_archived(start)
+    dialect = db.session.get_bind().dialect.name
+    pushdown = dialect in ('sqlite', 'postgresql') and (
+        not percentiles or (dialect == 'postgresql' and not archived)
+    )
+
+    if pushdown:
+        method = 'sql'
+        groups = sql_groups(farm_id, start, end, step_seconds, percentiles, sensor_ids, dialect)
+        if archived:
+            # Sealed days are no longer in the readings table
+            groups = combine_groups([groups, numpy_groups(
+                farm_id, start, end, step_seconds, {}, sensor_ids, slice_seconds, include_table=False
+            )])
+    else:
+        method = 'numpy'
+        groups = numpy_groups(farm_id, start, end, step_seconds, percentiles, sensor_ids, slice_seconds)
+
+    return method, group_rows(groups, functions)
+
+
+def sql_groups(farm_id, start, end, step_seconds, percentiles, sensor_ids, dialect):
+    """Partial statistics per (sensor, bucket) computed by the database."""
+    Reading = readings_source(start)
+    bucket = bucket_expression(Reading.timestamp, step_seconds, dialect).label('bucket')
+    columns = [
+        Reading.sensor_id, bucket,
+        func.count(Reading.value), func.sum(Reading.value), func.sum(Reading.value * Reading.value),
+        func.min(Reading.value), func.max(Reading.value)
+    ]
+    columns += [func.percentile_cont(fraction).within_group(Reading.value) for fraction in percentiles.values()]
+    rows = db.session.execute(select(*columns).where(
+        Reading.farm_id == farm_id,
+        Reading.timestamp >= start,
+        Reading.timestamp < end,
+        Reading.sensor_id.in_(sensor_ids)
+    ).group_by(Reading.sensor_id, bucket)).all()
+
+    names = ('sensor_id', 'bucket') + PARTIAL_COLUMNS + tuple(percentiles)
+    groups = {name: np.array([row[i] for row in rows], dtype=np.float64) for i, name in enumerate(names)}
+    groups['sensor_id'] = groups['sensor_id'].astype(np.int64)
+    groups['bucket'] = groups['bucket'].astype(np.int64)
+    groups['count'] = groups['count'].astype(np.int64)
+    return groups
+
+
+def numpy_groups(farm_id, start, end, step_seconds, percentiles, sensor_ids, slice_seconds, include_table=True):
+    """Partial statistics per (sensor, bucket) computed with NumPy, slice by slice."""
+    # Slices hold whole buckets, so no group spans two slices
+    slice_seconds = max(slice_seconds // step_seconds, 1) * step_seconds
+    first = to_epoch_us(start) // 1000000 // step_seconds * step_seconds
+    parts = []
+    for offset in range(first, to_epoch_us(end) // 1000000 + 1, slice_seconds):
+        lower = max(start, EPOCH + timedelta(seconds=offset))
+        upper = min(end, EPOCH + timedelta(seconds=offset + slice_seconds))
+        if lower >= upper:
+            continue
+        sensors, timestamps, values = slice_columns(farm_id, lower, upper, sensor_ids, include_table)
+        if len(values):
+            parts.append(group_columns(sensors, timestamps // 1000000 // step_seconds * step_seconds,
+                                       values, percentiles))
+    return combine_groups(parts, percentiles)
+
+
+def slice_columns(farm_id, start, end, sensor_ids, include_table=True):
+    """Load (sensor, epoch microsecond, value) columns of ``[start, end)`` from every tier."""
+    parts = []
+    if include_table:
+        Reading = readings_source(start)
+        rows = db.session.execute(select(Reading.sensor_id, Reading.timestamp, Reading.value).where(
+            Reading.farm_id == farm_id,
+            Reading.timestamp >= start,
+            Reading.timestamp < end,
+            Reading.sensor_id.in_(sensor_ids)
+        )).all()
+        parts.append(columns_of(rows))
+    if may_be_archived(start):
+        parts.append(columns_of(archived_readings(start, end, farm_id=farm_id, sensor_ids=sensor_ids)))
+        if cold_readings.may_cover(start):
+            for _, sensors, timestamps, values in cold_readings.scan(start, end, farm_id, sensor_ids):
+                parts.append((sensors.astype(np.int64), timestamps, values))
+    if not parts:
+        return columns_of([])
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def group_columns(sensors, buckets, values, percentiles):
+    """Partial statistics of reading columns per (sensor, bucket)."""
+    # Sorting by value inside each group puts the minimum first, the maximum
+    # last and lets percentiles be read off by position
+    order = np.lexsort((values, buckets, sensors))
+    sensors, buckets, values = sensors[order], buckets[order], values[order]
+    starts = np.flatnonzero((np.diff(sensors, prepend=-1) != 0) | (np.diff(buckets, prepend=buckets[0] - 1) != 0))
+    counts = np.diff(np.append(starts, len(values)))
+
+    groups = {
+        'sensor_id': sensors[starts],
+        'bucket': buckets[starts],
+        'count': counts,
+        'sum': np.add.reduceat(values, starts),
+        'sum_squares': np.add.reduceat(values * values, starts),
+        'min': values[starts],
+        'max': values[starts + counts - 1],
+    }
+    for name, fraction in percentiles.items():
+        # Linear interpolation between closest ranks, as numpy.percentile and percentile_cont
+        position = fraction * (counts - 1)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, counts - 1)
+        low, high = values[starts + below], values[starts + above]
+        groups[name] = low + (high - low) * (position - below)
+    return groups
+
+
+def combine_groups(parts, percentiles=None):
+    """Merge partial statistics, combining groups that appear in several parts.
+
+    Percentiles cannot be merged, so parts carrying them must not share groups.
+    """
+    names = ('sensor_id', 'bucket') + PARTIAL_COLUMNS + tuple(percentiles or ())
+    parts = [part for part in parts if len(part['count'])]
+    if not parts:
+        return {name: np.empty(0, dtype=np.int64 if name in ('sensor_id', 'bucket', 'count') else np.float64)
+                for name in names}
+
+    merged = {name: np.concatenate([part[name] for part in parts]) for name in names}
+    order = np.lexsort((merged['bucket'], merged['sensor_id']))
+    merged = {name: column[order] for name, column in merged.items()}
+    sensors, buckets = merged['sensor_id'], merged['bucket']
+    starts = np.flatnonzero((np.diff(sensors, prepend=-1) != 0) | (np.diff(buckets, prepend=buckets[0] - 1) != 0))
+    if len(starts) == len(sensors):
+        return merged
+
+    combined = {
+        'sensor_id': sensors[starts],
+        'bucket': buckets[starts],
+        'count': np.add.reduceat(merged['count'], starts),
+        'sum': np.add.reduceat(merged['sum'], starts),
+        'sum_squares': np.add.reduceat(merged['sum_squares'], starts),
+        'min': np.minimum.reduceat(merged['min'], starts),
+        'max': np.maximum.reduceat(merged['max'], starts),
+    }
+    for name in percentiles or ():
+        combined[name] = merged[name][starts]
+    return combined
+
+
+def group_rows(groups, functions):
+    """Turn partial statistics into response rows with the requested functions."""
+    counts = groups['count']
+    means = groups['sum'] / np.maximum(counts, 1)
+    results = {
+        'sum': groups['sum'],
+        'avg': means,
+        'min': groups['min'],
+        'max': groups['max'],
+        'stddev': np.sqrt(np.maximum(groups['sum_squares'] / np.maximum(counts, 1) - means * means, 0.0)),
+    }
+    results.update((name, groups[name]) for name in percentiles_of(functions))
+
+    columns = {name: results[name].tolist() for name in functions if name != 'count'}
+    timestamps = from_epoch_us(groups['bucket'] * 1000000)
+    rows = []
+    for i, (sensor_id, count) in enumerate(zip(groups['sensor_id'].tolist(), counts.tolist())):
+        row = {'sensor_id': sensor_id, 'timestamp': timestamps[i].isoformat(), 'count': count}
+        row.update((name, column[i]) for name, column in columns.items())
+        rows.append(row)
+    return rows
+
@@ -0,0 +1,220 @@
+"""In-process cache of per-farm alert summary counters for dashboards.
+
+Counts are loaded with one grouped query (:func:`alert_counts`) and then
+kept current from ORM events: alerts inserted, updated (read, resolved,
+severity) or deleted in this process adjust the cached counters once
+their transaction commits. Other worker processes only see such changes
+once their entry expires, so entries also carry a TTL; the TTL also
+bounds how long ``recent_alerts_24h`` keeps counting alerts that have
+aged out of the last 24 hours.
+
+A load that overlaps a commit touching the same farm may or may not have
+seen that commit, so it is not stored: each farm has a version bumped on
+every commit and a count of transactions with uncommitted changes, and a
+load is only cached if neither changed while it ran.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Alert
+from services.alert_service import alert_counts
+
+COUNTER_KEYS = ('total_alerts', 'unread_alerts', 'unresolved_alerts', 'critical_alerts', 'recent_alerts_24h')
+
+
+class AlertCounterCache:
+    """Per-farm alert summary counters keyed by farm id."""
+
+    def __init__(self, ttl=30, enabled=True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._versions = defaultdict(int)
+        self._in_flight = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the cache from application settings."""
+        self.ttl = app.config.get('ALERT_COUNTER_CACHE_TTL', self.ttl)
+        self.enabled = app.config.get('ALERT_COUNTER_CACHE_ENABLED', self.enabled)
+        self.clear()
+        app.extensions['alert_counters'] = self
+
+    def get_many(self, farm_ids):
+        """Return a dict of farm id to summary counts, loading misses in one query."""
+        if not self.enabled:
+            return alert_counts(farm_ids)
+
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for farm_id in set(farm_ids):
+                entry = self._entries.get(farm_id)
+                if entry and entry[1] > now:
+                    found[farm_id] = dict(entry[0])
+                    self.hits += 1
+                else:
+                    missing.append(farm_id)
+                    self.misses += 1
+            versions = {farm_id: (self._versions[farm_id], self._in_flight[farm_id]) for farm_id in missing}
+
+        if missing:
+            loaded = alert_counts(missing)
+            with self._lock:
+                for farm_id, counts in loaded.items():
+                    # Skip loads that raced a change; they may or may not include it
+                    version, in_flight = versions[farm_id]
+                    if in_flight == 0 and self._in_flight[farm_id] == 0 and self._versions[farm_id] == version:
+                        self._entries[farm_id] = (dict(counts), now + self.ttl)
+            found.update(loaded)
+
+        return found
+
+    def get(self, farm_id):
+        """Return the summary counts of one farm."""
+        return self.get_many([farm_id])[farm_id]
+
+    def begin(self, farm_ids):
+        """Mark farms as having uncommitted alert changes."""
+        with self._lock:
+            for farm_id in farm_ids:
+                self._in_flight[farm_id] += 1
+
+    def apply(self, deltas):
+        """Add committed ``{farm_id: [delta per counter]}`` to cached entries."""
+        with self._lock:
+            for farm_id, delta in deltas.items():
+                self._versions[farm_id] += 1
+                entry = self._entries.get(farm_id)
+                if entry:
+                    for key, change in zip(COUNTER_KEYS, delta):
+                        entry[0][key] += change
+
+    def end(self, farm_ids):
+        """Release farms marked by :meth:`begin` once their transaction ends."""
+        with self._lock:
+            for farm_id in farm_ids:
+                self._versions[farm_id] += 1
+                self._in_flight[farm_id] -= 1
+                if not self._in_flight[farm_id]:
+                    del self._in_flight[farm_id]
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            for farm_id in self._versions:
+                self._versions[farm_id] += 1
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+# Global cache instance, configured in create_app
+alert_counters = AlertCounterCache()
+
+
+def contribution(is_read, is_resolved, severity, created_at):
+    """What one alert adds to each counter."""
+    recent = created_at is not None and created_at.replace(tzinfo=None) >= datetime.utcnow() - timedelta(hours=24)
+    return (
+        1,
+        int(not is_read),
+        int(not is_resolved),
+        int(severity == 'critical' and not is_resolved),
+        int(recent)
+    )
+
+
+def previous_value(state, name):
+    """Value of an attribute before the changes being flushed."""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return state.attrs[name].value
+
+
+def _record(session, farm_id, delta, sign):
+    deltas = session.info.setdefault('alert_counter_deltas', {})
+    farms = session.info.setdefault('alert_counter_farms', set())
+    if farm_id not in farms:
+        farms.add(farm_id)
+        alert_counters.begin([farm_id])
+    current = deltas.setdefault(farm_id, [0] * len(COUNTER_KEYS))
+    for i, change in enumerate(delta):
+        current[i] += sign * change
+
+
+@event.listens_for(Alert, 'after_insert')
+def _count_inserted(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _record(session, target.farm_id, contribution(
+            target.is_read, target.is_resolved, target.severity, target.created_at
+        ), 1)
+
+
+@event.listens_for(Alert, 'after_update')
+def _count_updated(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    names = ('farm_id', 'is_read', 'is_resolved', 'severity', 'created_at')
+    before = [previous_value(state, name) for name in names]
+    after = [getattr(target, name) for name in names]
+    if before != after:
+        _record(session, before[0], contribution(*before[1:]), -1)
+        _record(session, after[0], contribution(*after[1:]), 1)
+
+
+@event.listens_for(Alert, 'after_delete')
+def _count_deleted(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _record(session, target.farm_id, contribution(
+            target.is_read, target.is_resolved, target.severity, target.created_at
+        ), -1)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _clear_on_bulk_change(execute_state):
+    # Bulk UPDATE/DELETE statements bypass the mapper events above
+    if (execute_state.is_update or execute_state.is_delete) and execute_state.bind_mapper is inspect(Alert):
+        alert_counters.clear()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    deltas = session.info.pop('alert_counter_deltas', None)
+    if deltas:
+        alert_counters.apply(deltas)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _release_farms(session, transaction):
+    # Runs after commit, rollback and close alike, so farms are never left marked
+    if transaction.parent is None:
+        session.info.pop('alert_counter_deltas', None)
+        farms = session.info.pop('alert_counter_farms', None)
+        if farms:
+            alert_counters.end(farms)
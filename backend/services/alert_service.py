@@ -2,72 +2,199 @@
 
 from app import db
 from models import Alert, Sensor, SensorReading
-from datetime import datetime
+from services.sensor_cache import sensor_cache
+from datetime import datetime, timedelta
 import logging
 
+import numpy as np
+from sqlalchemy import and_, func
+
 logger = logging.getLogger(__name__)
 
+# Open alerts suppress new ones for the same sensor within this window.
+ALERT_DEDUP_WINDOW = timedelta(hours=1)
+
 
 def check_threshold_alerts(reading: SensorReading):
     """Check if a sensor reading triggers any threshold alerts."""
     try:
-        sensor = reading.sensor
+        sensor = sensor_cache.get(reading.sensor_id)
         
         if not sensor or not sensor.is_active:
             return
         
-        alert_triggered = False
-        alert_type = None
-        severity = 'medium'
-        message = ''
+        breach = evaluate_threshold(reading.value, sensor)
+        if breach:
+            create_threshold_alert(reading.farm_id, sensor, *breach)
         
-        # Check minimum threshold
-        if sensor.min_threshold is not None and reading.value < sensor.min_threshold:
-            alert_triggered = True
-            alert_type = 'threshold'
-            severity = 'high' if reading.value < (sensor.min_threshold * 0.8) else 'medium'
-            message = f'{sensor.name} reading ({reading.value} {sensor.unit}) is below minimum threshold ({sensor.min_threshold} {sensor.unit})'
+    except Exception as e:
+        logger.error(f"Error checking threshold alerts: {str(e)}")
+        db.session.rollback()
+
+
+def check_threshold_alerts_batch(readings, sensors):
+    """Check a batch of ingested readings for threshold alerts.
+    
+    Args:
+        readings: Sequence of dicts with ``sensor_id``, ``farm_id`` and ``value``
+            in ingestion order
+        sensors: Mapping of sensor id to an object exposing the sensor
+            attributes used by :func:`evaluate_threshold`
+    
+    Produces the same alerts as calling :func:`check_threshold_alerts` for each
+    reading in order. Threshold comparisons run as array operations, open
+    alerts are looked up with one query for the whole batch and new alerts
+    are inserted together. Once a sensor has an open threshold alert, later
+    breaches are suppressed by the dedup window, so only the first breaching
+    reading per sensor can create an alert.
+    """
+    try:
+        if not readings:
+            return []
+        
+        breaches = find_first_breaches(readings, sensors)
+        if not breaches:
+            return []
         
-        # Check maximum threshold
-        elif sensor.max_threshold is not None and reading.value > sensor.max_threshold:
-            alert_triggered = True
-            alert_type = 'threshold'
-            severity = 'high' if reading.value > (sensor.max_threshold * 1.2) else 'medium'
-            message = f'{sensor.name} reading ({reading.value} {sensor.unit}) is above maximum threshold ({sensor.max_threshold} {sensor.unit})'
+        # One dedup lookup for every sensor that breached in this batch
+        open_alerts = set(db.session.query(Alert.farm_id, Alert.sensor_id).filter(
+            Alert.farm_id.in_({readings[index]['farm_id'] for _, index in breaches}),
+            Alert.sensor_id.in_([sensor_id for sensor_id, _ in breaches]),
+            Alert.alert_type == 'threshold',
+            Alert.is_resolved == False,
+            Alert.created_at > datetime.utcnow() - ALERT_DEDUP_WINDOW
+        ).all())
         
-        if alert_triggered:
-            # Check if similar alert was recently created (avoid spam)
-            recent_similar_alert = Alert.query.filter_by(
-                farm_id=reading.farm_id,
-                sensor_id=sensor.id,
+        alerts = []
+        for sensor_id, index in breaches:
+            reading = readings[index]
+            if (reading['farm_id'], sensor_id) in open_alerts:
+                continue
+            
+            sensor = sensors[sensor_id]
+            alert_type, severity, message = evaluate_threshold(reading['value'], sensor)
+            alerts.append(Alert(
+                farm_id=reading['farm_id'],
+                sensor_id=sensor_id,
+                title=f'{sensor.sensor_type.title()} Alert - {sensor.name}',
+                message=message,
                 alert_type=alert_type,
-                is_resolved=False
-            ).filter(
-                Alert.created_at > datetime.utcnow() - timedelta(hours=1)
-            ).first()
+                severity=severity
+            ))
+        
+        if alerts:
+            db.session.add_all(alerts)
+            db.session.commit()
+            
+            logger.info(f"Created {len(alerts)} threshold alerts for ingested batch")
             
-            if not recent_similar_alert:
-                # Create new alert
-                alert = Alert(
-                    farm_id=reading.farm_id,
-                    sensor_id=sensor.id,
-                    title=f'{sensor.sensor_type.title()} Alert - {sensor.name}',
-                    message=message,
-                    alert_type=alert_type,
-                    severity=severity
-                )
-                
-                db.session.add(alert)
-                db.session.commit()
-                
-                logger.info(f"Created threshold alert for sensor {sensor.id}: {message}")
-                
-                # Send notifications if enabled
+            for alert in alerts:
                 send_alert_notifications(alert)
         
+        return alerts
+        
     except Exception as e:
         logger.error(f"Error checking threshold alerts: {str(e)}")
         db.session.rollback()
+        return []
+
+
+def find_first_breaches(readings, sensors):
+    """Find the first threshold-breaching reading of each sensor in a batch.
+    
+    Returns:
+        List of (sensor_id, reading index) tuples ordered by reading index
+    """
+    count = len(readings)
+    sensor_ids = np.fromiter((r['sensor_id'] for r in readings), dtype=np.int64, count=count)
+    values = np.fromiter((r['value'] for r in readings), dtype=np.float64, count=count)
+    
+    # Per-sensor thresholds, broadcast to readings; missing thresholds are NaN
+    # so that every comparison against them is False
+    unique_ids, inverse = np.unique(sensor_ids, return_inverse=True)
+    meta = [sensors.get(int(sensor_id)) for sensor_id in unique_ids]
+    active = np.array([bool(m and m.is_active) for m in meta], dtype=bool)
+    min_thresholds = np.array(
+        [m.min_threshold if m and m.min_threshold is not None else np.nan for m in meta],
+        dtype=np.float64
+    )
+    max_thresholds = np.array(
+        [m.max_threshold if m and m.max_threshold is not None else np.nan for m in meta],
+        dtype=np.float64
+    )
+    
+    breached = active[inverse] & (
+        (values < min_thresholds[inverse]) | (values > max_thresholds[inverse])
+    )
+    breach_indexes = np.flatnonzero(breached)
+    if not breach_indexes.size:
+        return []
+    
+    # np.unique reports the first occurrence of each sensor among breaches
+    breach_sensors, first = np.unique(sensor_ids[breach_indexes], return_index=True)
+    order = np.argsort(first)
+    return [
+        (int(breach_sensors[i]), int(breach_indexes[first[i]]))
+        for i in order
+    ]
+
+
+def evaluate_threshold(value, sensor):
+    """Evaluate a value against sensor thresholds.
+    
+    Returns:
+        Tuple of (alert_type, severity, message) if a threshold is breached,
+        otherwise None
+    """
+    # Check minimum threshold
+    if sensor.min_threshold is not None and value < sensor.min_threshold:
+        severity = 'high' if value < (sensor.min_threshold * 0.8) else 'medium'
+        message = f'{sensor.name} reading ({value} {sensor.unit}) is below minimum threshold ({sensor.min_threshold} {sensor.unit})'
+        return 'threshold', severity, message
+    
+    # Check maximum threshold
+    if sensor.max_threshold is not None and value > sensor.max_threshold:
+        severity = 'high' if value > (sensor.max_threshold * 1.2) else 'medium'
+        message = f'{sensor.name} reading ({value} {sensor.unit}) is above maximum threshold ({sensor.max_threshold} {sensor.unit})'
+        return 'threshold', severity, message
+    
+    return None
+
+
+def create_threshold_alert(farm_id, sensor, alert_type, severity, message):
+    """Create a threshold alert unless a similar one is already open."""
+    # Check if similar alert was recently created (avoid spam)
+    recent_similar_alert = Alert.query.filter_by(
+        farm_id=farm_id,
+        sensor_id=sensor.id,
+        alert_type=alert_type,
+        is_resolved=False
+    ).filter(
+        Alert.created_at > datetime.utcnow() - ALERT_DEDUP_WINDOW
+    ).first()
+    
+    if recent_similar_alert:
+        return None
+    
+    # Create new alert
+    alert = Alert(
+        farm_id=farm_id,
+        sensor_id=sensor.id,
+        title=f'{sensor.sensor_type.title()} Alert - {sensor.name}',
+        message=message,
+        alert_type=alert_type,
+        severity=severity
+    )
+    
+    db.session.add(alert)
+    db.session.commit()
+    
+    logger.info(f"Created threshold alert for sensor {sensor.id}: {message}")
+    
+    # Send notifications if enabled
+    send_alert_notifications(alert)
+    
+    return alert
 
 
 def send_alert_notifications(alert: Alert):
@@ -129,3 +256,31 @@ def create_system_alert(farm_id: int, title: str, message: str, severity: str =
         logger.error(f"Error creating system alert: {str(e)}")
         db.session.rollback()
         return None
+
+
+def alert_counts(farm_ids):
+    """Alert summary counts for several farms in one grouped query.
+
+    Each count is a filtered aggregate over the farm's alerts, so a single
+    pass over the covering ``ix_alerts_farm_summary`` index replaces a
+    COUNT query per figure.
+
+    Returns:
+        Dict of farm id to a dict with ``total_alerts``, ``unread_alerts``,
+        ``unresolved_alerts``, ``critical_alerts`` and ``recent_alerts_24h``
+    """
+    yesterday = datetime.utcnow() - timedelta(hours=24)
+    rows = db.session.query(
+        Alert.farm_id,
+        func.count(),
+        func.count().filter(Alert.is_read == False),
+        func.count().filter(Alert.is_resolved == False),
+        func.count().filter(and_(Alert.severity == 'critical', Alert.is_resolved == False)),
+        func.count().filter(Alert.created_at >= yesterday)
+    ).filter(Alert.farm_id.in_(farm_ids)).group_by(Alert.farm_id).all()
+
+    keys = ('total_alerts', 'unread_alerts', 'unresolved_alerts', 'critical_alerts', 'recent_alerts_24h')
+    counts = {farm_id: dict.fromkeys(keys, 0) for farm_id in farm_ids}
+    for farm_id, *values in rows:
+        counts[farm_id] = dict(zip(keys, values))
+    return counts
@@ -0,0 +1,388 @@
+"""Compressed archive tier for historical sensor readings.
+
+Readings older than ``READINGS_ARCHIVE_AFTER_DAYS`` are sealed into one
+:class:`ReadingArchiveBlock` per sensor and UTC day, encoded with
+services.archive_codec, and removed from the raw table. Readings that
+arrive for an already sealed day are merged into its block on the next
+run; where both hold the same timestamp the archived reading wins.
+
+Range reads combine the raw table with :func:`archived_readings`. Only
+days at least one full day old are ever sealed, so ranges starting
+within the last day never need the archive (see :func:`may_be_archived`).
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import logging
+
+from flask.cli import AppGroup
+import numpy as np
+from sqlalchemy import delete, func, insert, select, text, tuple_
+
+from models import db, ReadingArchiveBlock, SensorReading
+from services.archive_codec import decode_block, encode_block
+from services.hot_window import from_epoch_us, to_epoch_us
+from services.partitions import (
+    MOVED_KEYS_CHUNK, month_start, partition_manager, period_table, readings_source, to_naive_utc
+)
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the PostgreSQL advisory lock that serializes sealing
+ARCHIVE_LOCK_KEY = 7_242_020
+
+# Bytes per reading of the uncompressed columns (int64 timestamp, float64 value)
+RAW_COLUMN_BYTES = 16
+
+
+class ArchivedReading(namedtuple('ArchivedReading', ['sensor_id', 'farm_id', 'timestamp', 'value'])):
+    """A reading decoded from the archive; archived readings have no id."""
+
+    __slots__ = ()
+
+    id = None
+
+    def to_dict(self, sensor=None):
+        """Serialize like SensorReading.to_dict."""
+        return {
+            'id': None,
+            'value': self.value,
+            'timestamp': self.timestamp.isoformat(),
+            'sensor_id': self.sensor_id,
+            'sensor_name': sensor.name if sensor else None,
+            'sensor_type': sensor.sensor_type if sensor else None,
+            'unit': sensor.unit if sensor else None
+        }
+
+
+def day_start(moment):
+    """Return midnight UTC of the day containing ``moment``."""
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def may_be_archived(start):
+    """Whether a range starting at ``start`` can reach archived days."""
+    return to_naive_utc(start) < datetime.utcnow() - timedelta(days=1)
+
+
+def archived_readings(start, end=None, farm_id=None, sensor_ids=None, newest_first=False, limit=None):
+    """Decode archived readings in ``[start, end)``.
+
+    Args:
+        start: Inclusive start of the range
+        end: Exclusive end of the range, or None for no upper bound
+        farm_id: Optional farm to restrict to
+        sensor_ids: Optional sensor ids to restrict to
+        newest_first: Order by timestamp descending instead of ascending
+        limit: Optional maximum number of readings; with ``newest_first``,
+            older blocks are not decoded once enough readings are found
+
+    Returns:
+        List of :class:`ArchivedReading`
+    """
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    query = select(ReadingArchiveBlock).where(ReadingArchiveBlock.day >= day_start(start))
+    if end is not None:
+        query = query.where(ReadingArchiveBlock.day < end)
+    if farm_id is not None:
+        query = query.where(ReadingArchiveBlock.farm_id == farm_id)
+    if sensor_ids is not None:
+        query = query.where(ReadingArchiveBlock.sensor_id.in_(sensor_ids))
+    day_order = ReadingArchiveBlock.day.desc() if newest_first else ReadingArchiveBlock.day
+    blocks = db.session.execute(query.order_by(day_order)).scalars()
+
+    start_us = to_epoch_us(start)
+    end_us = to_epoch_us(end) if end is not None else None
+    parts = []
+    found = 0
+    current_day = None
+    for block in blocks:
+        # Blocks of one day interleave, so only stop between days
+        if limit is not None and newest_first and block.day != current_day and found >= limit:
+            break
+        current_day = block.day
+
+        timestamps, values = decode_block(block.data)
+        mask = timestamps >= start_us
+        if end_us is not None:
+            mask &= timestamps < end_us
+        count = int(mask.sum())
+        if count:
+            parts.append((
+                np.full(count, block.sensor_id, dtype=np.int64),
+                np.full(count, block.farm_id, dtype=np.int64),
+                timestamps[mask],
+                values[mask]
+            ))
+            found += count
+
+    if not parts:
+        return []
+
+    sensors, farms, timestamps, values = (np.concatenate(column) for column in zip(*parts))
+    order = np.lexsort((sensors, timestamps))
+    if newest_first:
+        order = order[::-1]
+    order = order[:limit]
+    return [
+        ArchivedReading(*reading) for reading in zip(
+            sensors[order].tolist(),
+            farms[order].tolist(),
+            from_epoch_us(timestamps[order]),
+            values[order].tolist()
+        )
+    ]
+
+
+def archived_count(start, farm_id, sensor_ids=None):
+    """Count a farm's archived readings from ``start``.
+
+    Only the blocks of the day containing ``start`` are decoded; later days
+    are counted from their stored reading counts.
+    """
+    start = to_naive_utc(start)
+    next_day = day_start(start) + timedelta(days=1)
+    query = select(func.coalesce(func.sum(ReadingArchiveBlock.reading_count), 0)).where(
+        ReadingArchiveBlock.farm_id == farm_id,
+        ReadingArchiveBlock.day >= next_day
+    )
+    if sensor_ids is not None:
+        query = query.where(ReadingArchiveBlock.sensor_id.in_(sensor_ids))
+    whole_days = db.session.execute(query).scalar()
+    return whole_days + len(archived_readings(start, next_day, farm_id=farm_id, sensor_ids=sensor_ids))
+
+
+def exclude_archived(rows):
+    """Drop rows whose reading is already sealed into an archive block.
+
+    The live table's unique index cannot see archived readings, and a late
+    duplicate would otherwise be folded into the rollups a second time and
+    returned twice until the next seal merges its day. Only rows from before
+    today are looked up, one decoded block per (sensor, day).
+
+    Args:
+        rows: Mappings with ``sensor_id`` and ``timestamp``
+
+    Returns:
+        The rows not found in the archive, in their original order
+    """
+    today = day_start(datetime.utcnow())
+    wanted = {}
+    for row in rows:
+        timestamp = to_naive_utc(row['timestamp'])
+        if timestamp < today:
+            wanted.setdefault((row['sensor_id'], day_start(timestamp)), []).append(to_epoch_us(timestamp))
+    if not wanted:
+        return rows
+
+    archived = set()
+    keys = list(wanted)
+    block_key = tuple_(ReadingArchiveBlock.sensor_id, ReadingArchiveBlock.day)
+    for offset in range(0, len(keys), MOVED_KEYS_CHUNK):
+        blocks = db.session.execute(
+            select(ReadingArchiveBlock.sensor_id, ReadingArchiveBlock.day, ReadingArchiveBlock.data).where(
+                block_key.in_(keys[offset:offset + MOVED_KEYS_CHUNK])
+            )
+        ).all()
+        for sensor_id, day, data in blocks:
+            timestamps, _ = decode_block(data)
+            candidates = np.array(wanted[(sensor_id, day)], dtype=np.int64)
+            archived.update((sensor_id, int(timestamp)) for timestamp in candidates[np.isin(candidates, timestamps)])
+
+    if not archived:
+        return rows
+    return [
+        row for row in rows
+        if (row['sensor_id'], to_epoch_us(to_naive_utc(row['timestamp']))) not in archived
+    ]
+
+
+class ReadingArchive:
+    """Seals aged raw readings into compressed per-sensor day blocks."""
+
+    def __init__(self, after_days=0):
+        self.after_days = after_days
+
+    def init_app(self, app):
+        """Configure archiving from application settings."""
+        self.after_days = app.config.get('READINGS_ARCHIVE_AFTER_DAYS', self.after_days)
+        if self.after_days < 0:
+            raise ValueError('READINGS_ARCHIVE_AFTER_DAYS must be 0 (disabled) or positive')
+        app.extensions['reading_archive'] = self
+        app.cli.add_command(archive_cli)
+
+    def cutoff(self, now=None):
+        """Day before which raw readings are sealed, or None if archiving is off."""
+        if not self.after_days:
+            return None
+        return day_start(now or datetime.utcnow()) - timedelta(days=self.after_days)
+
+    def seal(self, now=None):
+        """Archive every raw reading older than the cutoff, one day per transaction.
+
+        Also drops blocks older than the partition retention policy.
+
+        Returns:
+            Dict with the number of days, blocks and readings sealed, and
+            blocks dropped
+        """
+        result = {'days': 0, 'blocks': 0, 'readings': 0, 'dropped': 0}
+        now = now or datetime.utcnow()
+        cutoff = self.cutoff(now)
+
+        try:
+            if not self._acquire_lock():
+                return result
+
+            retention = partition_manager.retention_cutoff(now)
+            if retention is not None:
+                result['dropped'] = db.session.execute(
+                    delete(ReadingArchiveBlock).where(ReadingArchiveBlock.day < retention)
+                ).rowcount
+            db.session.commit()
+
+            if cutoff is None:
+                return result
+
+            day = self._next_day(None, cutoff)
+            while day is not None:
+                if not self._acquire_lock():
+                    return result
+                blocks, readings = self._seal_day(day)
+                db.session.commit()
+                result['days'] += 1
+                result['blocks'] += blocks
+                result['readings'] += readings
+                day = self._next_day(day + timedelta(days=1), cutoff)
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if result['readings'] or result['dropped']:
+            logger.info(
+                f"Archived {result['readings']} readings into {result['blocks']} blocks "
+                f"over {result['days']} days; dropped {result['dropped']} expired blocks"
+            )
+        return result
+
+    def stats(self):
+        """Return block counts and the compression ratio of the archive."""
+        blocks, readings, size = db.session.execute(select(
+            func.count(),
+            func.coalesce(func.sum(ReadingArchiveBlock.reading_count), 0),
+            func.coalesce(func.sum(func.length(ReadingArchiveBlock.data)), 0)
+        ).select_from(ReadingArchiveBlock)).one()
+
+        return {
+            'blocks': blocks,
+            'readings': readings,
+            'bytes': size,
+            'bytes_per_reading': round(size / readings, 3) if readings else None,
+            'compression_ratio': round(readings * RAW_COLUMN_BYTES / size, 2) if size else None
+        }
+
+    def _acquire_lock(self):
+        # Another process is already sealing on PostgreSQL
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return True
+        return db.session.execute(
+            text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': ARCHIVE_LOCK_KEY}
+        ).scalar()
+
+    def _next_day(self, after, cutoff):
+        """First day at or after ``after`` with raw readings before ``cutoff``."""
+        Reading = readings_source(after, cutoff)
+        query = select(func.min(Reading.timestamp)).where(Reading.timestamp < cutoff)
+        if after is not None:
+            query = query.where(Reading.timestamp >= after)
+        oldest = db.session.execute(query).scalar()
+        return day_start(oldest) if oldest else None
+
+    def _seal_day(self, day):
+        next_day = day + timedelta(days=1)
+        Reading = readings_source(day, next_day)
+        rows = db.session.execute(
+            select(Reading.sensor_id, Reading.farm_id, Reading.timestamp, Reading.value).where(
+                Reading.timestamp >= day,
+                Reading.timestamp < next_day
+            ).order_by(Reading.sensor_id, Reading.timestamp)
+        ).all()
+        if not rows:
+            return 0, 0
+
+        sensor_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        timestamps = np.array([row[2] for row in rows], dtype='datetime64[us]').astype(np.int64)
+        values = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+        farm_ids = {row[0]: row[1] for row in rows}
+
+        unique_ids, starts = np.unique(sensor_ids, return_index=True)
+        ends = np.append(starts[1:], len(rows))
+        existing = {
+            block.sensor_id: block for block in db.session.execute(
+                select(ReadingArchiveBlock).where(
+                    ReadingArchiveBlock.day == day,
+                    ReadingArchiveBlock.sensor_id.in_(unique_ids.tolist())
+                )
+            ).scalars()
+        }
+
+        entries = []
+        for sensor_id, start, end in zip(unique_ids.tolist(), starts.tolist(), ends.tolist()):
+            sensor_timestamps = timestamps[start:end]
+            sensor_values = values[start:end]
+            block = existing.get(sensor_id)
+            if block is not None:
+                # Late readings for a sealed day; archived readings come first so they win
+                archived_timestamps, archived_values = decode_block(block.data)
+                merged_timestamps = np.concatenate([archived_timestamps, sensor_timestamps])
+                merged_values = np.concatenate([archived_values, sensor_values])
+                sensor_timestamps, first = np.unique(merged_timestamps, return_index=True)
+                sensor_values = merged_values[first]
+
+            entries.append({
+                'sensor_id': sensor_id,
+                'day': day,
+                'farm_id': farm_ids[sensor_id],
+                'reading_count': len(sensor_timestamps),
+                'data': encode_block(sensor_timestamps, sensor_values)
+            })
+
+        if existing:
+            db.session.execute(delete(ReadingArchiveBlock).where(
+                ReadingArchiveBlock.day == day,
+                ReadingArchiveBlock.sensor_id.in_(list(existing))
+            ))
+        db.session.execute(insert(ReadingArchiveBlock), entries)
+
+        in_day = (SensorReading.timestamp >= day) & (SensorReading.timestamp < next_day)
+        db.session.execute(delete(SensorReading).where(in_day))
+        if db.session.get_bind().dialect.name == 'sqlite' and month_start(day) in partition_manager.periods():
+            table = period_table(month_start(day))
+            db.session.execute(delete(table).where(
+                (table.c.timestamp >= day) & (table.c.timestamp < next_day)
+            ))
+
+        return len(entries), len(rows)
+
+
+# Global reading archive, configured in create_app
+reading_archive = ReadingArchive()
+
+archive_cli = AppGroup('archive', help='Manage the compressed reading archive.')
+
+
+@archive_cli.command('seal')
+def seal_command():
+    """Archive raw readings older than READINGS_ARCHIVE_AFTER_DAYS."""
+    if not reading_archive.after_days:
+        print('Archiving is disabled; set READINGS_ARCHIVE_AFTER_DAYS')
+    result = reading_archive.seal()
+    print(f"Sealed {result['readings']} readings into {result['blocks']} blocks over {result['days']} days")
+    print(f"Dropped {result['dropped']} expired blocks")
+
+
+@archive_cli.command('stats')
+def stats_command():
+    """Show archive size and compression ratio."""
+    for key, value in reading_archive.stats().items():
+        print(f'{key}: {value}')
@@ -0,0 +1,233 @@
+"""Gorilla-style compression for one sensor's readings.
+
+A block holds readings of a single sensor sorted by timestamp. Timestamps
+are epoch microseconds stored as delta-of-deltas and values are float64
+stored as the XOR with the previous value, following Pelkonen et al.,
+"Gorilla: A Fast, Scalable, In-Memory Time Series Database" (VLDB 2015).
+
+Layout: a little-endian header of (uint8 version, uint32 count, int64
+first timestamp, float64 first value), then a big-endian bitstream with
+one (timestamp, value) pair per remaining reading.
+
+Timestamps: the zigzag-encoded delta-of-delta is written with a prefix
+choosing its width; ``0`` alone means the interval did not change.
+
+    0      -> dod == 0
+    10     -> 7 bits
+    110    -> 14 bits
+    1110   -> 20 bits
+    11110  -> 32 bits
+    11111  -> 64 bits
+
+Values: ``0`` when equal to the previous value. Otherwise ``1``, then
+``0`` followed by the meaningful bits if they fit in the previous
+leading/trailing zero window, or ``1``, 5 bits of leading zeros, 6 bits
+of meaningful length (0 meaning 64) and the meaningful bits.
+
+Decoding parses the bitstream into delta-of-deltas and XORs and rebuilds
+the columns with NumPy cumulative sums and XORs.
+"""
+
+import struct
+
+import numpy as np
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BIqd')
+
+# (prefix, prefix length, payload bits) for delta-of-delta timestamps
+DOD_BUCKETS = [
+    (0b10, 2, 7),
+    (0b110, 3, 14),
+    (0b1110, 4, 20),
+    (0b11110, 5, 32),
+    (0b11111, 5, 64),
+]
+
+
+def prefix_codes():
+    """(prefix length, payload bits) of a delta-of-delta, indexed by its first 5 bits."""
+    codes = [None] * 32
+    for prefix, prefix_bits, payload_bits in DOD_BUCKETS:
+        for bits in range(32):
+            if bits >> (5 - prefix_bits) == prefix:
+                codes[bits] = (prefix_bits, payload_bits)
+    return codes
+
+
+PREFIX_CODES = prefix_codes()
+
+
+class ArchiveDecodeError(ValueError):
+    """Raised when an archive block is truncated or has an unknown format."""
+
+
+class BitWriter:
+    """Append-only big-endian bit buffer."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._bits = 0
+        self._count = 0
+
+    def write(self, value, bits):
+        self._bits = (self._bits << bits) | value
+        self._count += bits
+        if self._count >= 64:
+            whole = self._count >> 3
+            spare = self._count & 7
+            self.buffer += (self._bits >> spare).to_bytes(whole, 'big')
+            self._bits &= (1 << spare) - 1
+            self._count = spare
+
+    def getvalue(self):
+        """Return the buffer padded with zero bits to a whole byte."""
+        if self._count:
+            padding = -self._count % 8
+            return bytes(self.buffer + (self._bits << padding).to_bytes((self._count + padding) >> 3, 'big'))
+        return bytes(self.buffer)
+
+
+def zigzag(value):
+    return (value << 1) if value >= 0 else (-value << 1) - 1
+
+
+def unzigzag(value):
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+
+def encode_block(timestamps, values):
+    """Compress one sensor's readings.
+
+    Args:
+        timestamps: Epoch microseconds, sorted ascending
+        values: Reading values, one per timestamp
+
+    Returns:
+        The block as bytes
+    """
+    timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    count = len(timestamps)
+    if not count:
+        raise ValueError('Cannot encode an empty block')
+
+    header = HEADER.pack(FORMAT_VERSION, count, int(timestamps[0]), float(values[0]))
+    if count == 1:
+        return header
+
+    deltas = np.diff(timestamps)
+    dods = np.diff(deltas, prepend=0).tolist()
+    bits = values.view(np.uint64)
+    xors = (bits[1:] ^ bits[:-1]).tolist()
+
+    writer = BitWriter()
+    write = writer.write
+    leading = trailing = 65  # no previous window yet
+
+    for dod, xor in zip(dods, xors):
+        if dod == 0:
+            write(0, 1)
+        else:
+            encoded = zigzag(dod)
+            for prefix, prefix_bits, payload_bits in DOD_BUCKETS:
+                if encoded < (1 << payload_bits):
+                    write((prefix << payload_bits) | encoded, prefix_bits + payload_bits)
+                    break
+
+        if xor == 0:
+            write(0, 1)
+            continue
+
+        xor_leading = min(64 - xor.bit_length(), 31)
+        xor_trailing = (xor & -xor).bit_length() - 1
+        if xor_leading >= leading and xor_trailing >= trailing:
+            meaningful = 64 - leading - trailing
+            write((0b10 << meaningful) | (xor >> trailing), 2 + meaningful)
+        else:
+            leading, trailing = xor_leading, xor_trailing
+            meaningful = 64 - leading - trailing
+            write(0b11, 2)
+            write((leading << 6) | (meaningful & 63), 11)
+            write(xor >> trailing, meaningful)
+
+    return header + writer.getvalue()
+
+
+def decode_block(block):
+    """Decompress a block into (timestamps, values) arrays.
+
+    Returns:
+        Tuple of int64 epoch microsecond and float64 value arrays
+
+    Raises:
+        ArchiveDecodeError: If the block is truncated or has an unknown version
+    """
+    if len(block) < HEADER.size:
+        raise ArchiveDecodeError('Archive block is truncated')
+    version, count, first_timestamp, first_value = HEADER.unpack_from(block)
+    if version != FORMAT_VERSION:
+        raise ArchiveDecodeError(f'Unknown archive block version {version}')
+
+    data = bytes(block[HEADER.size:])
+    total_bits = len(data) * 8
+    # Zero padding lets every read take a fixed 9-byte window (any 64 bits at any bit offset)
+    data += bytes(9)
+    from_bytes = int.from_bytes
+    position = 0
+
+    dods = [0] * (count - 1)
+    xors = [0] * (count - 1)
+    leading = trailing = 0
+
+    try:
+        for i in range(count - 1):
+            # Peek 5 bits: enough for the longest timestamp prefix
+            index = position >> 3
+            peek = (data[index] << 8 | data[index + 1]) >> (11 - (position & 7)) & 0b11111
+            if peek >> 4:
+                prefix_bits, width = PREFIX_CODES[peek]
+                position += prefix_bits
+                index = position >> 3
+                encoded = (from_bytes(data[index:index + 9], 'big') >> (72 - (position & 7) - width)) & ((1 << width) - 1)
+                position += width
+                dods[i] = (encoded >> 1) if not encoded & 1 else -((encoded + 1) >> 1)
+            else:
+                position += 1
+
+            index = position >> 3
+            control = (data[index] << 8 | data[index + 1]) >> (14 - (position & 7)) & 0b11
+            if not control & 0b10:
+                position += 1
+                continue
+
+            position += 2
+            if control & 0b01:
+                index = position >> 3
+                header = (from_bytes(data[index:index + 3], 'big') >> (13 - (position & 7))) & 0x7FF
+                position += 11
+                leading = header >> 6
+                trailing = 64 - leading - ((header & 63) or 64)
+            meaningful = 64 - leading - trailing
+            index = position >> 3
+            xors[i] = ((from_bytes(data[index:index + 9], 'big') >> (72 - (position & 7) - meaningful))
+                       & ((1 << meaningful) - 1)) << trailing
+            position += meaningful
+    except IndexError:
+        raise ArchiveDecodeError('Archive block is truncated')
+
+    if position > total_bits:
+        raise ArchiveDecodeError('Archive block is truncated')
+
+    timestamps = np.empty(count, dtype=np.int64)
+    timestamps[0] = first_timestamp
+    if count > 1:
+        deltas = np.cumsum(np.array(dods, dtype=np.int64))
+        timestamps[1:] = first_timestamp + np.cumsum(deltas)
+
+    value_bits = np.empty(count, dtype=np.uint64)
+    value_bits[0] = np.float64(first_value).view(np.uint64)
+    value_bits[1:] = np.array(xors, dtype=np.uint64)
+    values = np.bitwise_xor.accumulate(value_bits).view(np.float64)
+
+    return timestamps, values
@@ -0,0 +1,513 @@
+"""Columnar cold storage for closed months of sensor readings.
+
+Once a month is older than ``READINGS_COLD_AFTER_MONTHS``, each farm's
+readings for it are exported, from the raw table and the archive blocks,
+to one directory of ``.npy`` columns:
+
+    <READINGS_COLD_STORAGE_DIR>/farm_<farm id>/<YYYYMM>/
+        timestamp.npy   int64 epoch microseconds, sorted ascending
+        sensor_id.npy   int32
+        value.npy       float64
+
+The exported rows and blocks are then deleted. Late readings for an
+exported month are still accepted into the raw table, except duplicates
+of readings in its files (see :meth:`ColdReadingStore.exclude_exported`),
+and the next export merges them in. Reads memory-map the
+columns and slice them with a binary search on the timestamp column, and
+:meth:`ColdReadingStore.scan` yields fixed-size chunks, so memory use does
+not grow with the length of the range.
+"""
+
+from datetime import datetime, timedelta
+import logging
+import os
+import re
+import shutil
+
+from flask.cli import AppGroup
+import numpy as np
+from sqlalchemy import delete, func, select
+
+from models import db, ReadingArchiveBlock, SensorReading
+from services.archive import ArchivedReading
+from services.archive_codec import decode_block
+from services.hot_window import from_epoch_us, to_epoch_us
+from services.partitions import (
+    add_months, month_start, partition_manager, period_table, readings_source, to_naive_utc
+)
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    'timestamp': np.int64,
+    'sensor_id': np.int32,
+    'value': np.float64,
+}
+
+FARM_DIRECTORY = re.compile(r'^farm_(\d+)$')
+MONTH_DIRECTORY = re.compile(r'^(\d{4})(\d{2})$')
+
+SCAN_CHUNK_SIZE = 65536
+
+
+class ColdReadingStore:
+    """Exports closed months to ``.npy`` columns and reads them back memory-mapped."""
+
+    def __init__(self, root=None, after_months=0):
+        self.root = root
+        self.after_months = after_months
+
+    def init_app(self, app):
+        """Configure cold storage from application settings."""
+        self.root = app.config.get('READINGS_COLD_STORAGE_DIR') or os.path.join(
+            app.instance_path, 'cold_readings'
+        )
+        self.after_months = app.config.get('READINGS_COLD_AFTER_MONTHS', self.after_months)
+        app.extensions['cold_readings'] = self
+        app.cli.add_command(cold_storage_cli)
+
+    def cutoff(self, now=None):
+        """Month start before which readings move to cold storage, or None if off."""
+        if not self.after_months:
+            return None
+        return add_months(month_start(now or datetime.utcnow()), -self.after_months)
+
+    def may_cover(self, start):
+        """Whether a range starting at ``start`` can reach cold months.
+
+        The current month is never exported, so recent ranges skip the
+        directory listing entirely.
+        """
+        return bool(self.root) and to_naive_utc(start) < month_start(datetime.utcnow())
+
+    def farms(self):
+        """Return the ids of farms with cold months."""
+        if not self.root or not os.path.isdir(self.root):
+            return []
+        return sorted(
+            int(match.group(1)) for match in map(FARM_DIRECTORY.match, os.listdir(self.root)) if match
+        )
+
+    def months(self, farm_id, start=None, end=None):
+        """Return the month starts stored for a farm that overlap ``[start, end)``."""
+        directory = self.farm_directory(farm_id)
+        if not directory or not os.path.isdir(directory):
+            return []
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        months = []
+        for name in os.listdir(directory):
+            match = MONTH_DIRECTORY.match(name)
+            if not match:
+                continue
+            month = datetime(int(match.group(1)), int(match.group(2)), 1)
+            if (start is None or add_months(month, 1) > start) and (end is None or month < end):
+                months.append(month)
+        return sorted(months)
+
+    def open(self, farm_id, month):
+        """Memory-map a month's columns.
+
+        Returns:
+            Dict of column name to read-only array
+        """
+        directory = self.month_directory(farm_id, month)
+        return {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in COLUMNS
+        }
+
+    def scan(self, start, end=None, farm_id=None, sensor_ids=None, chunk_size=SCAN_CHUNK_SIZE):
+        """Yield cold readings in ``[start, end)`` as column chunks, oldest first.
+
+        Args:
+            start: Inclusive start of the range
+            end: Exclusive end of the range, or None for no upper bound
+            farm_id: Farm to read, or None for every farm
+            sensor_ids: Optional sensor ids to restrict to
+            chunk_size: Maximum readings per chunk before sensor filtering
+
+        Yields:
+            Tuples of (farm id, sensor id array, epoch microsecond array,
+            value array). Arrays are copies, so callers may keep them.
+        """
+        start_us = to_epoch_us(to_naive_utc(start))
+        end_us = to_epoch_us(to_naive_utc(end)) if end is not None else None
+        farm_ids = self.farms() if farm_id is None else [farm_id]
+        wanted = np.asarray(sensor_ids, dtype=np.int32) if sensor_ids is not None else None
+
+        for farm in farm_ids:
+            for month in self.months(farm, start, end):
+                columns = self.open(farm, month)
+                lower, upper = self._bounds(columns['timestamp'], start_us, end_us)
+                for offset in range(lower, upper, chunk_size):
+                    chunk = slice(offset, min(offset + chunk_size, upper))
+                    sensors = np.array(columns['sensor_id'][chunk])
+                    timestamps = np.array(columns['timestamp'][chunk])
+                    values = np.array(columns['value'][chunk])
+                    if wanted is not None:
+                        mask = np.isin(sensors, wanted)
+                        sensors, timestamps, values = sensors[mask], timestamps[mask], values[mask]
+                    if len(sensors):
+                        yield farm, sensors, timestamps, values
+
+    def readings(self, start, end=None, farm_id=None, sensor_ids=None):
+        """Yield cold readings in ``[start, end)`` as :class:`ArchivedReading`, oldest first."""
+        for farm, sensors, timestamps, values in self.scan(start, end, farm_id, sensor_ids):
+            yield from (
+                ArchivedReading(*reading) for reading in zip(
+                    sensors.tolist(), [farm] * len(sensors), from_epoch_us(timestamps), values.tolist()
+                )
+            )
+
+    def count(self, start, farm_id, sensor_ids=None, chunk_size=SCAN_CHUNK_SIZE):
+        """Count a farm's cold readings from ``start`` without loading their values."""
+        start_us = to_epoch_us(to_naive_utc(start))
+        wanted = np.asarray(sensor_ids, dtype=np.int32) if sensor_ids is not None else None
+        total = 0
+        for month in self.months(farm_id, start):
+            columns = self.open(farm_id, month)
+            lower, upper = self._bounds(columns['timestamp'], start_us, None)
+            if wanted is None:
+                total += upper - lower
+                continue
+            for offset in range(lower, upper, chunk_size):
+                sensors = columns['sensor_id'][offset:min(offset + chunk_size, upper)]
+                total += int(np.isin(sensors, wanted).sum())
+        return total
+
+    def exclude_exported(self, rows):
+        """Drop rows whose reading is already in an exported month's files.
+
+        Writes for exported months are checked rather than rejected: new
+        readings go to the raw table until the next export merges them, and
+        duplicates are dropped so rollups and reads see each reading once.
+
+        Args:
+            rows: Mappings with ``sensor_id``, ``farm_id`` and ``timestamp``
+
+        Returns:
+            The rows not found in cold storage, in their original order
+        """
+        if not self.root:
+            return rows
+        current = month_start(datetime.utcnow())
+        wanted = {}
+        for row in rows:
+            timestamp = to_naive_utc(row['timestamp'])
+            if timestamp < current:
+                wanted.setdefault((row['farm_id'], month_start(timestamp)), []).append(
+                    (row['sensor_id'], to_epoch_us(timestamp))
+                )
+
+        exported = set()
+        for (farm_id, month), keys in wanted.items():
+            if not os.path.isdir(self.month_directory(farm_id, month)):
+                continue
+            columns = self.open(farm_id, month)
+            timestamps = np.array([timestamp for _, timestamp in keys], dtype=np.int64)
+            lower = np.searchsorted(columns['timestamp'], timestamps, side='left')
+            upper = np.searchsorted(columns['timestamp'], timestamps, side='right')
+            for (sensor_id, timestamp), start, end in zip(keys, lower.tolist(), upper.tolist()):
+                if start < end and sensor_id in columns['sensor_id'][start:end]:
+                    exported.add((sensor_id, timestamp))
+
+        if not exported:
+            return rows
+        return [
+            row for row in rows
+            if (row['sensor_id'], to_epoch_us(to_naive_utc(row['timestamp']))) not in exported
+        ]
+
+    def newest(self, farm_id, start, limit, sensor_ids=None, end=None):
+        """Return up to ``limit`` of a farm's newest cold readings in ``[start, end)``.
+
+        Only the tail of each month is read, newest month first.
+
+        Returns:
+            List of :class:`ArchivedReading`, newest first
+        """
+        start_us = to_epoch_us(to_naive_utc(start))
+        end_us = to_epoch_us(to_naive_utc(end)) if end is not None else None
+        wanted = np.asarray(sensor_ids, dtype=np.int32) if sensor_ids is not None else None
+        found = []
+        for month in reversed(self.months(farm_id, start, end)):
+            columns = self.open(farm_id, month)
+            lower, upper = self._bounds(columns['timestamp'], start_us, end_us)
+            while upper > lower and len(found) < limit:
+                chunk = slice(max(lower, upper - SCAN_CHUNK_SIZE), upper)
+                sensors = np.array(columns['sensor_id'][chunk])[::-1]
+                timestamps = np.array(columns['timestamp'][chunk])[::-1]
+                values = np.array(columns['value'][chunk])[::-1]
+                if wanted is not None:
+                    mask = np.isin(sensors, wanted)
+                    sensors, timestamps, values = sensors[mask], timestamps[mask], values[mask]
+                take = limit - len(found)
+                found.extend(
+                    ArchivedReading(*reading) for reading in zip(
+                        sensors[:take].tolist(),
+                        [farm_id] * min(take, len(sensors)),
+                        from_epoch_us(timestamps[:take]),
+                        values[:take].tolist()
+                    )
+                )
+                upper = chunk.start
+            if len(found) >= limit:
+                break
+        return found
+
+    def export(self, now=None):
+        """Move every farm's months before the cutoff into cold storage.
+
+        Also removes cold months older than the partition retention policy.
+
+        Returns:
+            Dict with the months exported, the readings they hold and the
+            months dropped
+        """
+        result = {'months': 0, 'readings': 0, 'dropped': 0}
+        now = now or datetime.utcnow()
+
+        retention = partition_manager.retention_cutoff(now)
+        if retention is not None:
+            for farm_id in self.farms():
+                for month in self.months(farm_id, end=retention):
+                    shutil.rmtree(self.month_directory(farm_id, month))
+                    result['dropped'] += 1
+
+        cutoff = self.cutoff(now)
+        if cutoff is None:
+            return result
+
+        for farm_id, month in self._pending_months(cutoff):
+            try:
+                result['readings'] += self._export_month(farm_id, month)
+            except Exception:
+                db.session.rollback()
+                raise
+            result['months'] += 1
+
+        if result['months'] or result['dropped']:
+            logger.info(
+                f"Cold storage: exported {result['readings']} readings in {result['months']} "
+                f"farm-months, dropped {result['dropped']}"
+            )
+        return result
+
+    def _pending_months(self, cutoff):
+        """(farm id, month start) pairs with raw or archived readings before ``cutoff``."""
+        Reading = readings_source(None, cutoff)
+        farm_ids = set(db.session.execute(
+            select(Reading.farm_id).where(Reading.timestamp < cutoff).distinct()
+        ).scalars())
+        farm_ids.update(db.session.execute(
+            select(ReadingArchiveBlock.farm_id).where(ReadingArchiveBlock.day < cutoff).distinct()
+        ).scalars())
+
+        for farm_id in sorted(farm_ids):
+            month = self._next_month(farm_id, None, cutoff)
+            while month is not None:
+                yield farm_id, month
+                month = self._next_month(farm_id, add_months(month, 1), cutoff)
+
+    def _next_month(self, farm_id, after, cutoff):
+        """First month at or after ``after`` with a farm's raw or archived readings."""
+        Reading = readings_source(after, cutoff)
+        raw = select(func.min(Reading.timestamp)).where(
+            Reading.farm_id == farm_id,
+            Reading.timestamp < cutoff
+        )
+        archived = select(func.min(ReadingArchiveBlock.day)).where(
+            ReadingArchiveBlock.farm_id == farm_id,
+            ReadingArchiveBlock.day < cutoff
+        )
+        if after is not None:
+            raw = raw.where(Reading.timestamp >= after)
+            archived = archived.where(ReadingArchiveBlock.day >= after)
+
+        found = [db.session.execute(query).scalar() for query in (raw, archived)]
+        found = [moment for moment in found if moment is not None]
+        return month_start(min(found)) if found else None
+
+    def _export_month(self, farm_id, month):
+        """Write one farm-month from existing cold files, archive blocks and raw rows.
+
+        Readings are merged a day at a time; on a (sensor, timestamp) clash
+        the cold file wins over the archive, which wins over the raw table.
+        The exported rows are deleted and committed as the files are
+        swapped in; if the commit fails the previous files are restored.
+
+        Returns:
+            Number of readings in the month's files
+        """
+        next_month = add_months(month, 1)
+        final = self.month_directory(farm_id, month)
+        staging = f'{final}.tmp'
+        self._recover(final)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        existing = self.open(farm_id, month) if os.path.isdir(final) else None
+        Reading = readings_source(month, next_month)
+        total = 0
+
+        spools = {name: open(os.path.join(staging, f'{name}.bin'), 'wb') for name in COLUMNS}
+        try:
+            day = month
+            while day < next_month:
+                next_day = day + timedelta(days=1)
+                parts = []
+
+                if existing is not None:
+                    lower, upper = self._bounds(
+                        existing['timestamp'], to_epoch_us(day), to_epoch_us(next_day)
+                    )
+                    parts.append((
+                        np.array(existing['sensor_id'][lower:upper]),
+                        np.array(existing['timestamp'][lower:upper]),
+                        np.array(existing['value'][lower:upper])
+                    ))
+
+                for block in db.session.execute(select(ReadingArchiveBlock).where(
+                    ReadingArchiveBlock.farm_id == farm_id,
+                    ReadingArchiveBlock.day == day
+                )).scalars():
+                    timestamps, values = decode_block(block.data)
+                    parts.append((np.full(len(timestamps), block.sensor_id), timestamps, values))
+
+                rows = db.session.execute(
+                    select(Reading.sensor_id, Reading.timestamp, Reading.value).where(
+                        Reading.farm_id == farm_id,
+                        Reading.timestamp >= day,
+                        Reading.timestamp < next_day
+                    )
+                ).all()
+                if rows:
+                    parts.append((
+                        np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+                        np.array([row[1] for row in rows], dtype='datetime64[us]').astype(np.int64),
+                        np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+                    ))
+
+                if parts:
+                    sensors, timestamps, values = (np.concatenate(column) for column in zip(*parts))
+                    # Stable sort keeps higher-priority sources first within a clash
+                    order = np.lexsort((sensors, timestamps))
+                    sensors, timestamps, values = sensors[order], timestamps[order], values[order]
+                    keep = np.ones(len(order), dtype=bool)
+                    keep[1:] = (sensors[1:] != sensors[:-1]) | (timestamps[1:] != timestamps[:-1])
+                    spools['sensor_id'].write(sensors[keep].astype(np.int32).tobytes())
+                    spools['timestamp'].write(timestamps[keep].astype(np.int64).tobytes())
+                    spools['value'].write(values[keep].astype(np.float64).tobytes())
+                    total += int(keep.sum())
+
+                day = next_day
+        finally:
+            for spool in spools.values():
+                spool.close()
+            existing = None
+
+        for name, dtype in COLUMNS.items():
+            spool = os.path.join(staging, f'{name}.bin')
+            column = np.lib.format.open_memmap(
+                os.path.join(staging, f'{name}.npy'), mode='w+', dtype=dtype, shape=(total,)
+            )
+            if total:
+                column[:] = np.memmap(spool, dtype=dtype, mode='r', shape=(total,))
+            column.flush()
+            del column
+            os.remove(spool)
+
+        # Rows leave the database in the transaction committed right after
+        # the swap, so readers see each reading in exactly one tier
+        db.session.execute(delete(ReadingArchiveBlock).where(
+            ReadingArchiveBlock.farm_id == farm_id,
+            ReadingArchiveBlock.day >= month,
+            ReadingArchiveBlock.day < next_month
+        ))
+        in_month = (SensorReading.farm_id == farm_id) & (SensorReading.timestamp >= month) & (
+            SensorReading.timestamp < next_month
+        )
+        db.session.execute(delete(SensorReading).where(in_month))
+        if db.session.get_bind().dialect.name == 'sqlite' and month in partition_manager.periods():
+            table = period_table(month)
+            db.session.execute(delete(table).where(
+                (table.c.farm_id == farm_id) & (table.c.timestamp >= month) & (table.c.timestamp < next_month)
+            ))
+
+        previous = self._swap(staging, final)
+        try:
+            db.session.commit()
+        except Exception:
+            self._unswap(final, previous)
+            raise
+        shutil.rmtree(previous, ignore_errors=True)
+
+        return total
+
+    def _swap(self, staging, final):
+        """Replace ``final`` with ``staging``; readers never see a partial month.
+
+        Returns:
+            Path the previous files were moved to, removed by the caller
+            once the export is committed
+        """
+        previous = f'{final}.old'
+        if os.path.isdir(final):
+            os.rename(final, previous)
+        os.rename(staging, final)
+        return previous
+
+    def _unswap(self, final, previous):
+        # The database still holds the month's rows; restore the previous files
+        shutil.rmtree(final, ignore_errors=True)
+        if os.path.isdir(previous):
+            os.rename(previous, final)
+
+    def _recover(self, final):
+        # An export interrupted mid-swap leaves only the previous files; one
+        # interrupted before its commit leaves new files that already merge
+        # them, and the rows it meant to delete are exported again
+        previous = f'{final}.old'
+        if not os.path.isdir(final) and os.path.isdir(previous):
+            os.rename(previous, final)
+        else:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def _bounds(self, timestamps, start_us, end_us):
+        lower = int(np.searchsorted(timestamps, start_us, side='left'))
+        upper = len(timestamps) if end_us is None else int(np.searchsorted(timestamps, end_us, side='left'))
+        return lower, upper
+
+    def farm_directory(self, farm_id):
+        """Directory holding a farm's cold months."""
+        return os.path.join(self.root, f'farm_{farm_id}') if self.root else None
+
+    def month_directory(self, farm_id, month):
+        """Directory holding one farm-month's columns."""
+        return os.path.join(self.farm_directory(farm_id), f'{month:%Y%m}')
+
+
+# Global cold reading store, configured in create_app
+cold_readings = ColdReadingStore()
+
+cold_storage_cli = AppGroup('cold-storage', help='Manage columnar cold storage of readings.')
+
+
+@cold_storage_cli.command('export')
+def export_command():
+    """Export months older than READINGS_COLD_AFTER_MONTHS to cold storage."""
+    if not cold_readings.after_months:
+        print('Cold storage export is disabled; set READINGS_COLD_AFTER_MONTHS')
+    result = cold_readings.export()
+    print(f"Exported {result['readings']} readings in {result['months']} farm-months")
+    print(f"Dropped {result['dropped']} expired farm-months")
+
+
+@cold_storage_cli.command('list')
+def list_command():
+    """List cold months per farm with their size."""
+    for farm_id in cold_readings.farms():
+        for month in cold_readings.months(farm_id):
+            directory = cold_readings.month_directory(farm_id, month)
+            size = sum(os.path.getsize(os.path.join(directory, f'{name}.npy')) for name in COLUMNS)
+            count = len(cold_readings.open(farm_id, month)['timestamp'])
+            print(f'farm {farm_id} {month:%Y-%m}: {count} readings, {size / 1024:.0f} KiB')
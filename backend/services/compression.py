@@ -0,0 +1,94 @@
+"""Negotiated compression of large API responses.
+
+JSON lists of readings compress five to ten times, so sending them raw
+costs far more on slow farm uplinks than compressing them costs the
+server. After each request, :class:`ResponseCompressor` compresses
+bodies of compressible types above ``COMPRESSION_MIN_SIZE`` with the
+best encoding the client accepts: brotli when the brotli package is
+installed, otherwise gzip. Small bodies are sent as they are, since the
+saving would not cover the extra CPU and headers.
+
+Streamed and file responses are never buffered for compression.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements-extra.txt
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'text/csv',
+    'text/html',
+    'text/plain',
+}
+
+
+class ResponseCompressor:
+    """Compress responses with gzip or brotli as negotiated by Accept-Encoding."""
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4, enabled=True):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+
+    def init_app(self, app):
+        """Configure from application settings and compress after each request."""
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', self.brotli_quality)
+        self.enabled = app.config.get('COMPRESSION_ENABLED', self.enabled)
+        app.after_request(self.compress)
+        app.extensions['response_compressor'] = self
+
+    @property
+    def encodings(self):
+        """Supported encodings, preferred first."""
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def encode(self, data, encoding):
+        """Compress ``data`` with ``encoding``."""
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def compress(self, response):
+        """Compress a response in place if it qualifies; returns it either way."""
+        if (
+            not self.enabled
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        # Caches must key on the encoding even when this body is sent as is
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None or (response.content_length or 0) < self.min_size:
+            return response
+
+        compressed = self.encode(response.get_data(), encoding)
+        if len(compressed) >= response.content_length:
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # A strong validator must differ between encodings; a weak one need not
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+# Global compressor instance, configured in create_app
+response_compressor = ResponseCompressor()
@@ -0,0 +1,360 @@
+"""Server-side downsampling of reading series for charts.
+
+A chart a thousand pixels wide cannot show more than a thousand points,
+but a week of 5-second readings is over 120k per sensor. These helpers
+reduce each sensor's series to about ``points`` points:
+
+``lttb``
+    Largest-Triangle-Three-Buckets (Steinarsson, "Downsampling Time Series
+    for Visual Representation", 2013). Keeps the readings that shape the
+    line, including isolated spikes. Always computed from raw readings.
+``minmax``
+    The lowest and highest reading of each time bucket, so the envelope of
+    the series is exact. Two points per bucket.
+``avg``
+    The mean of each time bucket.
+
+Buckets of ``minmax`` and ``avg`` are aligned to the Unix epoch like the
+rollups, so whenever the bucket is a whole number of minutes they are
+answered from the rollups instead of raw readings.
+"""
+
+from datetime import datetime
+import math
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import db, ReadingRollup
+from services.archive import archived_count, archived_readings, may_be_archived
+from services.cold_storage import cold_readings
+from services.hot_window import hot_window, to_epoch_us
+from services.partitions import readings_source, to_naive_utc
+from services.rollups import choose_rollup, floor_time
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax', 'avg')
+
+# Most raw readings returned unsampled in one response
+MAX_RAW_POINTS = 200000
+
+# Smallest bucket the rollups can answer
+ROLLUP_MIN_STEP = 60
+
+
+def bucket_step(range_seconds, buckets):
+    """Bucket width in seconds that splits a range into at most ``buckets``.
+
+    Epoch alignment can add a partial bucket at each end, so the range is
+    divided by one bucket less. Widths of a minute or more are rounded up
+    to whole minutes so the rollups can serve them.
+    """
+    step = range_seconds / max(buckets - 1, 1)
+    if step >= ROLLUP_MIN_STEP:
+        return int(math.ceil(step / 60)) * 60
+    return max(step, 1e-6)
+
+
+def lttb_indices(timestamps, values, points):
+    """Indices of the readings Largest-Triangle-Three-Buckets keeps.
+
+    The first and last readings are always kept; the rest are split into
+    ``points - 2`` buckets of equal count and from each bucket the reading
+    forming the largest triangle with the previously kept reading and the
+    mean of the next bucket is kept.
+
+    Args:
+        timestamps: Epoch microseconds, sorted ascending
+        values: Reading values, one per timestamp
+        points: Number of readings to keep (at least 3)
+
+    Returns:
+        Sorted int64 index array
+    """
+    count = len(timestamps)
+    if points >= count or points < 3:
+        return np.arange(count)
+
+    # Seconds from the first reading keep the products well within float64
+    x = (np.asarray(timestamps, dtype=np.int64) - timestamps[0]) / 1e6
+    y = np.asarray(values, dtype=np.float64)
+
+    every = (count - 2) / (points - 2)
+    edges = (np.arange(points - 1) * every).astype(np.int64) + 1
+    edges[-1] = count - 1
+    sizes = np.diff(edges)
+    # Sum over the same bounds as the sizes; the last reading is not in a bucket
+    mean_x = np.add.reduceat(x, edges)[:-1] / sizes
+    mean_y = np.add.reduceat(y, edges)[:-1] / sizes
+    # Each bucket looks ahead to the next one; the last looks at the last reading
+    next_x = np.append(mean_x[1:], x[-1]).tolist()
+    next_y = np.append(mean_y[1:], y[-1]).tolist()
+    bounds = edges.tolist()
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    ax, ay = x[0], y[0]
+    for i in range(points - 2):
+        lower, upper = bounds[i], bounds[i + 1]
+        cx, cy = next_x[i], next_y[i]
+        # Twice the triangle area, expanded to a linear function of the candidate
+        areas = np.abs((ax - cx) * y[lower:upper] + (cy - ay) * x[lower:upper] + (cx * ay - ax * cy))
+        chosen = lower + int(areas.argmax())
+        selected[i + 1] = chosen
+        ax, ay = x[chosen], y[chosen]
+
+    return selected
+
+
+def minmax_indices(buckets, low, high=None):
+    """Indices of the lowest and highest entry of each bucket.
+
+    Args:
+        buckets: Bucket number of each entry, sorted ascending
+        low: Values compared for the minimum
+        high: Values compared for the maximum; defaults to ``low``
+
+    Returns:
+        Sorted int64 index array, one or two entries per bucket
+    """
+    if not len(buckets):
+        return np.empty(0, dtype=np.int64)
+    high = low if high is None else high
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    lowest = np.lexsort((low, buckets))[starts]
+    highest = np.lexsort((-np.asarray(high), buckets))[starts]
+    return np.unique(np.concatenate((lowest, highest)))
+
+
+def bucket_means(buckets, sums, counts):
+    """Return (bucket numbers, means) of entries grouped by bucket.
+
+    ``buckets`` must be sorted ascending. Raw readings pass their values as
+    ``sums`` with a count of one each; rollups pass their stored sums.
+    """
+    if not len(buckets):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    return buckets[starts], np.add.reduceat(sums, starts) / np.add.reduceat(counts, starts)
+
+
+def downsample_series(timestamps, values, method, points, step_seconds):
+    """Downsample one sensor's raw readings.
+
+    Returns:
+        Tuple of (epoch microsecond array, value array)
+    """
+    if method == 'lttb':
+        keep = lttb_indices(timestamps, values, points)
+        return timestamps[keep], values[keep]
+
+    step_us = int(step_seconds * 1e6)
+    buckets = timestamps // step_us
+    if method == 'minmax':
+        keep = minmax_indices(buckets, values)
+        return timestamps[keep], values[keep]
+
+    buckets, means = bucket_means(buckets, values, np.ones(len(values)))
+    return buckets * step_us, means
+
+
+def raw_series(farm_id, since, sensor_ids, max_points=None):
+    """Read each sensor's readings since ``since`` as columns.
+
+    Serves from the hot window when it covers the range, otherwise from the
+    readings table, the archive and cold storage. Sensors without readings
+    are left out.
+
+    Args:
+        max_points: Optional maximum number of readings; larger ranges are
+            refused before they are loaded
+
+    Returns:
+        Tuple of (source name, {sensor_id: (epoch microsecond array, value
+        array)} sorted by timestamp)
+
+    Raises:
+        ValueError: If the range holds more than ``max_points`` readings
+    """
+    if hot_window.covers(since):
+        series = {}
+        for sensor_id in sensor_ids:
+            columns = hot_window.readings(sensor_id, since)
+            if columns is None:
+                break
+            if len(columns[0]):
+                series[sensor_id] = columns[1:]
+        else:
+            check_points(sum(len(values) for _, values in series.values()), max_points)
+            return 'hot_window', series
+
+    if max_points is not None:
+        check_points(count_readings(farm_id, since, sensor_ids), max_points)
+
+    Reading = readings_source(since)
+    rows = db.session.execute(select(Reading.sensor_id, Reading.timestamp, Reading.value).where(
+        Reading.farm_id == farm_id,
+        Reading.timestamp >= since,
+        Reading.sensor_id.in_(sensor_ids)
+    )).all()
+    parts = [columns_of(rows)]
+
+    if may_be_archived(since):
+        parts.append(columns_of(archived_readings(since, farm_id=farm_id, sensor_ids=sensor_ids)))
+        if cold_readings.may_cover(since):
+            for _, sensors, timestamps, values in cold_readings.scan(since, farm_id=farm_id, sensor_ids=sensor_ids):
+                parts.append((sensors.astype(np.int64), timestamps, values))
+
+    sensors, timestamps, values = (np.concatenate(column) for column in zip(*parts))
+    return 'readings', split_by_sensor(sensors, timestamps, values)
+
+
+def count_readings(farm_id, since, sensor_ids):
+    """Count the readings :func:`raw_series` would load from the database tiers."""
+    Reading = readings_source(since)
+    count = db.session.execute(select(func.count()).select_from(Reading).where(
+        Reading.farm_id == farm_id,
+        Reading.timestamp >= since,
+        Reading.sensor_id.in_(sensor_ids)
+    )).scalar()
+    if may_be_archived(since):
+        count += archived_count(since, farm_id, sensor_ids)
+        if cold_readings.may_cover(since):
+            count += cold_readings.count(since, farm_id, sensor_ids)
+    return count
+
+
+def check_points(count, max_points):
+    """Raise ValueError when ``count`` readings exceed ``max_points``."""
+    if max_points is not None and count > max_points:
+        raise ValueError(
+            f'Range holds more than {max_points} raw readings; use a shorter hours, a sensor_type '
+            'or points with method minmax or avg'
+        )
+
+
+def rollup_series(farm_id, since, sensor_ids, step_seconds):
+    """Read each sensor's rollups since ``since`` as columns.
+
+    Reads the coarsest stored resolution that tiles ``step_seconds``,
+    starting at the bucket containing ``since``.
+
+    Returns:
+        Tuple of (resolution, {sensor_id: (bucket start epoch microseconds,
+        count, min, max, sum) arrays}) sorted by bucket
+    """
+    resolution = choose_rollup(step_seconds)
+    rows = db.session.query(
+        ReadingRollup.sensor_id, ReadingRollup.bucket_start, ReadingRollup.reading_count,
+        ReadingRollup.min_value, ReadingRollup.max_value, ReadingRollup.sum_value
+    ).filter(
+        ReadingRollup.farm_id == farm_id,
+        ReadingRollup.resolution == resolution,
+        ReadingRollup.bucket_start >= floor_time(to_naive_utc(since), step_seconds),
+        ReadingRollup.sensor_id.in_(sensor_ids)
+    ).all()
+
+    count = len(rows)
+    sensors = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    starts = np.array([row[1] for row in rows], dtype='datetime64[us]').astype(np.int64)
+    columns = [np.fromiter((row[i] for row in rows), dtype=np.float64, count=count) for i in range(2, 6)]
+    order = np.lexsort((starts, sensors))
+    sensors, starts = sensors[order], starts[order]
+    columns = [column[order] for column in columns]
+
+    series = {}
+    bounds = np.flatnonzero(np.diff(sensors, prepend=-1, append=-1))
+    for lower, upper in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        series[int(sensors[lower])] = (starts[lower:upper], *(column[lower:upper] for column in columns))
+    return resolution, series
+
+
+def downsample_rollups(series, method, step_seconds):
+    """Downsample one sensor's rollup columns with ``minmax`` or ``avg``.
+
+    The minimum and maximum are exact; their timestamps are those of the
+    stored rollup bucket holding them.
+    """
+    starts, counts, minimums, maximums, sums = series
+    step_us = step_seconds * 1000000
+    buckets = starts // step_us
+    if method == 'minmax':
+        first = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+        lowest = np.lexsort((minimums, buckets))[first]
+        highest = np.lexsort((-maximums, buckets))[first]
+        # One point when a bucket is flat, otherwise the minimum and the maximum
+        flat = (lowest == highest) & (minimums[lowest] == maximums[highest])
+        timestamps = np.concatenate((starts[lowest], starts[highest][~flat]))
+        values = np.concatenate((minimums[lowest], maximums[highest][~flat]))
+        order = np.argsort(timestamps, kind='stable')
+        return timestamps[order], values[order]
+
+    buckets, means = bucket_means(buckets, sums, counts)
+    return buckets * step_us, means
+
+
+def downsample_readings(farm_id, since, sensor_ids, method, points, use_rollups=True):
+    """Downsample each sensor's readings since ``since`` to about ``points`` points.
+
+    Args:
+        farm_id: Farm to read
+        since: Start of the range; it ends now
+        sensor_ids: Sensors to include
+        method: One of :data:`DOWNSAMPLING_METHODS`
+        points: Target points per sensor
+        use_rollups: Whether ``minmax`` and ``avg`` may read the rollups
+
+    Returns:
+        Tuple of (source name, bucket width in seconds or None for
+        ``lttb``, {sensor_id: (epoch microsecond array, value array)})
+
+    Raises:
+        ValueError: If ``method`` is unknown, or raw readings would be read
+            and the range holds more than :data:`MAX_RAW_POINTS` of them
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Method must be one of {', '.join(DOWNSAMPLING_METHODS)}")
+    if not sensor_ids:
+        return 'readings', None, {}
+
+    range_seconds = max((to_epoch_us(datetime.utcnow()) - to_epoch_us(since)) / 1e6, 1)
+    step = None
+    if method != 'lttb':
+        step = bucket_step(range_seconds, points // 2 if method == 'minmax' else points)
+
+        # The hot window is cheaper than the rollups for the range it holds
+        if use_rollups and step >= ROLLUP_MIN_STEP and not hot_window.covers(since):
+            resolution, series = rollup_series(farm_id, since, sensor_ids, step)
+            if series:
+                return f'rollup:{resolution}', step, {
+                    sensor_id: downsample_rollups(columns, method, step) for sensor_id, columns in series.items()
+                }
+
+    source, series = raw_series(farm_id, since, sensor_ids, max_points=MAX_RAW_POINTS)
+    return source, step, {
+        sensor_id: downsample_series(timestamps, values, method, points, step)
+        for sensor_id, (timestamps, values) in series.items()
+    }
+
+
+def columns_of(rows):
+    """Convert rows with ``sensor_id``, ``timestamp`` and ``value`` to column arrays."""
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    sensors, timestamps, values = zip(*((row.sensor_id, row.timestamp, row.value) for row in rows))
+    return (
+        np.array(sensors, dtype=np.int64),
+        np.array(timestamps, dtype='datetime64[us]').astype(np.int64),
+        np.array(values, dtype=np.float64)
+    )
+
+
+def split_by_sensor(sensors, timestamps, values):
+    """Group column arrays by sensor, each group sorted by timestamp."""
+    order = np.lexsort((timestamps, sensors))
+    sensors, timestamps, values = sensors[order], timestamps[order], values[order]
+    series = {}
+    bounds = np.flatnonzero(np.diff(sensors, prepend=-1, append=-1))
+    for lower, upper in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        series[int(sensors[lower])] = (timestamps[lower:upper], values[lower:upper])
+    return series
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import csv
+import heapq
 import io
 from datetime import datetime, timedelta, timezone
 from typing import List
@@ -12,7 +13,10 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
 from reportlab.pdfgen import canvas
 
-from models import db, Farm, Sensor, SensorReading
+from models import db, Farm, Sensor
+from services.archive import archived_readings, may_be_archived
+from services.cold_storage import cold_readings
+from services.partitions import readings_source
 
 
 def export_farm_readings_csv(farm_id: int, hours: int = 24) -> Response:
@@ -24,14 +28,28 @@ def export_farm_readings_csv(farm_id: int, hours: int = 24) -> Response:
     writer = csv.writer(output)
     writer.writerow(["timestamp", "sensor_id", "sensor_name", "type", "unit", "value"])
 
+    Reading = readings_source(start)
     readings = (
-        db.session.query(SensorReading, Sensor)
-        .join(Sensor, Sensor.id == SensorReading.sensor_id)
-        .filter(SensorReading.farm_id == farm_id, SensorReading.timestamp >= start)
-        .order_by(SensorReading.timestamp.asc())
+        db.session.query(Reading, Sensor)
+        .join(Sensor, Sensor.id == Reading.sensor_id)
+        .filter(Reading.farm_id == farm_id, Reading.timestamp >= start)
+        .order_by(Reading.timestamp.asc())
         .all()
     )
 
+    # Interleave readings already sealed into the compressed archive or cold storage
+    if may_be_archived(start):
+        sensors = {sensor.id: sensor for sensor in Sensor.query.filter_by(farm_id=farm_id)}
+        archived = [
+            (reading, sensors[reading.sensor_id])
+            for reading in archived_readings(start, farm_id=farm_id)
+        ]
+        cold = (
+            (reading, sensors[reading.sensor_id])
+            for reading in cold_readings.readings(start, farm_id=farm_id)
+        ) if cold_readings.may_cover(start) else ()
+        readings = heapq.merge(readings, archived, cold, key=lambda row: row[0].timestamp)
+
     for reading, sensor in readings:
         writer.writerow([
             reading.timestamp.isoformat(),
@@ -63,9 +81,10 @@ def export_farm_summary_pdf(farm_id: int, hours: int = 24) -> Response:
 
     # Aggregate metrics
     sensors: List[Sensor] = Sensor.query.filter_by(farm_id=farm_id).all()
+    Reading = readings_source(start)
     readings_count = (
-        SensorReading.query.filter(
-            SensorReading.farm_id == farm_id, SensorReading.timestamp >= start
+        db.session.query(Reading).filter(
+            Reading.farm_id == farm_id, Reading.timestamp >= start
         ).count()
     )
 
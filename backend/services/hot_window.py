@@ -0,0 +1,297 @@
+"""In-memory columnar store of the most recent readings per sensor.
+
+Each sensor gets preallocated NumPy ring buffers of reading ids, epoch
+microsecond timestamps and values. The store is warmed from the database
+at startup, appended to as this process stores readings, and caught up
+with readings written by other processes by polling for new reading ids.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import db, SensorReading
+from services.partitions import readings_source
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_us(moment):
+    """Naive UTC datetime to integer epoch microseconds."""
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(values):
+    """Epoch microsecond array to a list of naive UTC datetimes."""
+    return np.asarray(values, dtype=np.int64).astype('datetime64[us]').tolist()
+
+
+class SensorRing:
+    """Fixed-capacity ring of one sensor's readings in insertion order.
+
+    Readings may arrive out of timestamp order, so reads sort the selected
+    slice. ``complete_since`` is the earliest timestamp from which the ring
+    is known to hold every reading; it moves forward as readings are
+    overwritten.
+    """
+
+    __slots__ = ('ids', 'timestamps', 'values', 'size', 'head', 'complete_since')
+
+    def __init__(self, capacity, complete_since):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+        self.head = 0
+        self.complete_since = complete_since
+
+    def extend(self, ids, timestamps, values):
+        """Append readings, overwriting the oldest inserted when full."""
+        capacity = len(self.ids)
+        count = len(ids)
+        if count > capacity:
+            self._evicted(timestamps[:count - capacity])
+            ids, timestamps, values = ids[-capacity:], timestamps[-capacity:], values[-capacity:]
+            count = capacity
+
+        positions = (self.head + np.arange(count)) % capacity
+        overwritten = max(0, self.size + count - capacity)
+        if overwritten:
+            self._evicted(self.timestamps[positions[count - overwritten:]])
+
+        self.ids[positions] = ids
+        self.timestamps[positions] = timestamps
+        self.values[positions] = values
+        self.head = (self.head + count) % capacity
+        self.size = min(self.size + count, capacity)
+
+    def contains(self, ids):
+        """Mask of which reading ids are already in the ring."""
+        return np.isin(ids, self.ids[:self.size])
+
+    def select(self, since):
+        """Return (ids, timestamps, values) at or after ``since``, oldest first."""
+        mask = self.timestamps[:self.size] >= since
+        ids = self.ids[:self.size][mask]
+        timestamps = self.timestamps[:self.size][mask]
+        values = self.values[:self.size][mask]
+        order = np.lexsort((ids, timestamps))
+        return ids[order], timestamps[order], values[order]
+
+    def _evicted(self, timestamps):
+        if len(timestamps):
+            self.complete_since = max(self.complete_since, int(timestamps.max()) + 1)
+
+
+class HotWindowStore:
+    """Per-sensor ring buffers covering the recent window of readings.
+
+    A read can be served when the store has been warmed and the requested
+    window starts no earlier than the warmed window; otherwise callers fall
+    back to the database. Before reads, the store polls for readings with
+    ids above its high-water mark, at most every ``sync_interval`` seconds.
+    Ids above the mark seen ``sync_slack`` seconds ago are re-read, so rows
+    from transactions that committed out of id order are not missed.
+    """
+
+    def __init__(self, capacity=17280, hours=24):
+        self.enabled = False
+        self.capacity = capacity
+        self.hours = hours
+        self.sync_interval = 1.0
+        self.sync_slack = 5.0
+        self.covered_since = None
+        self._rings = {}
+        self._high_water = deque()
+        self._last_sync = 0.0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        """Configure the store from application settings."""
+        self.enabled = app.config.get('HOT_WINDOW_ENABLED', False)
+        self.capacity = app.config.get('HOT_WINDOW_CAPACITY', self.capacity)
+        self.hours = app.config.get('HOT_WINDOW_HOURS', self.hours)
+        self.sync_interval = app.config.get('HOT_WINDOW_SYNC_INTERVAL', self.sync_interval)
+        self.sync_slack = app.config.get('HOT_WINDOW_SYNC_SLACK', self.sync_slack)
+        with self._lock:
+            self._rings = {}
+            self.covered_since = None
+        app.extensions['hot_window'] = self
+
+    def warm(self):
+        """Load the recent window of every sensor from the database."""
+        if not self.enabled:
+            return
+
+        now = datetime.utcnow()
+        since = now - timedelta(hours=self.hours)
+        high_water = db.session.query(func.max(SensorReading.id)).scalar() or 0
+
+        Reading = readings_source(since)
+        rows = db.session.execute(
+            select(Reading.id, Reading.sensor_id, Reading.timestamp, Reading.value).where(
+                Reading.timestamp >= since
+            ).order_by(Reading.sensor_id, Reading.timestamp)
+        ).all()
+
+        with self._lock:
+            self.covered_since = to_epoch_us(since)
+            self._rings = {}
+            self._apply(rows, check_duplicates=False)
+            self._high_water = deque([(time.monotonic(), high_water)])
+            self._last_sync = time.monotonic()
+
+        logger.info(f'Hot window warmed with {len(rows)} readings')
+
+    def append(self, rows):
+        """Add readings this process has just stored.
+
+        Args:
+            rows: Mappings with ``id``, ``sensor_id``, ``timestamp`` and ``value``
+        """
+        if not self.enabled or self.covered_since is None or not rows:
+            return
+        with self._lock:
+            self._apply([
+                (row['id'], row['sensor_id'], row['timestamp'], row['value']) for row in rows
+            ])
+
+    def covers(self, since):
+        """Whether reads starting at ``since`` can be served from memory."""
+        if not self.enabled or self.covered_since is None:
+            return False
+        self.sync()
+        return to_epoch_us(since) >= self.covered_since
+
+    def readings(self, sensor_id, since):
+        """Return (ids, timestamps, values) arrays for a sensor, oldest first.
+
+        Returns:
+            The arrays, or None if the ring no longer holds all readings
+            since ``since``
+        """
+        since_us = to_epoch_us(since)
+        with self._lock:
+            ring = self._rings.get(sensor_id)
+            if ring is None:
+                empty = np.empty(0, dtype=np.int64)
+                return empty, empty, np.empty(0, dtype=np.float64)
+            if since_us < ring.complete_since:
+                return None
+            return ring.select(since_us)
+
+    def farm_readings(self, sensor_ids, since, limit=None, before=None):
+        """Return readings of several sensors since ``since``, newest first.
+
+        Readings are ordered by (timestamp, sensor_id) descending.
+
+        Args:
+            sensor_ids: Sensors to read
+            since: Inclusive start of the window
+            limit: Optional maximum number of readings to return
+            before: Optional (timestamp, sensor_id) key; only readings
+                ordered after it are returned
+
+        Returns:
+            List of (id, sensor_id, timestamp, value) tuples, or None if the
+            window cannot be served from memory
+        """
+        if not self.covers(since):
+            return None
+
+        parts = []
+        for sensor_id in sensor_ids:
+            selected = self.readings(sensor_id, since)
+            if selected is None:
+                return None
+            parts.append((np.full(len(selected[0]), sensor_id, dtype=np.int64),) + selected)
+        if not parts:
+            return []
+
+        sensors, ids, timestamps, values = (np.concatenate(column) for column in zip(*parts))
+        if before is not None:
+            before_us, before_sensor = to_epoch_us(before[0]), before[1]
+            mask = (timestamps < before_us) | ((timestamps == before_us) & (sensors < before_sensor))
+            sensors, ids, timestamps, values = sensors[mask], ids[mask], timestamps[mask], values[mask]
+        order = np.lexsort((-sensors, -timestamps))[:limit]
+        return list(zip(
+            ids[order].tolist(),
+            sensors[order].tolist(),
+            from_epoch_us(timestamps[order]),
+            values[order].tolist()
+        ))
+
+    def sync(self, force=False):
+        """Pick up readings stored by other processes since the last sync."""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+
+        with self._lock:
+            self._last_sync = now
+            while len(self._high_water) > 1 and self._high_water[1][0] <= now - self.sync_slack:
+                self._high_water.popleft()
+            floor = self._high_water[0][1]
+
+        rows = db.session.execute(
+            select(
+                SensorReading.id, SensorReading.sensor_id, SensorReading.timestamp, SensorReading.value
+            ).where(SensorReading.id > floor).order_by(SensorReading.id)
+        ).all()
+
+        with self._lock:
+            self._apply(rows)
+            high_water = max(self._high_water[-1][1], rows[-1][0] if rows else 0)
+            self._high_water.append((now, high_water))
+
+    def stats(self):
+        """Return ring occupancy for monitoring."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'warm': self.covered_since is not None,
+                'sensors': len(self._rings),
+                'readings': sum(ring.size for ring in self._rings.values()),
+                'capacity_per_sensor': self.capacity
+            }
+
+    def _apply(self, rows, check_duplicates=True):
+        """Append (id, sensor_id, timestamp, value) rows grouped by sensor."""
+        if not rows:
+            return
+
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        sensor_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        timestamps = np.array([row[2] for row in rows], dtype='datetime64[us]').astype(np.int64)
+        values = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+
+        # Late readings older than the window are never served from memory
+        keep = timestamps >= self.covered_since
+        order = np.argsort(sensor_ids[keep], kind='stable')
+        ids, sensor_ids = ids[keep][order], sensor_ids[keep][order]
+        timestamps, values = timestamps[keep][order], values[keep][order]
+
+        unique_ids, starts = np.unique(sensor_ids, return_index=True)
+        ends = np.append(starts[1:], len(sensor_ids))
+        for sensor_id, start, end in zip(unique_ids.tolist(), starts.tolist(), ends.tolist()):
+            ring = self._rings.get(sensor_id)
+            if ring is None:
+                ring = self._rings[sensor_id] = SensorRing(self.capacity, self.covered_since)
+
+            chunk = slice(start, end)
+            if check_duplicates:
+                new = ~ring.contains(ids[chunk])
+                ring.extend(ids[chunk][new], timestamps[chunk][new], values[chunk][new])
+            else:
+                ring.extend(ids[chunk], timestamps[chunk], values[chunk])
+
+
+# Global hot window store, configured and warmed in create_app
+hot_window = HotWindowStore()
@@ -0,0 +1,192 @@
+"""Write-behind group-commit buffer for sensor readings."""
+
+from collections import deque
+from concurrent.futures import Future
+import atexit
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_FLUSH = 'flush'      # acknowledge once the group is committed
+DURABILITY_ENQUEUE = 'enqueue'  # acknowledge as soon as the rows are queued
+
+
+class BufferFullError(Exception):
+    """Raised when the buffer has no room for more readings."""
+
+
+class ReadingBuffer:
+    """Bounded in-process queue of readings committed in groups.
+
+    Request handlers submit validated reading rows; a background thread
+    writes them with one bulk insert and one commit per group. A group is
+    flushed once it reaches ``batch_size`` rows or when the oldest queued
+    row has waited ``flush_ms`` milliseconds, whichever comes first.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.max_size = 10000
+        self.batch_size = 500
+        self.flush_ms = 5
+        self.durability = DURABILITY_FLUSH
+        self.ack_timeout = 5.0
+        self._pending = deque()  # (rows, sensors, future, enqueue time)
+        self._pending_rows = 0
+        self._closed = False
+        self._exit_hook = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        """Configure the buffer from application settings."""
+        self.app = app
+        self.enabled = app.config.get('INGEST_BUFFER_ENABLED', False)
+        self.max_size = app.config.get('INGEST_BUFFER_MAX_SIZE', self.max_size)
+        self.batch_size = app.config.get('INGEST_BUFFER_BATCH_SIZE', self.batch_size)
+        self.flush_ms = app.config.get('INGEST_BUFFER_FLUSH_MS', self.flush_ms)
+        self.durability = app.config.get('INGEST_BUFFER_DURABILITY', self.durability)
+        self.ack_timeout = app.config.get('INGEST_BUFFER_ACK_TIMEOUT', self.ack_timeout)
+
+        if self.durability not in (DURABILITY_FLUSH, DURABILITY_ENQUEUE):
+            raise ValueError(f'Unknown INGEST_BUFFER_DURABILITY: {self.durability}')
+
+        # Allow a buffer that was shut down to be reused by a new app
+        with self._cond:
+            if self._thread is not None and not self._thread.is_alive():
+                self._thread = None
+                self._closed = False
+
+        app.extensions['reading_buffer'] = self
+        # One exit hook however many apps configure the buffer
+        if self.enabled and not self._exit_hook:
+            atexit.register(self.shutdown)
+            self._exit_hook = True
+
+    def submit(self, rows, sensors):
+        """Queue reading rows for the next group commit.
+
+        Args:
+            rows: List of reading dicts ready for bulk insert
+            sensors: Mapping of sensor id to cached metadata for alert checks
+
+        Returns:
+            Future resolved with the rows that were inserted once their
+            group is committed, or failed with the write error
+
+        Raises:
+            BufferFullError: If the rows do not fit in the queue
+        """
+        self._ensure_started()
+        future = Future()
+
+        with self._cond:
+            if self._closed:
+                raise BufferFullError('Ingest buffer is shutting down')
+            if self._pending_rows + len(rows) > self.max_size:
+                raise BufferFullError('Ingest buffer is full')
+
+            self._pending.append((rows, sensors, future, time.monotonic()))
+            self._pending_rows += len(rows)
+            self._cond.notify()
+
+        return future
+
+    def stats(self):
+        """Return queue depth for monitoring."""
+        with self._cond:
+            return {
+                'enabled': self.enabled,
+                'durability': self.durability,
+                'pending_rows': self._pending_rows,
+                'max_size': self.max_size
+            }
+
+    def shutdown(self, timeout=10.0):
+        """Stop accepting readings and flush everything still queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        # Started lazily so a buffer created before a fork (gunicorn --preload)
+        # gets its own flusher thread in each worker
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._cond:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._closed = False
+            self._thread = threading.Thread(
+                target=self._run, name='reading-buffer-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            group = self._next_group()
+            if group is None:
+                return
+            self._flush(group)
+
+    def _next_group(self):
+        """Block until a group is due, then take it off the queue."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    if self._closed or self._pending_rows >= self.batch_size:
+                        break
+                    # Rows left by the previous group keep their enqueue time
+                    remaining = self._pending[0][3] + self.flush_ms / 1000.0 - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+
+            group = []
+            taken = 0
+            while self._pending and (not group or taken + len(self._pending[0][0]) <= self.batch_size):
+                entry = self._pending.popleft()
+                taken += len(entry[0])
+                group.append(entry)
+
+            self._pending_rows -= taken
+            return group
+
+    def _flush(self, group):
+        from services.ingest_service import inserted_rows, store_readings
+
+        rows = []
+        sensors = {}
+        for entry_rows, entry_sensors, _, _ in group:
+            rows.extend(entry_rows)
+            sensors.update(entry_sensors)
+
+        try:
+            with self.app.app_context():
+                stored = store_readings(rows, sensors)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(rows)} buffered readings: {str(e)}")
+            for _, _, future, _ in group:
+                future.set_exception(e)
+            return
+
+        for entry_rows, _, future, _ in group:
+            future.set_result(inserted_rows(entry_rows, stored))
+
+
+# Global buffer instance, configured in create_app
+reading_buffer = ReadingBuffer()
@@ -0,0 +1,123 @@
+"""Compact wire encodings for batches of sensor readings.
+
+Two encodings are supported next to JSON:
+
+- Line protocol (``text/plain``): one ``sensor_id value [timestamp]`` record
+  per line, separated by whitespace. The timestamp is optional and given in
+  Unix epoch seconds.
+- Binary frame (``application/octet-stream``): packed little-endian records of
+  (uint32 sensor_id, float64 epoch seconds, float32 value), 16 bytes each,
+  with no header. A timestamp of 0 means "use the server receive time".
+
+Readings served back with ``format=binary`` use the same layout with a
+float64 value (:data:`READ_RECORD_DTYPE`, 20 bytes each), so stored values
+are returned without rounding.
+
+Both decoders return a :class:`ReadingColumns` of NumPy arrays; the binary
+decoder returns views into the request body without copying.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+LINE_PROTOCOL_MIMETYPE = 'text/plain'
+BINARY_FRAME_MIMETYPE = 'application/octet-stream'
+
+RECORD_DTYPE = np.dtype([
+    ('sensor_id', '<u4'),
+    ('timestamp', '<f8'),
+    ('value', '<f4'),
+])
+
+READ_RECORD_DTYPE = np.dtype([
+    ('sensor_id', '<u4'),
+    ('timestamp', '<f8'),
+    ('value', '<f8'),
+])
+
+# Column arrays for a decoded batch. Missing timestamps are NaN; records that
+# could not be parsed have sensor id 0 so validation can report them by index.
+ReadingColumns = namedtuple('ReadingColumns', ['sensor_ids', 'timestamps', 'values'])
+
+
+class DecodeError(ValueError):
+    """Raised when a payload is not a valid frame in the declared encoding."""
+
+
+def decode_binary_frame(payload, dtype=RECORD_DTYPE):
+    """Decode a packed binary frame without copying the payload."""
+    if len(payload) % dtype.itemsize:
+        raise DecodeError(
+            f'Binary frame length must be a multiple of {dtype.itemsize} bytes'
+        )
+
+    records = np.frombuffer(payload, dtype=dtype)
+    return ReadingColumns(records['sensor_id'], records['timestamp'], records['value'])
+
+
+def encode_binary_frame(sensor_ids, timestamps, values, dtype=RECORD_DTYPE):
+    """Pack reading columns into a binary frame."""
+    records = np.empty(len(sensor_ids), dtype=dtype)
+    records['sensor_id'] = sensor_ids
+    records['timestamp'] = timestamps
+    records['value'] = values
+    return records.tobytes()
+
+
+def decode_line_protocol(payload):
+    """Decode a line protocol payload (bytes or str).
+
+    Blank lines are skipped. Malformed lines are kept as invalid records
+    rather than failing the whole batch.
+    """
+    if isinstance(payload, bytes):
+        try:
+            payload = payload.decode('ascii')
+        except UnicodeDecodeError:
+            raise DecodeError('Line protocol payload must be ASCII')
+
+    lines = [line for line in payload.splitlines() if line.strip()]
+    count = len(lines)
+    sensor_ids = np.zeros(count, dtype=np.uint32)
+    timestamps = np.full(count, np.nan, dtype=np.float64)
+    values = np.full(count, np.nan, dtype=np.float64)
+
+    for i, line in enumerate(lines):
+        fields = line.split()
+        if len(fields) not in (2, 3):
+            continue
+        try:
+            sensor_id = int(fields[0])
+            value = float(fields[1])
+            timestamp = float(fields[2]) if len(fields) == 3 else np.nan
+        except ValueError:
+            continue
+        if not 0 < sensor_id <= 0xFFFFFFFF:
+            continue
+        sensor_ids[i] = sensor_id
+        values[i] = value
+        timestamps[i] = timestamp
+
+    return ReadingColumns(sensor_ids, timestamps, values)
+
+
+def encode_line_protocol(sensor_ids, timestamps, values):
+    """Format reading columns as line protocol text."""
+    return ''.join(
+        f'{int(sensor_id)} {float(value)!r} {float(timestamp)!r}\n'
+        for sensor_id, timestamp, value in zip(sensor_ids, timestamps, values)
+    )
+
+
+def decode_payload(mimetype, payload):
+    """Decode a request body according to its content type.
+
+    Returns:
+        ReadingColumns, or None if the mimetype is not a compact encoding
+    """
+    if mimetype == LINE_PROTOCOL_MIMETYPE:
+        return decode_line_protocol(payload)
+    if mimetype == BINARY_FRAME_MIMETYPE:
+        return decode_binary_frame(payload)
+    return None
@@ -0,0 +1,82 @@
+"""Recent-key filter for dropping duplicate sensor readings cheaply."""
+
+from collections import OrderedDict
+import threading
+
+
+class RecentKeyFilter:
+    """Bounded set of recently ingested reading keys.
+
+    Keys are ``(sensor_id, device timestamp)`` or ``(sensor_id, message id)``
+    tuples. A hit means the reading was already accepted and can be dropped
+    without touching the database. Only the most recent ``capacity`` keys
+    are kept: older device-timestamped duplicates are still rejected by the
+    unique (sensor_id, timestamp) index, while message ids are only
+    deduplicated within this window.
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.hits = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the filter from application settings."""
+        self.capacity = app.config.get('INGEST_DEDUP_CAPACITY', self.capacity)
+        self.clear()
+        app.extensions['recent_keys'] = self
+
+    def claim(self, keys):
+        """Record keys as seen.
+
+        Args:
+            keys: Iterable of hashable keys, or None for readings without one
+
+        Returns:
+            List of booleans, True where the key was already seen (including
+            earlier in the same call)
+        """
+        duplicates = []
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    duplicates.append(False)
+                elif key in self._keys:
+                    self._keys.move_to_end(key)
+                    self.hits += 1
+                    duplicates.append(True)
+                else:
+                    self._keys[key] = None
+                    duplicates.append(False)
+
+            while len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+
+        return duplicates
+
+    def release(self, keys):
+        """Forget keys whose readings failed to be stored, so retries succeed."""
+        with self._lock:
+            for key in keys:
+                if key is not None:
+                    self._keys.pop(key, None)
+
+    def clear(self):
+        """Drop all keys."""
+        with self._lock:
+            self._keys.clear()
+            self.hits = 0
+
+    def stats(self):
+        """Return filter size and duplicate count for monitoring."""
+        with self._lock:
+            return {
+                'size': len(self._keys),
+                'capacity': self.capacity,
+                'duplicates_dropped': self.hits
+            }
+
+
+# Global filter instance, configured in create_app
+recent_keys = RecentKeyFilter()
@@ -0,0 +1,481 @@
+"""Batch ingestion service for high-volume sensor readings."""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import logging
+import math
+
+from flask import current_app
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, SensorReading
+from services.archive import exclude_archived
+from services.cold_storage import cold_readings
+from services.ingest_buffer import DURABILITY_ENQUEUE, reading_buffer
+from services.hot_window import hot_window
+from services.ingest_dedup import recent_keys
+from services.partitions import exclude_moved
+from services.rollups import update_rollups
+from services.sensor_cache import sensor_cache
+from services.sensor_latest import update_sensor_latest
+from services.versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPayloadError(ValueError):
+    """Raised when a batch payload envelope cannot be parsed."""
+
+
+def parse_batch_payload(data):
+    """Flatten a JSON batch payload into a list of raw reading items.
+
+    Two layouts are accepted:
+
+    - Row-oriented: ``{"readings": [{"sensor_id": 1, "value": 6.1}, ...]}``
+      or the bare list itself. Items may also carry a device ``timestamp``
+      (ISO 8601 or Unix epoch seconds) and a ``message_id``
+    - Columnar per sensor: ``{"sensors": [{"sensor_id": 1, "values": [...]}]}``
+
+    Per-item problems (missing fields, bad values) are left for
+    :func:`ingest_readings` to report individually; only a malformed envelope
+    raises :class:`BatchPayloadError`.
+    """
+    if isinstance(data, list):
+        data = {'readings': data}
+
+    if not isinstance(data, dict):
+        raise BatchPayloadError('Batch payload must be a JSON object or list')
+
+    items = []
+
+    readings = data.get('readings', [])
+    if not isinstance(readings, list):
+        raise BatchPayloadError('"readings" must be a list')
+    for item in readings:
+        items.append(item if isinstance(item, dict) else {})
+
+    columns = data.get('sensors', [])
+    if not isinstance(columns, list):
+        raise BatchPayloadError('"sensors" must be a list')
+    for column in columns:
+        if not isinstance(column, dict) or not isinstance(column.get('values'), list):
+            raise BatchPayloadError('Each sensor entry needs a sensor_id and a values list')
+        for value in column['values']:
+            items.append({'sensor_id': column.get('sensor_id'), 'value': value})
+
+    if not items:
+        raise BatchPayloadError('Batch contains no readings')
+
+    return items
+
+
+def parse_reading_timestamp(raw):
+    """Parse a device timestamp into a naive UTC datetime.
+
+    Accepts ISO 8601 strings (naive strings are taken as UTC) and Unix epoch
+    seconds. Timestamps further ahead of the server clock than
+    ``INGEST_MAX_CLOCK_SKEW`` seconds are rejected; old timestamps are fine,
+    so gateways can backfill after an outage.
+
+    Raises:
+        ValueError: If the timestamp is malformed or in the future
+    """
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        if not math.isfinite(raw) or raw <= 0:
+            raise ValueError('Invalid timestamp')
+        timestamp = datetime.fromtimestamp(raw, timezone.utc)
+    elif isinstance(raw, str):
+        try:
+            timestamp = datetime.fromisoformat(raw.strip().replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError('Invalid timestamp')
+    else:
+        raise ValueError('Invalid timestamp')
+
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if timestamp > datetime.utcnow() + max_clock_skew():
+        raise ValueError('Timestamp is in the future')
+
+    return timestamp
+
+
+def max_clock_skew():
+    """How far ahead of the server clock a device timestamp may be."""
+    return timedelta(seconds=current_app.config.get('INGEST_MAX_CLOCK_SKEW', 300))
+
+
+def reading_key(sensor_id, timestamp=None, message_id=None):
+    """Build the duplicate-suppression key for a reading.
+
+    Readings without a device timestamp or message id get no key: every
+    server-stamped reading is new.
+    """
+    if message_id is not None:
+        return ('message', sensor_id, str(message_id))
+    if timestamp is not None:
+        return (sensor_id, timestamp)
+    return None
+
+
+def ingest_readings(items, user_id):
+    """Validate and store a batch of readings.
+
+    Ownership is checked once per distinct sensor. Accepted rows are either
+    written with one bulk insert in a single transaction or, when the
+    write-behind buffer is enabled, handed to it for group commit. Readings
+    already seen (same sensor and device timestamp, or same message id) are
+    reported as ``duplicate`` and not written again.
+
+    Args:
+        items: List of dicts with ``sensor_id`` and ``value``, and optionally
+            ``timestamp`` and ``message_id``
+        user_id: Identity of the authenticated user
+
+    Returns:
+        Tuple of (per-item status dicts in the same order as ``items``,
+        whether the accepted rows are already committed)
+
+    Raises:
+        BufferFullError: If the write-behind buffer has no room for the batch
+    """
+    rows, results, sensors, keys = validate_readings(items, user_id)
+    stored = submit_readings(rows, sensors, keys) if rows else []
+    created = [result for result in results if result['status'] == 'created']
+
+    if stored is None:
+        for result in created:
+            result['status'] = 'accepted'
+        return results, False
+
+    # Rows the database already held were skipped by the insert
+    if len(stored) < len(rows):
+        stored_keys = {(row['sensor_id'], row['timestamp']) for row in stored}
+        for result, row in zip(created, rows):
+            if (row['sensor_id'], row['timestamp']) not in stored_keys:
+                result['status'] = 'duplicate'
+
+    return results, True
+
+
+def validate_readings(items, user_id):
+    """Check raw reading items and turn the valid ones into insert rows.
+
+    Duplicate keys are claimed in the recent-key filter here, so the caller
+    must store the rows or release the keys.
+
+    Returns:
+        Tuple of (insert rows, per-item status dicts, sensor metadata by id,
+        claimed duplicate-suppression keys)
+    """
+    sensor_ids = set()
+    for item in items:
+        if isinstance(item.get('sensor_id'), int):
+            sensor_ids.add(item['sensor_id'])
+
+    sensors = sensor_cache.get_many(sensor_ids)
+    now = datetime.utcnow()
+    server_stamped = Counter()
+
+    results = []
+    rows = []
+    keys = []
+    for index, item in enumerate(items):
+        sensor_id = item.get('sensor_id')
+        if not isinstance(sensor_id, int) or 'value' not in item:
+            results.append({'index': index, 'status': 'invalid', 'error': 'Sensor ID and value are required'})
+            continue
+
+        sensor = sensors.get(sensor_id)
+        if not sensor or not sensor.is_active:
+            results.append({'index': index, 'status': 'not_found', 'error': 'Sensor not found or inactive'})
+            continue
+
+        if sensor.user_id != user_id:
+            results.append({'index': index, 'status': 'forbidden', 'error': 'Unauthorized access to sensor'})
+            continue
+
+        try:
+            value = float(item['value'])
+        except (TypeError, ValueError):
+            results.append({'index': index, 'status': 'invalid', 'error': 'Invalid value format'})
+            continue
+
+        timestamp = None
+        if item.get('timestamp') is not None:
+            try:
+                timestamp = parse_reading_timestamp(item['timestamp'])
+            except ValueError as e:
+                results.append({'index': index, 'status': 'invalid', 'error': str(e)})
+                continue
+
+        keys.append(reading_key(sensor_id, timestamp, item.get('message_id')))
+        if timestamp is None:
+            # Keep server-stamped readings of one sensor distinct under the
+            # unique (sensor_id, timestamp) index
+            timestamp = now + timedelta(microseconds=server_stamped[sensor_id])
+            server_stamped[sensor_id] += 1
+
+        rows.append({
+            'sensor_id': sensor_id,
+            'farm_id': sensor.farm_id,
+            'value': value,
+            'timestamp': timestamp
+        })
+        results.append({'index': index, 'status': 'created'})
+
+    # Drop readings already ingested, including repeats within this batch
+    duplicates = recent_keys.claim(keys)
+    if any(duplicates):
+        created = [result for result in results if result['status'] == 'created']
+        for result, duplicate in zip(created, duplicates):
+            if duplicate:
+                result['status'] = 'duplicate'
+        rows = [row for row, duplicate in zip(rows, duplicates) if not duplicate]
+        keys = [key for key, duplicate in zip(keys, duplicates) if not duplicate]
+
+    return rows, results, sensors, keys
+
+
+def ingest_columns(columns, user_id=None, farm_id=None):
+    """Validate and store a batch decoded from a compact encoding.
+
+    Validation works on the decoded arrays: sensor checks run once per
+    distinct sensor and are broadcast to the records. Records whose sensor
+    and device timestamp were already ingested count as accepted and as
+    duplicates, but are not written again.
+
+    Args:
+        columns: ReadingColumns from :mod:`services.ingest_codecs`
+        user_id: Identity of the authenticated user, if sensors must belong
+            to one of their farms
+        farm_id: Farm of the authenticated device, if sensors must belong
+            to that farm
+
+    Returns:
+        Tuple of (number of accepted records, how many of those were
+        duplicates, status dicts for rejected records only, whether the
+        accepted rows are already committed)
+
+    Raises:
+        BufferFullError: If the write-behind buffer has no room for the batch
+    """
+    sensor_ids = np.asarray(columns.sensor_ids, dtype=np.int64)
+    values = np.asarray(columns.values, dtype=np.float64)
+    timestamps = np.asarray(columns.timestamps, dtype=np.float64)
+
+    unique_ids, inverse = np.unique(sensor_ids, return_inverse=True)
+    sensors = sensor_cache.get_many(int(sensor_id) for sensor_id in unique_ids if sensor_id > 0)
+
+    # Per distinct sensor: 0 = ok, then the rejection reasons below
+    codes = np.zeros(len(unique_ids), dtype=np.int8)
+    for i, sensor_id in enumerate(unique_ids):
+        sensor = sensors.get(int(sensor_id))
+        if sensor_id <= 0:
+            codes[i] = 1
+        elif not sensor or not sensor.is_active:
+            codes[i] = 2
+        elif user_id is not None and sensor.user_id != user_id:
+            codes[i] = 3
+        elif farm_id is not None and sensor.farm_id != farm_id:
+            codes[i] = 3
+    status = codes[inverse]
+    status[(status == 0) & ~np.isfinite(values)] = 4
+
+    # Missing or zero timestamps fall back to the server receive time
+    now = datetime.utcnow()
+    has_ts = np.isfinite(timestamps) & (timestamps > 0)
+    latest = (now + max_clock_skew()).replace(tzinfo=timezone.utc).timestamp()
+    status[(status == 0) & has_ts & (timestamps > latest)] = 5
+
+    reasons = {
+        1: ('invalid', 'Malformed record'),
+        2: ('not_found', 'Sensor not found or inactive'),
+        3: ('forbidden', 'Unauthorized access to sensor'),
+        4: ('invalid', 'Invalid value format'),
+        5: ('invalid', 'Timestamp is in the future'),
+    }
+    rejected = [
+        {'index': int(index), 'status': reasons[status[index]][0], 'error': reasons[status[index]][1]}
+        for index in np.flatnonzero(status)
+    ]
+
+    accepted = np.flatnonzero(status == 0)
+    if not accepted.size:
+        return 0, 0, rejected, True
+
+    device_ts = has_ts[accepted]
+    epoch_us = np.where(device_ts, timestamps[accepted] * 1e6, 0).astype(np.int64)
+    stamped = epoch_us.astype('datetime64[us]').tolist()
+
+    farm_ids = {sensor_id: sensor.farm_id for sensor_id, sensor in sensors.items()}
+    server_stamped = Counter()
+    rows = []
+    keys = []
+    for sensor_id, value, timestamp, has_device_ts in zip(
+        sensor_ids[accepted].tolist(),
+        values[accepted].tolist(),
+        stamped,
+        device_ts.tolist()
+    ):
+        if has_device_ts:
+            keys.append(reading_key(sensor_id, timestamp))
+        else:
+            keys.append(None)
+            timestamp = now + timedelta(microseconds=server_stamped[sensor_id])
+            server_stamped[sensor_id] += 1
+        rows.append({
+            'sensor_id': sensor_id,
+            'farm_id': farm_ids[sensor_id],
+            'value': value,
+            'timestamp': timestamp
+        })
+
+    duplicates = recent_keys.claim(keys)
+    if any(duplicates):
+        rows = [row for row, duplicate in zip(rows, duplicates) if not duplicate]
+        keys = [key for key, duplicate in zip(keys, duplicates) if not duplicate]
+
+    stored = submit_readings(rows, sensors, keys) if rows else []
+    # Queued rows cannot be checked against stored readings yet
+    skipped = len(rows) - len(stored) if stored is not None else 0
+    return int(accepted.size), sum(duplicates) + skipped, rejected, stored is not None
+
+
+def submit_readings(rows, sensors, keys=()):
+    """Store validated rows directly or through the write-behind buffer.
+
+    Args:
+        rows: Reading dicts ready for bulk insert
+        sensors: Mapping of sensor id to cached metadata
+        keys: Duplicate-suppression keys claimed for the rows; released if
+            the rows cannot be stored so that a retry is not dropped
+
+    Returns:
+        The rows that were inserted, leaving out those the database already
+        held, or None if they were only queued
+        (``INGEST_BUFFER_DURABILITY = 'enqueue'``)
+
+    Raises:
+        BufferFullError: If the write-behind buffer has no room for the rows
+    """
+    if not reading_buffer.enabled:
+        try:
+            return store_readings(rows, sensors)
+        except Exception:
+            recent_keys.release(keys)
+            raise
+
+    try:
+        future = reading_buffer.submit(rows, sensors)
+    except Exception:
+        recent_keys.release(keys)
+        raise
+
+    def release_on_failure(done):
+        if done.exception() is not None:
+            recent_keys.release(keys)
+
+    future.add_done_callback(release_on_failure)
+    if reading_buffer.durability == DURABILITY_ENQUEUE:
+        return None
+
+    return future.result(timeout=reading_buffer.ack_timeout)
+
+
+def store_readings(rows, sensors):
+    """Write reading rows in one transaction and run threshold checks.
+
+    Returns:
+        The rows that were inserted, in their original order
+    """
+    inserted = write_readings(rows)
+    if inserted is not None:
+        hot_window.append(inserted)
+        rows = inserted_rows(rows, inserted)
+
+    # Check if readings trigger any alerts (threshold monitoring); skipped
+    # duplicates were evaluated when they were first stored
+    from services.alert_service import check_threshold_alerts_batch
+    check_threshold_alerts_batch(rows, sensors)
+    return rows
+
+
+def inserted_rows(rows, inserted):
+    """Keep the rows of ``rows`` whose sensor and timestamp are in ``inserted``."""
+    if len(inserted) == len(rows):
+        return rows
+    keys = {(row['sensor_id'], row['timestamp']) for row in inserted}
+    return [row for row in rows if (row['sensor_id'], row['timestamp']) in keys]
+
+
+def write_readings(rows):
+    """Bulk insert reading rows and commit them as one transaction.
+
+    Rows that collide with a stored reading of the same sensor and
+    timestamp, including readings moved to a period table, sealed into the
+    archive or exported to cold storage, are skipped, so
+    retried uploads older than the recent-key filter are still idempotent. The inserted rows are folded into the
+    reading rollups and each sensor's latest reading in the same
+    transaction.
+
+    Returns:
+        The inserted rows with their ids, or None if the database cannot
+        report them
+    """
+    try:
+        statement = insert_ignoring_duplicates()
+        inserted = None
+        new_rows = exclude_stored(rows)
+        if not new_rows:
+            inserted = []
+        elif db.session.get_bind().dialect.insert_executemany_returning:
+            # Only rows that were actually inserted may count towards rollups
+            inserted = db.session.execute(statement.returning(
+                SensorReading.id,
+                SensorReading.sensor_id,
+                SensorReading.farm_id,
+                SensorReading.timestamp,
+                SensorReading.value
+            ), new_rows).mappings().all()
+        else:
+            db.session.execute(statement, new_rows)
+
+        stored = new_rows if inserted is None else inserted
+        if current_app.config.get('READINGS_ROLLUPS_ENABLED', True):
+            update_rollups(stored)
+        update_sensor_latest(stored)
+        bump_versions({row['farm_id'] for row in stored}, 'readings')
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.debug(f"Inserted {len(stored)} of {len(rows)} sensor readings")
+    return inserted
+
+
+def exclude_stored(rows):
+    """Drop rows already stored where the live table's unique index cannot see them.
+
+    Checks the SQLite period tables, the sealed archive blocks and the
+    exported cold months.
+    """
+    return cold_readings.exclude_exported(exclude_archived(exclude_moved(rows)))
+
+
+def insert_ignoring_duplicates():
+    """Build an INSERT for readings that skips (sensor_id, timestamp) conflicts."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(SensorReading)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(SensorReading)
+    else:
+        return insert(SensorReading)
+
+    return statement.on_conflict_do_nothing(index_elements=['sensor_id', 'timestamp'])
@@ -0,0 +1,69 @@
+"""JSON provider for API responses.
+
+Flask's default provider encodes with the standard library ``json``
+module, which dominates the cost of large responses such as a page of
+1000 readings. When orjson is installed, :class:`FastJSONProvider`
+encodes responses with it instead and writes its bytes straight into the
+response; without orjson it behaves like the default provider.
+
+Either way ``datetime`` and ``date`` values are written as ISO 8601
+strings, as orjson does natively, instead of Flask's HTTP date format,
+so the output does not depend on which encoder is installed. Request
+bodies are still parsed by the standard library, which accepts the NaN
+values some devices send.
+"""
+
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements-extra.txt
+    orjson = None
+
+
+def iso_default(o):
+    """Encode dates as ISO 8601, anything else as Flask's provider would."""
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that encodes with orjson when available."""
+
+    default = staticmethod(iso_default)
+
+    def __init__(self, app, use_orjson=True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+
+    def options(self, indent=False):
+        """orjson option flags matching the provider's settings."""
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        """Serialize data as JSON to a string.
+
+        Keyword arguments are ``json.dumps`` options, so passing any falls
+        back to the standard library.
+        """
+        if not self.use_orjson or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options()).decode()
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as JSON and return a response, as ``jsonify`` does."""
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self.options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
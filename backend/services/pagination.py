@@ -0,0 +1,72 @@
+"""Opaque keyset cursors for paginated list endpoints.
+
+A cursor holds the sort key of the last row of a page. The next page
+selects rows that sort after it with :func:`keyset_after`, so every page
+is an index range scan of the same cost instead of an OFFSET that reads
+and discards all earlier rows.
+
+Cursors are URL-safe base64 of a JSON list; datetimes are stored as ISO
+strings. They are not signed: a cursor only positions a query that is
+still filtered by the caller's farm.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+import json
+
+from sqlalchemy import and_, or_
+
+from services.partitions import to_naive_utc
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded for the requested endpoint."""
+
+
+def encode_cursor(*values):
+    """Encode a sort key as an opaque cursor string."""
+    key = [to_naive_utc(value).isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor into a sort key.
+
+    Args:
+        cursor: String from :func:`encode_cursor`
+        types: Expected type of each key part (datetime, int or str)
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or does not match ``types``
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError
+        values = []
+        for value, kind in zip(key, types):
+            if kind is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif isinstance(value, kind) and not isinstance(value, bool):
+                values.append(value)
+            else:
+                raise ValueError
+        return tuple(values)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursorError('Invalid cursor')
+
+
+def keyset_after(columns, values):
+    """Condition for rows after ``values`` in descending order of ``columns``.
+
+    Equivalent to ``(columns) < (values)`` as a row value comparison, but
+    written out with an explicit bound on the leading column so the
+    database can turn it into an index range.
+    """
+    def after(columns, values):
+        if len(columns) == 1:
+            return columns[0] < values[0]
+        return or_(columns[0] < values[0], and_(columns[0] == values[0], after(columns[1:], values[1:])))
+
+    return and_(columns[0] <= values[0], after(list(columns), list(values)))
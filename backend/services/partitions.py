@@ -0,0 +1,368 @@
+"""Time-partitioned storage for sensor readings.
+
+PostgreSQL: ``sensor_readings`` is a native range-partitioned table (see
+migration 0003) with one partition per calendar month, named
+``sensor_readings_pYYYYMM``, plus a ``sensor_readings_default`` partition
+that catches readings no monthly partition covers yet. The planner prunes
+partitions for any query filtering on ``timestamp``, so query code keeps
+using :class:`SensorReading`.
+
+SQLite: ``sensor_readings`` stays the live table that ingestion writes to.
+Maintenance moves rows of completed months into per-month tables with the
+same names. Range queries read through :func:`readings_source`, which
+unions the live table with the period tables overlapping the range.
+
+On both, maintenance drops whole months once they fall out of
+``READINGS_RETENTION_MONTHS``.
+"""
+
+from datetime import datetime, timezone
+import logging
+import re
+import threading
+
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, Table
+from sqlalchemy import delete, desc, func, insert, select, text, tuple_, union_all
+from sqlalchemy.orm import aliased
+
+from models import db, SensorReading
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = 'sensor_readings_p'
+DEFAULT_PARTITION = 'sensor_readings_default'
+PARTITION_NAME = re.compile(r'^sensor_readings_p(\d{4})(\d{2})$')
+
+# Keys looked up per query when checking period tables for duplicates
+MOVED_KEYS_CHUNK = 500
+
+# Arbitrary key for the PostgreSQL advisory lock that serializes maintenance
+MAINTENANCE_LOCK_KEY = 7_242_019
+
+
+def month_start(moment):
+    """Return the first instant of the month containing ``moment``."""
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment, months):
+    """Shift a month start by a number of months."""
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start):
+    """Name of the partition or period table holding the month ``start``."""
+    return f'{PARTITION_PREFIX}{start:%Y%m}'
+
+
+def partition_start(name):
+    """Month start encoded in a partition name, or None for other tables."""
+    match = PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def to_naive_utc(moment):
+    """Readings store naive UTC timestamps; normalize aware datetimes."""
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+_period_metadata = MetaData()
+_period_lock = threading.Lock()
+
+
+def period_table(start):
+    """Table object for the SQLite period table of the month ``start``."""
+    name = partition_name(start)
+    with _period_lock:
+        table = _period_metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name,
+                _period_metadata,
+                Column('id', Integer, primary_key=True, autoincrement=False),
+                Column('value', Float, nullable=False),
+                Column('timestamp', DateTime, nullable=False),
+                Column('sensor_id', Integer, nullable=False),
+                Column('farm_id', Integer, nullable=False),
+                Index(f'uq_{name}_sensor_timestamp', 'sensor_id', 'timestamp', unique=True),
+                Index(f'ix_{name}_farm_timestamp', 'farm_id', desc('timestamp')),
+            )
+        return table
+
+
+def readings_source(start=None, end=None):
+    """Return the entity to query readings between ``start`` and ``end`` from.
+
+    Use it in place of :class:`SensorReading` in range queries, e.g.
+    ``Reading = readings_source(since)`` then ``db.session.query(Reading)``.
+    On PostgreSQL, and on SQLite while no period table overlaps the range,
+    this is SensorReading itself. Otherwise it is SensorReading aliased to
+    a UNION ALL of the live table and the overlapping period tables.
+
+    Args:
+        start: Inclusive lower bound of the queried timestamps, or None
+        end: Exclusive upper bound of the queried timestamps, or None
+    """
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return SensorReading
+
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    periods = [
+        period for period in partition_manager.periods()
+        if (start is None or add_months(period, 1) > start) and (end is None or period < end)
+    ]
+    if not periods:
+        return SensorReading
+
+    live = SensorReading.__table__
+    names = [column.name for column in live.columns]
+    tables = [live] + [period_table(period) for period in periods]
+    union = union_all(*[
+        select(*[table.c[name] for name in names]) for table in tables
+    ]).subquery('sensor_readings_all')
+
+    return aliased(SensorReading, union)
+
+
+def exclude_moved(rows):
+    """Drop rows whose reading was already moved to a SQLite period table.
+
+    The live table's unique index on (sensor_id, timestamp) cannot see rows
+    maintenance has moved out, so a late duplicate of a completed month
+    would be inserted again. PostgreSQL partitions share one unique index,
+    so rows are returned unchanged there.
+
+    Args:
+        rows: Mappings with ``sensor_id`` and ``timestamp``
+
+    Returns:
+        The rows not found in a period table, in their original order
+    """
+    if not rows or db.session.get_bind().dialect.name != 'sqlite':
+        return rows
+
+    by_month = {}
+    boundary = month_start(datetime.utcnow())
+    for row in rows:
+        timestamp = to_naive_utc(row['timestamp'])
+        if timestamp < boundary:
+            by_month.setdefault(month_start(timestamp), []).append((row['sensor_id'], timestamp))
+    if not by_month:
+        return rows
+
+    moved = set()
+    periods = set(partition_manager.periods())
+    for month, keys in by_month.items():
+        if month not in periods:
+            continue
+        table = period_table(month)
+        key = tuple_(table.c.sensor_id, table.c.timestamp)
+        for offset in range(0, len(keys), MOVED_KEYS_CHUNK):
+            moved.update(db.session.execute(
+                select(table.c.sensor_id, table.c.timestamp).where(
+                    key.in_(keys[offset:offset + MOVED_KEYS_CHUNK])
+                )
+            ).tuples())
+
+    if not moved:
+        return rows
+    return [row for row in rows if (row['sensor_id'], to_naive_utc(row['timestamp'])) not in moved]
+
+
+class ReadingPartitionManager:
+    """Creates, rolls and drops monthly reading partitions."""
+
+    def __init__(self, months_ahead=3, retention_months=0):
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+
+    def init_app(self, app):
+        """Configure maintenance from application settings."""
+        self.months_ahead = app.config.get('READINGS_PARTITION_MONTHS_AHEAD', self.months_ahead)
+        self.retention_months = app.config.get('READINGS_RETENTION_MONTHS', self.retention_months)
+        app.extensions['reading_partitions'] = self
+        app.cli.add_command(partitions_cli)
+
+    def periods(self):
+        """Return the month starts that have a partition or period table."""
+        bind = db.session.get_bind()
+        if bind.dialect.name == 'postgresql':
+            names = db.session.execute(text(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+                "WHERE parent.relname = 'sensor_readings'"
+            )).scalars()
+        elif bind.dialect.name == 'sqlite':
+            names = db.session.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix"
+            ), {'prefix': f'{PARTITION_PREFIX}%'}).scalars()
+        else:
+            return []
+
+        return sorted(start for start in map(partition_start, names) if start)
+
+    def retention_cutoff(self, now=None):
+        """Month start before which readings are dropped, or None to keep all."""
+        if not self.retention_months:
+            return None
+        return add_months(month_start(now or datetime.utcnow()), -self.retention_months)
+
+    def maintain(self, now=None):
+        """Bring partitions in line with the calendar and retention policy.
+
+        Safe to run repeatedly and from several processes at once.
+
+        Returns:
+            Dict with the months created (or rolled on SQLite) and dropped
+        """
+        now = now or datetime.utcnow()
+        dialect = db.session.get_bind().dialect.name
+        try:
+            if dialect == 'postgresql':
+                result = self._maintain_postgresql(now)
+            elif dialect == 'sqlite':
+                result = self._maintain_sqlite(now)
+            else:
+                result = {'created': [], 'dropped': []}
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if result['created'] or result['dropped']:
+            logger.info(
+                f"Reading partitions: created {result['created']}, dropped {result['dropped']}"
+            )
+        return result
+
+    def _maintain_postgresql(self, now):
+        result = {'created': [], 'dropped': []}
+
+        partitioned = db.session.execute(text(
+            'SELECT 1 FROM pg_partitioned_table '
+            'JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid '
+            "WHERE pg_class.relname = 'sensor_readings'"
+        )).scalar()
+        if not partitioned:
+            logger.warning('sensor_readings is not partitioned; run flask db upgrade')
+            return result
+
+        # Another process is already maintaining partitions
+        if not db.session.execute(
+            text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': MAINTENANCE_LOCK_KEY}
+        ).scalar():
+            return result
+
+        cutoff = self.retention_cutoff(now)
+        existing = set(self.periods())
+
+        # Upcoming months, plus months that late readings landed in the default partition
+        wanted = {add_months(month_start(now), months) for months in range(self.months_ahead + 1)}
+        wanted.update(db.session.execute(text(
+            f"SELECT DISTINCT date_trunc('month', timestamp) FROM {DEFAULT_PARTITION}"
+        )).scalars())
+
+        for start in sorted(wanted - existing):
+            if cutoff is None or start >= cutoff:
+                self._create_postgresql_partition(start)
+                result['created'].append(partition_name(start))
+
+        if cutoff is not None:
+            for start in sorted(existing):
+                if start < cutoff:
+                    db.session.execute(text(f'DROP TABLE IF EXISTS {partition_name(start)}'))
+                    result['dropped'].append(partition_name(start))
+            db.session.execute(
+                text(f'DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff'),
+                {'cutoff': cutoff}
+            )
+
+        return result
+
+    def _create_postgresql_partition(self, start):
+        name = partition_name(start)
+        bounds = {'start': start, 'end': add_months(start, 1)}
+
+        # Rows for this month may already sit in the default partition, which
+        # would block ATTACH; move them into the new table first
+        db.session.execute(text(
+            f'CREATE TABLE {name} (LIKE sensor_readings INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        db.session.execute(text(
+            f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} '
+            'WHERE timestamp >= :start AND timestamp < :end'
+        ), bounds)
+        db.session.execute(text(
+            f'DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end'
+        ), bounds)
+        db.session.execute(text(
+            f"ALTER TABLE sensor_readings ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+        ))
+
+    def _maintain_sqlite(self, now):
+        result = {'created': [], 'dropped': []}
+        live = SensorReading.__table__
+        boundary = month_start(now)
+        cutoff = self.retention_cutoff(now)
+
+        # Completed months still in the live table, including late backfills
+        months = db.session.execute(
+            select(func.strftime('%Y-%m', live.c.timestamp)).where(
+                live.c.timestamp < boundary
+            ).distinct()
+        ).scalars().all()
+
+        names = [column.name for column in live.columns]
+        for month in sorted(months):
+            start = datetime.strptime(month, '%Y-%m')
+            in_month = (live.c.timestamp >= start) & (live.c.timestamp < add_months(start, 1))
+
+            if cutoff is None or start >= cutoff:
+                table = period_table(start)
+                table.create(db.session.connection(), checkfirst=True)
+                # Readings already archived win over late duplicates
+                db.session.execute(
+                    insert(table).prefix_with('OR IGNORE').from_select(
+                        names, select(*[live.c[name] for name in names]).where(in_month)
+                    )
+                )
+                result['created'].append(partition_name(start))
+
+            db.session.execute(delete(live).where(in_month))
+
+        if cutoff is not None:
+            for start in self.periods():
+                if start < cutoff:
+                    period_table(start).drop(db.session.connection(), checkfirst=True)
+                    result['dropped'].append(partition_name(start))
+
+        return result
+
+
+# Global partition manager, configured in create_app
+partition_manager = ReadingPartitionManager()
+
+partitions_cli = AppGroup('partitions', help='Manage sensor reading partitions.')
+
+
+@partitions_cli.command('maintain')
+def maintain_command():
+    """Create upcoming partitions and drop expired ones."""
+    result = partition_manager.maintain()
+    print(f"Created: {', '.join(result['created']) or 'none'}")
+    print(f"Dropped: {', '.join(result['dropped']) or 'none'}")
+
+
+@partitions_cli.command('list')
+def list_command():
+    """List reading partitions by month."""
+    for start in partition_manager.periods():
+        print(partition_name(start))
@@ -0,0 +1,351 @@
+"""Incrementally maintained reading rollups at 1 minute, 1 hour and 1 day.
+
+Every stored reading is folded into one :class:`ReadingRollup` row per
+resolution holding count, min, max, sum, sum of squares and the latest
+value of its bucket. Rows are merged with an upsert, so batches can be
+applied in any order and by any number of processes. History written
+outside the ingest path is folded in with ``flask rollups backfill``.
+"""
+
+from datetime import datetime, timedelta
+import logging
+import re
+
+from flask.cli import AppGroup
+import click
+import numpy as np
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, ReadingRollup
+from services.archive import archived_readings
+from services.cold_storage import cold_readings
+from services.hot_window import from_epoch_us
+from services.partitions import readings_source, to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Bucket width in seconds and the NumPy unit that truncates to it, finest first
+ROLLUP_RESOLUTIONS = {
+    '1m': (60, 'm'),
+    '1h': (3600, 'h'),
+    '1d': (86400, 'D'),
+}
+
+RESOLUTION_PATTERN = re.compile(r'^(\d+)([mhd])$')
+UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400}
+
+# Largest number of buckets per sensor a single request may produce
+MAX_BUCKETS = 10000
+
+# Steps tried by resolution=auto, so buckets line up with wall-clock time
+AUTO_STEPS = [60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400]
+
+BACKFILL_CHUNK_SIZE = 50000
+
+
+def parse_resolution(resolution):
+    """Parse a resolution such as ``5m``, ``1h`` or ``1d`` into seconds.
+
+    Raises:
+        ValueError: If the resolution is malformed or finer than a minute
+    """
+    match = RESOLUTION_PATTERN.match(resolution or '')
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError('Resolution must look like 5m, 1h or 1d')
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def auto_step(range_seconds, max_points):
+    """Smallest standard step that keeps a series within ``max_points``."""
+    for step in AUTO_STEPS:
+        if range_seconds / step <= max_points:
+            return step
+    return AUTO_STEPS[-1]
+
+
+def choose_rollup(step_seconds):
+    """Return the coarsest rollup whose buckets tile a step exactly."""
+    chosen = None
+    for resolution, (seconds, _) in ROLLUP_RESOLUTIONS.items():
+        if step_seconds % seconds == 0:
+            chosen = resolution
+    if chosen is None:
+        raise ValueError('Resolution must be a whole number of minutes')
+    return chosen
+
+
+def aggregate_readings(rows):
+    """Fold reading rows into rollup entries for every resolution.
+
+    Args:
+        rows: Sequence of mappings with ``sensor_id``, ``farm_id``,
+            ``timestamp`` and ``value``
+
+    Returns:
+        List of dicts matching the ReadingRollup columns
+    """
+    count = len(rows)
+    if not count:
+        return []
+    if count == 1:
+        return [single_reading_entry(rows[0], resolution) for resolution in ROLLUP_RESOLUTIONS]
+
+    sensor_ids = np.fromiter((row['sensor_id'] for row in rows), dtype=np.int64, count=count)
+    values = np.fromiter((row['value'] for row in rows), dtype=np.float64, count=count)
+    timestamps = np.array([row['timestamp'] for row in rows], dtype='datetime64[us]')
+    farm_ids = {row['sensor_id']: row['farm_id'] for row in rows}
+
+    entries = []
+    for resolution, (_, unit) in ROLLUP_RESOLUTIONS.items():
+        buckets = timestamps.astype(f'datetime64[{unit}]').astype('datetime64[us]')
+
+        # Sort by (sensor, bucket, timestamp) so each group is contiguous and
+        # its last element is the latest reading
+        order = np.lexsort((timestamps, buckets, sensor_ids))
+        group_sensors = sensor_ids[order]
+        group_buckets = buckets[order]
+        boundary = np.empty(count, dtype=bool)
+        boundary[0] = True
+        boundary[1:] = (group_sensors[1:] != group_sensors[:-1]) | (group_buckets[1:] != group_buckets[:-1])
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], count) - 1
+
+        sorted_values = values[order]
+        counts = np.diff(np.append(starts, count))
+        sums = np.add.reduceat(sorted_values, starts)
+        sum_squares = np.add.reduceat(sorted_values * sorted_values, starts)
+        minimums = np.minimum.reduceat(sorted_values, starts)
+        maximums = np.maximum.reduceat(sorted_values, starts)
+
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            sensor_id = int(group_sensors[start])
+            entries.append({
+                'sensor_id': sensor_id,
+                'farm_id': farm_ids[sensor_id],
+                'resolution': resolution,
+                'bucket_start': group_buckets[start].item(),
+                'reading_count': int(counts[i]),
+                'min_value': float(minimums[i]),
+                'max_value': float(maximums[i]),
+                'sum_value': float(sums[i]),
+                'sum_squares': float(sum_squares[i]),
+                'last_value': float(sorted_values[end]),
+                'last_timestamp': timestamps[order[end]].item()
+            })
+
+    return entries
+
+
+def single_reading_entry(row, resolution):
+    """Rollup entry for one reading, skipping the array setup."""
+    timestamp = row['timestamp']
+    unit = ROLLUP_RESOLUTIONS[resolution][1]
+    bucket = np.datetime64(timestamp, 'us').astype(f'datetime64[{unit}]').astype('datetime64[us]').item()
+    value = float(row['value'])
+    return {
+        'sensor_id': row['sensor_id'],
+        'farm_id': row['farm_id'],
+        'resolution': resolution,
+        'bucket_start': bucket,
+        'reading_count': 1,
+        'min_value': value,
+        'max_value': value,
+        'sum_value': value,
+        'sum_squares': value * value,
+        'last_value': value,
+        'last_timestamp': timestamp
+    }
+
+
+def update_rollups(rows):
+    """Merge newly stored readings into the rollups, in the caller's transaction.
+
+    Readings must only be passed once: callers pass the rows actually
+    inserted, not ones skipped as duplicates.
+    """
+    entries = aggregate_readings(rows)
+    if entries:
+        merge_rollups(entries)
+
+
+def merge_rollups(entries):
+    """Upsert rollup entries, combining them with existing buckets."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(ReadingRollup)
+        least, greatest = func.least, func.greatest
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(ReadingRollup)
+        least, greatest = func.min, func.max
+    else:
+        logger.warning(f'Reading rollups are not supported on {dialect}')
+        return
+
+    table = ReadingRollup.__table__
+    new = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=['sensor_id', 'resolution', 'bucket_start'],
+        set_={
+            'reading_count': table.c.reading_count + new.reading_count,
+            'min_value': least(table.c.min_value, new.min_value),
+            'max_value': greatest(table.c.max_value, new.max_value),
+            'sum_value': table.c.sum_value + new.sum_value,
+            'sum_squares': table.c.sum_squares + new.sum_squares,
+            'last_value': case(
+                (new.last_timestamp >= table.c.last_timestamp, new.last_value),
+                else_=table.c.last_value
+            ),
+            'last_timestamp': greatest(table.c.last_timestamp, new.last_timestamp),
+        }
+    )
+    db.session.execute(statement, entries)
+
+
+def backfill_rollups(start, end):
+    """Rebuild rollups from stored, archived and cold readings, one day at a time.
+
+    The range is widened to whole days so no bucket is rebuilt from part of
+    its readings. Each day is replaced in its own transaction.
+
+    Returns:
+        Number of readings folded in
+    """
+    day = datetime(start.year, start.month, start.day)
+    total = 0
+
+    while day < end:
+        next_day = day + timedelta(days=1)
+        Reading = readings_source(day, next_day)
+
+        try:
+            db.session.execute(delete(ReadingRollup).where(
+                ReadingRollup.bucket_start >= day,
+                ReadingRollup.bucket_start < next_day
+            ))
+
+            result = db.session.execute(
+                select(Reading.sensor_id, Reading.farm_id, Reading.timestamp, Reading.value).where(
+                    Reading.timestamp >= day,
+                    Reading.timestamp < next_day
+                ).execution_options(yield_per=BACKFILL_CHUNK_SIZE)
+            )
+            for chunk in result.mappings().partitions():
+                update_rollups(chunk)
+                total += len(chunk)
+
+            archived = archived_readings(day, next_day)
+            update_rollups([reading._asdict() for reading in archived])
+            total += len(archived)
+
+            for farm_id, sensor_ids, timestamps, values in cold_readings.scan(day, next_day):
+                chunk = [
+                    {'sensor_id': sensor_id, 'farm_id': farm_id, 'timestamp': timestamp, 'value': value}
+                    for sensor_id, timestamp, value in zip(
+                        sensor_ids.tolist(), from_epoch_us(timestamps), values.tolist()
+                    )
+                ]
+                update_rollups(chunk)
+                total += len(chunk)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        day = next_day
+
+    return total
+
+
+def read_rollups(farm_id, start, end, step_seconds, sensor_ids=None):
+    """Return rollups for a farm re-bucketed to ``step_seconds``.
+
+    Reads the coarsest stored resolution that tiles the step and merges its
+    buckets in memory. Buckets are aligned to the Unix epoch.
+
+    Args:
+        farm_id: Farm to read
+        start: Inclusive start of the range
+        end: Exclusive end of the range, or None for no upper bound
+        step_seconds: Output bucket width; a whole number of minutes
+        sensor_ids: Optional sensor ids to restrict the result to
+
+    Returns:
+        Tuple of (resolution read, list of transient ReadingRollup objects
+        ordered by sensor and bucket)
+
+    Raises:
+        ValueError: If the step is not a whole number of minutes, or the
+            range holds more than :data:`MAX_BUCKETS` buckets
+    """
+    resolution = choose_rollup(step_seconds)
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if ((end or datetime.utcnow()) - start).total_seconds() / step_seconds > MAX_BUCKETS:
+        raise ValueError(f'Range holds more than {MAX_BUCKETS} buckets; use a coarser resolution')
+    base_seconds = ROLLUP_RESOLUTIONS[resolution][0]
+    # Widen to whole output buckets so the first bucket is complete
+    query = ReadingRollup.query.filter(
+        ReadingRollup.farm_id == farm_id,
+        ReadingRollup.resolution == resolution,
+        ReadingRollup.bucket_start >= floor_time(start, step_seconds)
+    )
+    if end is not None:
+        query = query.filter(ReadingRollup.bucket_start < end)
+    if sensor_ids is not None:
+        query = query.filter(ReadingRollup.sensor_id.in_(sensor_ids))
+    rollups = query.order_by(ReadingRollup.sensor_id, ReadingRollup.bucket_start).all()
+
+    if step_seconds == base_seconds:
+        return resolution, rollups
+
+    merged = []
+    current = None
+    for rollup in rollups:
+        bucket = floor_time(rollup.bucket_start, step_seconds)
+        if current is None or current.sensor_id != rollup.sensor_id or current.bucket_start != bucket:
+            current = ReadingRollup(
+                sensor_id=rollup.sensor_id,
+                farm_id=rollup.farm_id,
+                resolution=resolution,
+                bucket_start=bucket,
+                reading_count=0,
+                min_value=rollup.min_value,
+                max_value=rollup.max_value,
+                sum_value=0.0,
+                sum_squares=0.0,
+                last_value=rollup.last_value,
+                last_timestamp=rollup.last_timestamp
+            )
+            merged.append(current)
+
+        current.reading_count += rollup.reading_count
+        current.min_value = min(current.min_value, rollup.min_value)
+        current.max_value = max(current.max_value, rollup.max_value)
+        current.sum_value += rollup.sum_value
+        current.sum_squares += rollup.sum_squares
+        if rollup.last_timestamp >= current.last_timestamp:
+            current.last_value = rollup.last_value
+            current.last_timestamp = rollup.last_timestamp
+
+    return resolution, merged
+
+
+def floor_time(moment, step_seconds):
+    """Truncate a naive UTC datetime to a multiple of ``step_seconds``."""
+    epoch = (moment - datetime(1970, 1, 1)) // timedelta(seconds=1)
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch // step_seconds * step_seconds)
+
+
+rollups_cli = AppGroup('rollups', help='Manage reading rollups.')
+
+
+@rollups_cli.command('backfill')
+@click.option('--days', default=30, show_default=True, help='Days of history to rebuild.')
+@click.option('--include-today', is_flag=True, help='Also rebuild the current day.')
+def backfill_command(days, include_today):
+    """Rebuild rollups from stored readings."""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = today + timedelta(days=1) if include_today else today
+    total = backfill_rollups(end - timedelta(days=days + int(include_today)), end)
+    print(f'Folded {total} readings into rollups')
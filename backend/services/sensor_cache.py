@@ -0,0 +1,169 @@
+"""In-process sensor metadata cache for the ingestion hot path."""
+
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, Farm, Sensor
+
+# Everything ingestion needs to validate a reading and evaluate thresholds.
+# Field names mirror Sensor so the tuple can stand in for the model.
+SensorMeta = namedtuple('SensorMeta', [
+    'id', 'name', 'sensor_type', 'unit', 'min_threshold', 'max_threshold',
+    'is_active', 'farm_id', 'user_id'
+])
+
+
+class SensorMetadataCache:
+    """Bounded LRU cache of sensor metadata keyed by sensor id.
+
+    Entries are invalidated when a Sensor or its Farm is updated or deleted
+    through the ORM in this process. Other worker processes only see such
+    changes once their entry expires, so entries also carry a TTL.
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the cache from application settings."""
+        self.max_size = app.config.get('SENSOR_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('SENSOR_CACHE_TTL', self.ttl)
+        self.clear()
+        app.extensions['sensor_cache'] = self
+
+    def get(self, sensor_id):
+        """Return metadata for one sensor, or None if it does not exist."""
+        return self.get_many([sensor_id]).get(sensor_id)
+
+    def get_many(self, sensor_ids):
+        """Return a dict of sensor id to metadata, loading misses in one query."""
+        found = {}
+        missing = []
+        now = time.monotonic()
+
+        with self._lock:
+            for sensor_id in set(sensor_ids):
+                entry = self._entries.get(sensor_id)
+                if entry and entry[1] > now:
+                    self._entries.move_to_end(sensor_id)
+                    found[sensor_id] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.append(sensor_id)
+                    self.misses += 1
+
+        if missing:
+            loaded = self._load(missing)
+            self._store(loaded.values(), now + self.ttl)
+            found.update(loaded)
+
+        return found
+
+    def invalidate(self, sensor_id):
+        """Drop a single sensor from the cache."""
+        with self._lock:
+            self._entries.pop(sensor_id, None)
+
+    def invalidate_farm(self, farm_id):
+        """Drop every cached sensor belonging to a farm."""
+        with self._lock:
+            stale = [key for key, (meta, _) in self._entries.items() if meta.farm_id == farm_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+    def _load(self, sensor_ids):
+        rows = db.session.query(
+            Sensor.id,
+            Sensor.name,
+            Sensor.sensor_type,
+            Sensor.unit,
+            Sensor.min_threshold,
+            Sensor.max_threshold,
+            Sensor.is_active,
+            Sensor.farm_id,
+            Farm.user_id
+        ).join(Farm, Farm.id == Sensor.farm_id).filter(
+            Sensor.id.in_(sensor_ids)
+        ).all()
+
+        return {row.id: SensorMeta(*row) for row in rows}
+
+    def _store(self, metas, expires_at):
+        with self._lock:
+            for meta in metas:
+                self._entries[meta.id] = (meta, expires_at)
+                self._entries.move_to_end(meta.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+# Global cache instance, configured in create_app
+sensor_cache = SensorMetadataCache()
+
+
+def _pending_invalidations(session):
+    return session.info.setdefault('sensor_cache_invalidations', set())
+
+
+@event.listens_for(Sensor, 'after_update')
+@event.listens_for(Sensor, 'after_delete')
+def _invalidate_sensor(mapper, connection, target):
+    sensor_cache.invalidate(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        _pending_invalidations(session).add(('sensor', target.id))
+
+
+@event.listens_for(Farm, 'after_update')
+@event.listens_for(Farm, 'after_delete')
+def _invalidate_farm(mapper, connection, target):
+    sensor_cache.invalidate_farm(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        _pending_invalidations(session).add(('farm', target.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    # Invalidate again once the change is visible, so a concurrent request that
+    # reloaded the old row between flush and commit cannot keep it cached
+    for kind, key in session.info.pop('sensor_cache_invalidations', ()):
+        if kind == 'sensor':
+            sensor_cache.invalidate(key)
+        else:
+            sensor_cache.invalidate_farm(key)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('sensor_cache_invalidations', None)
@@ -0,0 +1,230 @@
+"""Latest reading per sensor, maintained on ingest for dashboard summaries.
+
+Every stored batch upserts one :class:`SensorLatest` row per sensor, keeping
+whichever reading has the newest timestamp, so late or out-of-order batches
+never move a sensor backwards. The threshold status is stored with the
+value and recomputed when a sensor's thresholds change.
+"""
+
+import logging
+
+from sqlalchemy import case, delete, event, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Farm, Sensor, SensorLatest
+from services.partitions import readings_source
+from services.sensor_cache import sensor_cache
+from services.versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+
+def get_sensor_status(value, sensor):
+    """Determine sensor status based on thresholds."""
+    if sensor.min_threshold is not None and value < sensor.min_threshold:
+        return 'low'
+    elif sensor.max_threshold is not None and value > sensor.max_threshold:
+        return 'high'
+    else:
+        return 'normal'
+
+
+def status_expression(value, min_threshold, max_threshold):
+    """SQL equivalent of :func:`get_sensor_status`.
+
+    Thresholds may be columns or Python values; a None value is skipped,
+    as comparing with it would compile to ``IS NULL``.
+    """
+    whens = []
+    if min_threshold is not None:
+        whens.append((value < min_threshold, 'low'))
+    if max_threshold is not None:
+        whens.append((value > max_threshold, 'high'))
+    if not whens:
+        return literal('normal')
+    return case(*whens, else_='normal')
+
+
+def update_sensor_latest(rows):
+    """Upsert the newest of ``rows`` for each sensor, in the caller's transaction.
+
+    Args:
+        rows: Sequence of mappings with ``sensor_id``, ``farm_id``,
+            ``timestamp`` and ``value``
+    """
+    newest = {}
+    for row in rows:
+        current = newest.get(row['sensor_id'])
+        if current is None or row['timestamp'] >= current['timestamp']:
+            newest[row['sensor_id']] = row
+    if not newest:
+        return
+
+    sensors = sensor_cache.get_many(newest)
+    entries = [
+        {
+            'sensor_id': sensor_id,
+            'farm_id': row['farm_id'],
+            'value': row['value'],
+            'timestamp': row['timestamp'],
+            'status': get_sensor_status(row['value'], sensors[sensor_id])
+        }
+        for sensor_id, row in newest.items() if sensor_id in sensors
+    ]
+    # Fixed order so concurrent upserts lock rows consistently
+    entries.sort(key=lambda entry: entry['sensor_id'])
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(SensorLatest)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(SensorLatest)
+    else:
+        logger.warning(f'Sensor latest upserts are not supported on {dialect}')
+        return
+
+    table = SensorLatest.__table__
+    new = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=['sensor_id'],
+        set_={
+            'farm_id': new.farm_id,
+            'value': new.value,
+            'timestamp': new.timestamp,
+            'status': new.status
+        },
+        where=new.timestamp >= table.c.timestamp
+    )
+    db.session.execute(statement, entries)
+
+
+def latest_readings(per_sensor, since=None, farm_id=None, sensor_ids=None):
+    """Select the ``per_sensor`` newest readings of each sensor in one statement.
+
+    Readings are ranked with ``ROW_NUMBER() OVER (PARTITION BY sensor_id
+    ORDER BY timestamp DESC)``, which SQLite (3.25+) and PostgreSQL both
+    support; filters apply before ranking so the index on (sensor_id,
+    timestamp) bounds the scan.
+
+    Args:
+        per_sensor: Number of readings to keep per sensor
+        since: Optional inclusive lower bound on timestamps
+        farm_id: Optional farm to restrict to
+        sensor_ids: Optional sensor ids to restrict to
+
+    Returns:
+        Select of sensor_id, farm_id, value, timestamp and rank (1 is newest)
+    """
+    Reading = readings_source(since)
+    ranked = select(
+        Reading.sensor_id,
+        Reading.farm_id,
+        Reading.value,
+        Reading.timestamp,
+        func.row_number().over(
+            partition_by=Reading.sensor_id,
+            order_by=Reading.timestamp.desc()
+        ).label('rank')
+    )
+    if since is not None:
+        ranked = ranked.where(Reading.timestamp >= since)
+    if farm_id is not None:
+        ranked = ranked.where(Reading.farm_id == farm_id)
+    if sensor_ids is not None:
+        ranked = ranked.where(Reading.sensor_id.in_(sensor_ids))
+    ranked = ranked.subquery()
+
+    return select(
+        ranked.c.sensor_id,
+        ranked.c.farm_id,
+        ranked.c.value,
+        ranked.c.timestamp,
+        ranked.c.rank
+    ).where(ranked.c.rank <= per_sensor)
+
+
+def sensor_summaries(farm_ids):
+    """Latest reading and status of every active sensor of the given farms.
+
+    Reads :class:`SensorLatest` in one join; sensors missing from it
+    (history loaded without a rebuild) are ranked from stored readings in a
+    single further statement. Sensors without readings are left out.
+
+    Returns:
+        Dict of farm id to a list of summary dicts, one per sensor
+    """
+    rows = db.session.query(Sensor, SensorLatest).outerjoin(
+        SensorLatest, SensorLatest.sensor_id == Sensor.id
+    ).filter(
+        Sensor.farm_id.in_(farm_ids),
+        Sensor.is_active == True
+    ).order_by(Sensor.id).all()
+
+    missing = [sensor.id for sensor, latest in rows if latest is None]
+    found = {}
+    if missing:
+        found = {row.sensor_id: row for row in db.session.execute(latest_readings(1, sensor_ids=missing))}
+
+    summaries = {farm_id: [] for farm_id in farm_ids}
+    for sensor, latest in rows:
+        if latest is not None:
+            value, timestamp, status = latest.value, latest.timestamp, latest.status
+        elif sensor.id in found:
+            value, timestamp = found[sensor.id].value, found[sensor.id].timestamp
+            status = get_sensor_status(value, sensor)
+        else:
+            continue  # no readings yet
+
+        summaries[sensor.farm_id].append({
+            'sensor_id': sensor.id,
+            'sensor_name': sensor.name,
+            'sensor_type': sensor.sensor_type,
+            'unit': sensor.unit,
+            'current_value': value,
+            'last_reading': timestamp.isoformat(),
+            'min_threshold': sensor.min_threshold,
+            'max_threshold': sensor.max_threshold,
+            'status': status
+        })
+    return summaries
+
+def rebuild_sensor_latest():
+    """Recompute every sensor's latest reading from stored readings.
+
+    For data written outside the ingest path, e.g. the demo seed.
+
+    Returns:
+        Number of sensors with a latest reading
+    """
+    newest = latest_readings(1).subquery()
+    latest = select(
+        newest.c.sensor_id,
+        newest.c.farm_id,
+        newest.c.value,
+        newest.c.timestamp,
+        status_expression(newest.c.value, Sensor.min_threshold, Sensor.max_threshold)
+    ).join(Sensor, Sensor.id == newest.c.sensor_id)
+
+    try:
+        db.session.execute(delete(SensorLatest))
+        result = db.session.execute(insert(SensorLatest).from_select(
+            ['sensor_id', 'farm_id', 'value', 'timestamp', 'status'], latest
+        ))
+        bump_versions(db.session.scalars(select(Farm.id)).all(), 'readings')
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return result.rowcount
+
+
+@event.listens_for(Sensor, 'after_update')
+def _refresh_status(mapper, connection, target):
+    # Thresholds may have changed; recompute the stored status in the same transaction
+    table = SensorLatest.__table__
+    connection.execute(
+        update(table).where(table.c.sensor_id == target.id).values(
+            status=status_expression(table.c.value, target.min_threshold, target.max_threshold)
+        )
+    )
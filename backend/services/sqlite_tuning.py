@@ -0,0 +1,71 @@
+"""Per-connection PRAGMA tuning for SQLite deployments.
+
+SQLite keeps most settings per connection, so ``SQLITE_PRAGMAS`` is
+applied from a ``connect`` listener to every connection the pool opens.
+``journal_mode=WAL`` is stored in the database file; the other pragmas
+must be repeated on each connection.
+
+The pool is also reset in processes forked after the engine was created
+(``gunicorn --preload``), since a SQLite connection must never be shared
+between processes.
+"""
+
+import logging
+import os
+import re
+
+from sqlalchemy import event
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+class SQLiteTuning:
+    """Applies configured pragmas to the app's SQLite engines."""
+
+    def __init__(self):
+        self.pragmas = {}
+
+    def init_app(self, app):
+        """Register the connect listener on every SQLite engine of the app."""
+        self.pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+        for name, value in self.pragmas.items():
+            if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+                raise ValueError(f'Invalid SQLite pragma {name}={value!r}')
+        app.extensions['sqlite_tuning'] = self
+        if not self.pragmas:
+            return
+
+        with app.app_context():
+            engines = [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+        for engine in engines:
+            event.listen(engine, 'connect', self._apply)
+            # Children must open their own connections rather than reuse the parent's
+            os.register_at_fork(after_in_child=lambda engine=engine: engine.dispose(close=False))
+
+    def settings(self, connection):
+        """Return the values in effect on ``connection`` for the configured pragmas."""
+        return {
+            name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in self.pragmas
+        }
+
+    def _apply(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+                if name == 'journal_mode':
+                    mode = cursor.fetchone()[0]
+                    # In-memory databases cannot use WAL and keep their own mode
+                    if mode.lower() != str(value).lower() and mode != 'memory':
+                        logger.warning(f'SQLite journal_mode is {mode}, not {value}')
+        finally:
+            cursor.close()
+
+
+# Global SQLite tuning, configured in create_app
+sqlite_tuning = SQLiteTuning()
@@ -0,0 +1,158 @@
+"""Per-farm version stamps and conditional GET support.
+
+Polling dashboards mostly re-fetch data that has not changed. Each farm
+has a row in ``farm_versions`` whose counters are bumped in the same
+transaction as the change they describe:
+
+``readings``
+    Readings were stored (ingest calls :func:`bump_versions`).
+``alerts``
+    An alert was created, updated or deleted.
+``metadata``
+    The farm or one of its sensors was created, updated or deleted.
+
+Alert, farm and sensor changes are picked up from the session at flush,
+so no route has to remember to bump them. Read endpoints build a weak
+ETag from the stamps they depend on and answer a matching
+``If-None-Match`` (or a current ``If-Modified-Since``) with 304 before
+running their queries.
+"""
+
+from datetime import datetime, timezone
+import hashlib
+import logging
+
+from flask import Response, request
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, Alert, Farm, FarmVersion, Sensor
+
+logger = logging.getLogger(__name__)
+
+VERSION_COLUMNS = {
+    'readings': 'readings_version',
+    'alerts': 'alerts_version',
+    'metadata': 'metadata_version',
+}
+
+
+def bump_versions(farm_ids, kind, connection=None):
+    """Increment one version counter of several farms.
+
+    Args:
+        farm_ids: Farms whose data changed
+        kind: ``readings``, ``alerts`` or ``metadata``
+        connection: Connection to execute on; defaults to the session's,
+            so the bump commits with the caller's transaction
+    """
+    farm_ids = sorted({farm_id for farm_id in farm_ids if farm_id is not None})
+    if not farm_ids:
+        return
+    column = VERSION_COLUMNS[kind]
+    connection = connection if connection is not None else db.session.connection()
+
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(FarmVersion)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(FarmVersion)
+    else:
+        logger.warning(f'Farm versions are not supported on {dialect}')
+        return
+
+    now = datetime.utcnow()
+    table = FarmVersion.__table__
+    # Sorted ids keep row lock order stable between concurrent transactions
+    statement = statement.values([{
+        'farm_id': farm_id,
+        'readings_version': 0,
+        'alerts_version': 0,
+        'metadata_version': 0,
+        column: 1,
+        'updated_at': now
+    } for farm_id in farm_ids]).on_conflict_do_update(
+        index_elements=['farm_id'],
+        set_={column: table.c[column] + 1, 'updated_at': now}
+    )
+    connection.execute(statement)
+
+
+def farm_versions(farm_ids):
+    """Return a dict of farm id to its :class:`FarmVersion`, or None if never bumped."""
+    rows = db.session.execute(select(FarmVersion).where(FarmVersion.farm_id.in_(farm_ids))).scalars()
+    versions = dict.fromkeys(farm_ids)
+    versions.update((version.farm_id, version) for version in rows)
+    return versions
+
+
+def version_tag(prefix, parts):
+    """Build an ETag value from a prefix and the stamps it depends on."""
+    digest = hashlib.sha1(repr(list(parts)).encode()).hexdigest()[:20]
+    return f'{prefix}-{digest}'
+
+
+def stamps(version, *kinds):
+    """Counters of a farm version for ``kinds``; zeros if it was never bumped."""
+    return tuple(getattr(version, VERSION_COLUMNS[kind]) if version else 0 for kind in kinds)
+
+
+def last_modified_of(versions):
+    """Latest ``updated_at`` among versions, or None."""
+    times = [version.updated_at for version in versions if version is not None]
+    return max(times) if times else None
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the request's validators are current, else None.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``, as
+    required by RFC 9110.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    response = Response(status=304)
+    return with_validators(response, etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Set a weak ETag and Last-Modified on a response and return it."""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # Revalidate on every poll instead of reusing a response blindly
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _changed_farm_ids(obj, attribute):
+    """Current and previous value of an object's farm id attribute."""
+    history = inspect(obj).attrs[attribute].history
+    return {getattr(obj, attribute), *history.deleted}
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed(session, flush_context):
+    changed = {'alerts': set(), 'metadata': set()}
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in [*session.new, *dirty, *session.deleted]:
+        if isinstance(obj, Alert):
+            changed['alerts'] |= _changed_farm_ids(obj, 'farm_id')
+        elif isinstance(obj, Sensor):
+            changed['metadata'] |= _changed_farm_ids(obj, 'farm_id')
+        elif isinstance(obj, Farm):
+            changed['metadata'].add(obj.id)
+
+    # A farm deleted in this flush can no longer be referenced
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, Farm)}
+    for kind, farm_ids in changed.items():
+        if farm_ids - deleted:
+            bump_versions(farm_ids - deleted, kind, connection=session.connection())
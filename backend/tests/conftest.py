@@ -0,0 +1,84 @@
+"""Shared fixtures for HydroAI backend tests."""
+
+from datetime import timedelta
+import os
+import sys
+
+import pytest
+
+# Allow running ``python -m pytest`` from the backend directory or the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.ProductionConfig refuses to import without a database URL
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import db, User, Farm, Sensor  # noqa: E402
+
+SENSOR_TYPES = [
+    {'type': 'temperature', 'unit': '°C', 'min_threshold': 18.0, 'max_threshold': 28.0},
+    {'type': 'humidity', 'unit': '%', 'min_threshold': 50.0, 'max_threshold': 80.0},
+    {'type': 'ph', 'unit': 'pH', 'min_threshold': 5.5, 'max_threshold': 7.0},
+    {'type': 'nutrients', 'unit': 'ppm', 'min_threshold': 800.0, 'max_threshold': 1200.0},
+]
+
+
+@pytest.fixture
+def app():
+    """Application on a fresh in-memory database, with its context pushed."""
+    app = create_app('testing')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(email='grower@hydroai.com', name='Test Grower')
+    user.set_password('test-password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+
+def add_farm(user, name='Test Farm', sensors=4):
+    """Create a farm of ``user`` with ``sensors`` sensors cycling through SENSOR_TYPES."""
+    farm = Farm(name=name, user_id=user.id)
+    db.session.add(farm)
+    db.session.commit()
+    for i in range(sensors):
+        spec = SENSOR_TYPES[i % len(SENSOR_TYPES)]
+        db.session.add(Sensor(
+            name=f"{spec['type'].title()} Sensor {i + 1}",
+            sensor_type=spec['type'],
+            unit=spec['unit'],
+            min_threshold=spec['min_threshold'],
+            max_threshold=spec['max_threshold'],
+            farm_id=farm.id
+        ))
+    db.session.commit()
+    return farm
+
+
+@pytest.fixture
+def farm(user):
+    return add_farm(user)
+
+
+@pytest.fixture
+def sensors(farm):
+    return Sensor.query.filter_by(farm_id=farm.id).order_by(Sensor.id).all()
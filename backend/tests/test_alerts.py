@@ -0,0 +1,24 @@
+"""Tests of threshold alerts raised on ingestion."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Alert
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_backfilled_breaches_raise_alerts(client, auth_headers, sensors, batch):
+    reading = {
+        'sensor_id': sensors[0].id,
+        'value': 40.0,
+        'timestamp': (datetime.utcnow() - timedelta(hours=6)).isoformat()
+    }
+    if batch:
+        response = client.post('/api/v1/readings/batch', headers=auth_headers, json={'readings': [reading]})
+    else:
+        response = client.post('/api/v1/readings', headers=auth_headers, json=reading)
+
+    assert response.status_code in (200, 201)
+    alerts = Alert.query.all()
+    assert [(alert.sensor_id, alert.severity) for alert in alerts] == [(sensors[0].id, 'high')]
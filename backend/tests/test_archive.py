@@ -0,0 +1,51 @@
+"""Tests of late readings for days sealed into the archive."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert
+
+from models import db, ReadingRollup, SensorReading
+from services.archive import day_start, reading_archive
+
+
+@pytest.fixture
+def sealed(farm, sensors, monkeypatch):
+    """Readings of three days ago, sealed into archive blocks."""
+    monkeypatch.setattr(reading_archive, 'after_days', 1)
+    day = day_start(datetime.utcnow()) - timedelta(days=3)
+    timestamps = [day + timedelta(hours=1, minutes=i) for i in range(5)]
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensors[0].id, 'farm_id': farm.id, 'value': 6.0, 'timestamp': timestamp
+    } for timestamp in timestamps])
+    db.session.commit()
+    reading_archive.seal()
+    assert SensorReading.query.count() == 0
+    return timestamps
+
+
+def rollup_count():
+    return db.session.query(func.coalesce(func.sum(ReadingRollup.reading_count), 0)).filter_by(
+        resolution='1m'
+    ).scalar()
+
+
+def test_late_batch_duplicates_of_archived_readings_are_skipped(client, auth_headers, sensors, sealed):
+    response = client.post('/api/v1/readings/batch', headers=auth_headers, json={'readings': [
+        {'sensor_id': sensors[0].id, 'value': 6.0, 'timestamp': timestamp.isoformat()}
+        for timestamp in sealed + [sealed[0] - timedelta(minutes=1)]
+    ]})
+
+    assert response.get_json()['duplicates'] == len(sealed)
+    assert SensorReading.query.count() == 1
+    assert rollup_count() == 1
+
+
+def test_late_single_duplicate_of_an_archived_reading_is_skipped(client, auth_headers, sensors, sealed):
+    response = client.post('/api/v1/readings', headers=auth_headers, json={
+        'sensor_id': sensors[0].id, 'value': 6.0, 'timestamp': sealed[0].isoformat()
+    })
+
+    assert response.get_json()['duplicate'] is True
+    assert SensorReading.query.count() == 0
+    assert rollup_count() == 0
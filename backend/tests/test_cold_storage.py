@@ -0,0 +1,65 @@
+"""Tests of exporting readings to cold storage."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert
+
+from models import db, ReadingRollup, SensorReading
+from services.cold_storage import cold_readings
+from services.downsampling import raw_series
+from services.partitions import add_months, month_start
+
+
+@pytest.fixture
+def old_readings(farm, sensors, tmp_path, monkeypatch):
+    """Readings two months back, with cold export enabled for them."""
+    monkeypatch.setattr(cold_readings, 'root', str(tmp_path))
+    monkeypatch.setattr(cold_readings, 'after_months', 1)
+    start = add_months(month_start(datetime.utcnow()), -2)
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensor.id, 'farm_id': farm.id, 'value': 6.0, 'timestamp': start + timedelta(hours=i)
+    } for sensor in sensors for i in range(24)])
+    db.session.commit()
+    return start
+
+
+def read_all(farm, sensors, since):
+    _, series = raw_series(farm.id, since, [sensor.id for sensor in sensors])
+    return sum(len(values) for _, values in series.values())
+
+
+def test_export_moves_readings_without_duplicating_them(farm, sensors, old_readings):
+    result = cold_readings.export()
+
+    assert result['readings'] == 24 * len(sensors)
+    assert SensorReading.query.count() == 0
+    assert read_all(farm, sensors, old_readings) == 24 * len(sensors)
+
+
+def test_failed_commit_keeps_readings_in_the_database_only(farm, sensors, old_readings, monkeypatch):
+    def fail():
+        raise RuntimeError('commit failed')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, 'commit', fail)
+        with pytest.raises(RuntimeError):
+            cold_readings.export()
+
+    assert SensorReading.query.count() == 24 * len(sensors)
+    assert cold_readings.months(farm.id) == []
+    assert read_all(farm, sensors, old_readings) == 24 * len(sensors)
+
+
+def test_late_duplicates_of_exported_readings_are_skipped(client, auth_headers, farm, sensors, old_readings):
+    cold_readings.export()
+
+    response = client.post('/api/v1/readings/batch', headers=auth_headers, json={'readings': [
+        {'sensor_id': sensors[0].id, 'value': 6.0, 'timestamp': (old_readings + timedelta(hours=i)).isoformat()}
+        for i in range(25)
+    ]})
+
+    assert response.get_json()['duplicates'] == 24
+    assert SensorReading.query.count() == 1
+    assert db.session.query(func.sum(ReadingRollup.reading_count)).filter_by(resolution='1m').scalar() == 1
+    assert read_all(farm, sensors, old_readings) == 24 * len(sensors) + 1
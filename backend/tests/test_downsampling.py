@@ -0,0 +1,79 @@
+"""Tests of the server-side downsampling helpers."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from models import db, SensorReading
+from services.downsampling import lttb_indices, raw_series
+from services.hot_window import hot_window
+
+
+def reference_lttb(x, y, points):
+    """Textbook LTTB, one bucket at a time."""
+    count = len(x)
+    every = (count - 2) / (points - 2)
+    edges = [int(i * every) + 1 for i in range(points - 2)] + [count - 1]
+    selected = [0]
+    for i in range(points - 2):
+        lower, upper = edges[i], edges[i + 1]
+        if i == points - 3:
+            following = (x[-1], y[-1])
+        else:
+            following = (np.mean(x[upper:edges[i + 2]]), np.mean(y[upper:edges[i + 2]]))
+        ax, ay = x[selected[-1]], y[selected[-1]]
+        areas = [abs((ax - following[0]) * (y[j] - ay) - (ax - x[j]) * (following[1] - ay))
+                 for j in range(lower, upper)]
+        selected.append(lower + int(np.argmax(areas)))
+    return selected + [count - 1]
+
+
+@pytest.mark.parametrize('count, points', [(100, 10), (1000, 37), (50, 49)])
+def test_lttb_matches_reference(count, points):
+    rng = np.random.default_rng(count)
+    timestamps = np.cumsum(rng.integers(1, 10, count)) * 1000000
+    values = rng.normal(size=count)
+    # A spike on the last reading must not leak into the mean of the last bucket
+    values[-1] = 1000.0
+
+    got = lttb_indices(timestamps, values, points).tolist()
+
+    assert got == reference_lttb((timestamps - timestamps[0]) / 1e6, values, points)
+
+
+@pytest.mark.parametrize('hot', [True, False])
+def test_raw_series_leaves_out_sensors_without_readings(farm, sensors, monkeypatch, hot):
+    now = datetime.utcnow()
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensors[0].id, 'farm_id': farm.id, 'value': 6.0, 'timestamp': now - timedelta(minutes=i + 1)
+    } for i in range(5)])
+    db.session.commit()
+    monkeypatch.setattr(hot_window, 'enabled', hot)
+    hot_window.warm()
+
+    source, series = raw_series(farm.id, now - timedelta(hours=1), [sensor.id for sensor in sensors])
+
+    assert source == ('hot_window' if hot else 'readings')
+    assert list(series) == [sensors[0].id]
+    assert len(series[sensors[0].id][0]) == 5
+
+
+@pytest.mark.parametrize('query', ['points=10&method=lttb', 'points=10&method=avg'])
+def test_downsampling_refuses_raw_ranges_over_the_point_limit(client, auth_headers, farm, sensors,
+                                                              monkeypatch, query):
+    now = datetime.utcnow()
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensor.id, 'farm_id': farm.id, 'value': 6.0, 'timestamp': now - timedelta(minutes=i + 1)
+    } for sensor in sensors for i in range(10)])
+    db.session.commit()
+    path = f'/api/v1/farms/{farm.id}/readings?hours=2&{query}'
+    monkeypatch.setattr('services.downsampling.MAX_RAW_POINTS', 10 * len(sensors))
+    assert client.get(path, headers=auth_headers).status_code == 200
+
+    monkeypatch.setattr('services.downsampling.MAX_RAW_POINTS', 10 * len(sensors) - 1)
+    response = client.get(path, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert 'raw readings' in response.get_json()['error']
@@ -0,0 +1,43 @@
+"""Tests of the write-behind group-commit buffer."""
+
+import time
+
+from services.ingest_buffer import ReadingBuffer
+
+
+class FakeApp:
+    def __init__(self, **config):
+        self.config = config
+        self.extensions = {}
+
+
+def queued_buffer(monkeypatch, **config):
+    """A buffer whose groups are taken by the test instead of a flusher thread."""
+    buffer = ReadingBuffer()
+    buffer.init_app(FakeApp(**config))
+    monkeypatch.setattr(buffer, '_ensure_started', lambda: None)
+    return buffer
+
+
+def test_leftover_rows_keep_their_enqueue_time(monkeypatch):
+    buffer = queued_buffer(monkeypatch, INGEST_BUFFER_BATCH_SIZE=2, INGEST_BUFFER_FLUSH_MS=50)
+    for i in range(3):
+        buffer.submit([{'sensor_id': i}], {})
+    time.sleep(0.06)
+
+    assert len(buffer._next_group()) == 2
+    # The third row is already past its deadline, so it is not held for another flush_ms
+    start = time.monotonic()
+    assert len(buffer._next_group()) == 1
+    assert time.monotonic() - start < 0.03
+
+
+def test_exit_hook_is_registered_once(monkeypatch):
+    hooks = []
+    monkeypatch.setattr('atexit.register', hooks.append)
+    buffer = ReadingBuffer()
+
+    for _ in range(3):
+        buffer.init_app(FakeApp(INGEST_BUFFER_ENABLED=True))
+
+    assert hooks == [buffer.shutdown]
@@ -0,0 +1,172 @@
+"""End-to-end tests of the TCP/UDP ingest gateway with an in-process client."""
+
+import asyncio
+import time
+
+import pytest
+
+from ingest_gateway import MAX_LINE_LENGTH, IngestGateway
+from models import db, Device, SensorReading
+from services.ingest_codecs import encode_binary_frame
+
+DEVICE_KEY = 'test-device-key'
+
+
+@pytest.fixture
+def device(farm):
+    device = Device(name='Test gateway', farm_id=farm.id)
+    device.set_key(DEVICE_KEY)
+    db.session.add(device)
+    db.session.commit()
+    return device
+
+
+def run_gateway(app, send, expected, timeout=10):
+    """Start a gateway, run ``send(gateway)`` and stop once ``expected`` readings were parsed.
+
+    Stopping flushes everything still queued, so all readings have been
+    written when this returns.
+    """
+    async def main():
+        gateway = IngestGateway(app)
+        await gateway.start('127.0.0.1', 0, 0)
+        try:
+            await send(gateway)
+            deadline = time.monotonic() + timeout
+            while gateway.stats.readings < expected and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            await gateway.stop()
+        return gateway.stats
+
+    return asyncio.run(main())
+
+
+async def send_tcp(gateway, device, fmt, payload):
+    port = gateway.tcp_server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'AUTH {device.id} {DEVICE_KEY} {fmt}\n'.encode())
+    assert await reader.readline() == b'OK\n'
+    writer.write(payload)
+    await writer.drain()
+    writer.close()
+
+
+def stored_count():
+    db.session.expire_all()
+    return SensorReading.query.count()
+
+
+def test_tcp_line_protocol_without_timestamps_stores_every_reading(app, device, sensors):
+    # Many readings per sensor in one chunk, all stamped by the server
+    lines = ''.join(f'{sensors[i % len(sensors)].id} 6.2\n' for i in range(400))
+
+    stats = run_gateway(app, lambda gateway: send_tcp(gateway, device, 'line', lines.encode()), 400)
+
+    assert stored_count() == 400
+    assert stats.written == 400
+    assert stats.duplicates == 0
+
+
+def test_tcp_line_protocol_with_timestamps(app, device, sensors):
+    now = int(time.time())
+    lines = ''.join(f'{sensors[i % len(sensors)].id} 6.2 {now - i}\n' for i in range(200))
+
+    run_gateway(app, lambda gateway: send_tcp(gateway, device, 'line', lines.encode()), 200)
+
+    assert stored_count() == 200
+
+
+def test_tcp_binary_frames_store_every_reading(app, device, sensors):
+    count = 300
+    sensor_ids = [sensors[i % len(sensors)].id for i in range(count)]
+    # Every other record has no timestamp (0) and is stamped by the server
+    timestamps = [0 if i % 2 else time.time() - i for i in range(count)]
+    frame = encode_binary_frame(sensor_ids, timestamps, [6.2] * count)
+
+    stats = run_gateway(app, lambda gateway: send_tcp(gateway, device, 'bin', frame), count)
+
+    assert stored_count() == count
+    assert stats.written == count
+
+
+def test_udp_datagrams_without_timestamps_store_every_reading(app, device, sensors):
+    async def send(gateway):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=gateway.udp_transport.get_extra_info('sockname')
+        )
+        for _ in range(25):
+            body = ''.join(f'{sensor.id} 6.2\n' for sensor in sensors for _ in range(4))
+            transport.sendto(f'{device.id} {DEVICE_KEY}\n{body}'.encode())
+            await asyncio.sleep(0)
+        transport.close()
+
+    stats = run_gateway(app, send, 25 * 4 * len(sensors))
+
+    assert stats.dropped == 0
+    assert stored_count() == 25 * 4 * len(sensors)
+
+
+def test_resent_readings_are_counted_as_duplicates(app, device, sensors):
+    now = int(time.time())
+    lines = ''.join(f'{sensors[i % len(sensors)].id} 6.2 {now - i}\n' for i in range(100)).encode()
+
+    async def send_twice(gateway):
+        await send_tcp(gateway, device, 'line', lines)
+        await send_tcp(gateway, device, 'line', lines)
+
+    stats = run_gateway(app, send_twice, 200)
+
+    assert stored_count() == 100
+    assert stats.written == 100
+    assert stats.duplicates == 100
+
+
+async def open_tcp(gateway, device, fmt):
+    port = gateway.tcp_server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'AUTH {device.id} {DEVICE_KEY} {fmt}\n'.encode())
+    assert await reader.readline() == b'OK\n'
+    return reader, writer
+
+
+async def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return condition()
+
+
+def test_complete_lines_are_parsed_while_a_line_is_still_arriving(app, device, sensors):
+    sensor_id = sensors[0].id
+
+    async def send(gateway):
+        reader, writer = await open_tcp(gateway, device, 'line')
+        # Two complete lines and the start of a third that arrives later
+        writer.write(f'{sensor_id} 6.1\n{sensor_id} 6.2\n{sensor_id} 6.'.encode())
+        await writer.drain()
+        assert await wait_for(lambda: gateway.stats.readings == 2)
+        writer.write(b'3\n')
+        await writer.drain()
+        writer.close()
+
+    stats = run_gateway(app, send, 3)
+
+    assert stats.readings == 3
+    assert stored_count() == 3
+
+
+def test_connection_is_dropped_when_a_line_exceeds_the_maximum_length(app, device, sensors):
+    async def send(gateway):
+        reader, writer = await open_tcp(gateway, device, 'line')
+        writer.write(f'{sensors[0].id} 6.1\n'.encode() + b'9' * (MAX_LINE_LENGTH + 1))
+        await writer.drain()
+        # The gateway closes the connection instead of buffering the line
+        assert await asyncio.wait_for(reader.read(), timeout=5) == b''
+        writer.close()
+
+    stats = run_gateway(app, send, 1)
+
+    assert stats.malformed == 1
+    assert stored_count() == 1
@@ -0,0 +1,49 @@
+"""Tests of SQLite reading partitions."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from models import db, ReadingRollup, SensorReading
+from services.partitions import month_start, partition_manager, readings_source
+
+
+@pytest.fixture
+def moved(farm, sensors):
+    """Readings of the previous month, moved to its period table by maintenance."""
+    timestamps = [month_start(datetime.utcnow()) - timedelta(days=3, minutes=i) for i in range(5)]
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensors[0].id, 'farm_id': farm.id, 'value': 6.0, 'timestamp': timestamp
+    } for timestamp in timestamps])
+    db.session.commit()
+    partition_manager.maintain()
+    assert SensorReading.query.count() == 0
+    return timestamps
+
+
+def stored_readings(since):
+    Reading = readings_source(since)
+    return db.session.execute(select(func.count()).select_from(Reading)).scalar()
+
+
+def test_late_batch_duplicates_of_a_moved_month_are_skipped(client, auth_headers, sensors, moved):
+    response = client.post('/api/v1/readings/batch', headers=auth_headers, json={'readings': [
+        {'sensor_id': sensors[0].id, 'value': 6.0, 'timestamp': timestamp.isoformat()}
+        for timestamp in moved + [moved[0] - timedelta(hours=1)]
+    ]})
+
+    assert response.get_json()['duplicates'] == len(moved)
+    assert stored_readings(moved[-1] - timedelta(days=1)) == len(moved) + 1
+    # Only the new reading is folded into the rollups
+    assert db.session.query(func.sum(ReadingRollup.reading_count)).filter_by(resolution='1m').scalar() == 1
+
+
+def test_late_single_duplicate_of_a_moved_month_is_skipped(client, auth_headers, sensors, moved):
+    response = client.post('/api/v1/readings', headers=auth_headers, json={
+        'sensor_id': sensors[0].id, 'value': 6.0, 'timestamp': moved[0].isoformat()
+    })
+
+    assert response.get_json()['duplicate'] is True
+    assert stored_readings(moved[-1] - timedelta(days=1)) == len(moved)
+    assert ReadingRollup.query.count() == 0
@@ -0,0 +1,121 @@
+"""Per-request SQL statement counts of the list endpoints.
+
+Each request is run with an empty session and its statements counted
+with a ``before_cursor_execute`` listener, first against a small farm and
+then after adding farms, sensors, readings, alerts, recommendations and
+devices. The count must match the expected constant at both sizes; a
+count that grows with the data means serialization fell back to per-row
+lazy loads.
+"""
+
+from datetime import datetime, timedelta
+import random
+
+import pytest
+from sqlalchemy import event, insert
+
+from conftest import SENSOR_TYPES
+from models import db, Alert, Device, Farm, Recommendation, Sensor, SensorReading
+from services.hot_window import hot_window
+from services.sensor_latest import rebuild_sensor_latest
+
+# name -> (path template, statements per request)
+ENDPOINTS = {
+    'farms': ('/api/v1/farms', 2),
+    'farm': ('/api/v1/farms/{farm_id}', 2),
+    'readings': ('/api/v1/farms/{farm_id}/readings?limit=1000', 5),
+    'readings by type': ('/api/v1/farms/{farm_id}/readings?limit=1000&sensor_type=ph', 5),
+    'readings summary': ('/api/v1/farms/{farm_id}/readings/summary', 5),
+    'alerts': ('/api/v1/farms/{farm_id}/alerts?limit=100', 2),
+    'recommendations': ('/api/v1/farms/{farm_id}/recommendations?limit=100', 2),
+    'devices': ('/api/v1/farms/{farm_id}/devices', 2),
+    'dashboard': ('/api/v1/dashboard', 7),
+}
+
+
+def count_statements(client, headers, path):
+    """Return the number of statements one GET of ``path`` executes."""
+    # Start from an empty identity map so lazy loads are not hidden
+    db.session.remove()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} returned {response.status_code}')
+    return len(statements)
+
+
+def grow(user_id, farm_id, sensor_ids):
+    """Add enough rows that a per-row query would change the counts."""
+    for i in range(20):
+        farm = Farm(name=f'Extra Farm {i + 1}', user_id=user_id)
+        db.session.add(farm)
+        db.session.flush()
+        for spec in SENSOR_TYPES:
+            db.session.add(Sensor(name=f"{spec['type']} {i + 1}", sensor_type=spec['type'],
+                                  unit=spec['unit'], farm_id=farm.id))
+    for i, spec in enumerate(SENSOR_TYPES * 5):
+        sensor = Sensor(name=f"Extra {spec['type']} {i + 1}", sensor_type=spec['type'],
+                        unit=spec['unit'], farm_id=farm_id)
+        db.session.add(sensor)
+        db.session.flush()
+        sensor_ids.append(sensor.id)
+
+    now = datetime.utcnow()
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensor_ids[i % len(sensor_ids)],
+        'farm_id': farm_id,
+        'value': round(random.uniform(5, 30), 2),
+        'timestamp': now - timedelta(seconds=i * 10)
+    } for i in range(2000)])
+    for i in range(100):
+        db.session.add(Alert(title='Alert', message='Value out of range', alert_type='threshold',
+                             farm_id=farm_id, sensor_id=sensor_ids[i % len(sensor_ids)]))
+        db.session.add(Recommendation(title='Recommendation', description='Adjust', farm_id=farm_id,
+                                      priority='medium', confidence_score=0.8))
+    for i in range(10):
+        device = Device(name=f'Gateway {i + 1}', farm_id=farm_id)
+        device.set_key(f'key-{i}')
+        db.session.add(device)
+    db.session.commit()
+    rebuild_sensor_latest()
+
+
+
+@pytest.fixture
+def baseline(farm, sensors, monkeypatch):
+    """A farm whose sensors each reported once, plus one idle sensor."""
+    # The hot window would answer the readings endpoint without SQL
+    monkeypatch.setattr(hot_window, 'enabled', False)
+    now = datetime.utcnow()
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensor.id, 'farm_id': farm.id, 'value': 20.0, 'timestamp': now - timedelta(minutes=1)
+    } for sensor in sensors])
+    # A sensor that never reported takes the summary fallback from the start,
+    # as the sensors of the farms added by grow() do
+    spec = SENSOR_TYPES[0]
+    db.session.add(Sensor(name='Idle sensor', sensor_type=spec['type'], unit=spec['unit'], farm_id=farm.id))
+    db.session.commit()
+    rebuild_sensor_latest()
+    return farm
+
+
+@pytest.mark.parametrize('name', ENDPOINTS)
+def test_statement_count_is_constant(client, auth_headers, user, sensors, baseline, name):
+    template, expected = ENDPOINTS[name]
+    # Counting empties the session, so keep plain ids
+    user_id, farm_id, sensor_ids = user.id, baseline.id, [sensor.id for sensor in sensors]
+    path = template.format(farm_id=farm_id)
+
+    small = count_statements(client, auth_headers, path)
+    grow(user_id, farm_id, sensor_ids)
+    large = count_statements(client, auth_headers, path)
+
+    assert (small, large) == (expected, expected)
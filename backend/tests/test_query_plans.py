@@ -0,0 +1,150 @@
+"""EXPLAIN QUERY PLAN checks that hot time-series queries use indexes on SQLite.
+
+Each query behind the readings, summary, recommendation, export and alert
+endpoints must search an index; a full scan of sensor_readings, alerts or
+recommendations fails the test.
+"""
+
+from datetime import datetime, timedelta
+import re
+
+import pytest
+from sqlalchemy import desc
+
+from ml_models.nutrient_predictor import RECENT_READINGS
+from models import db, Alert, Recommendation, Sensor, SensorLatest, SensorReading
+from services.aggregation import bucket_expression
+from services.pagination import keyset_after
+from services.sensor_latest import latest_readings
+
+# Tables that grow with time; a full scan of these is a regression
+TIME_SERIES_TABLES = ('sensor_readings', 'alerts', 'recommendations')
+FULL_SCAN = re.compile(r'^SCAN (%s)\b' % '|'.join(TIME_SERIES_TABLES))
+
+HOT_QUERIES = (
+    'readings by farm',
+    'readings page after cursor',
+    'readings by farm and sensor type',
+    'readings summary',
+    'readings aggregate',
+    'recent sensor data',
+    'readings csv export',
+    'alerts by farm',
+    'alerts page after cursor',
+    'recommendations page after cursor',
+    'unresolved alert count',
+    'alert summary counts',
+    'open threshold alerts',
+)
+
+
+def hot_queries(farm_id, sensor_id):
+    """Return a dict of name to select statement, mirroring the endpoint queries."""
+    since = datetime.utcnow() - timedelta(hours=24)
+
+    return dict([
+        ('readings by farm', db.select(SensorReading).filter(
+            SensorReading.farm_id == farm_id,
+            SensorReading.timestamp >= since
+        ).order_by(desc(SensorReading.timestamp), desc(SensorReading.sensor_id)).limit(100)),
+
+        ('readings page after cursor', db.select(SensorReading).filter(
+            SensorReading.farm_id == farm_id,
+            SensorReading.timestamp >= since,
+            keyset_after((SensorReading.timestamp, SensorReading.sensor_id), (since, sensor_id))
+        ).order_by(desc(SensorReading.timestamp), desc(SensorReading.sensor_id)).limit(100)),
+
+        ('readings by farm and sensor type', db.select(SensorReading).join(Sensor).filter(
+            SensorReading.farm_id == farm_id,
+            SensorReading.timestamp >= since,
+            Sensor.sensor_type == 'ph'
+        ).order_by(desc(SensorReading.timestamp)).limit(100)),
+
+        ('readings summary', db.select(Sensor, SensorLatest).outerjoin(
+            SensorLatest, SensorLatest.sensor_id == Sensor.id
+        ).filter(
+            Sensor.farm_id == farm_id,
+            Sensor.is_active == True
+        )),
+
+        ('readings aggregate', db.select(
+            SensorReading.sensor_id, bucket_expression(SensorReading.timestamp, 900, 'sqlite').label('bucket'),
+            db.func.count(SensorReading.value), db.func.min(SensorReading.value), db.func.max(SensorReading.value)
+        ).filter(
+            SensorReading.farm_id == farm_id,
+            SensorReading.timestamp >= since,
+            SensorReading.timestamp < datetime.utcnow(),
+            SensorReading.sensor_id.in_([sensor_id])
+        ).group_by(SensorReading.sensor_id, 'bucket')),
+
+        ('recent sensor data', latest_readings(RECENT_READINGS, since=since, sensor_ids=[sensor_id])),
+
+        ('readings csv export', db.select(SensorReading, Sensor).join(
+            Sensor, Sensor.id == SensorReading.sensor_id
+        ).filter(
+            SensorReading.farm_id == farm_id,
+            SensorReading.timestamp >= since
+        ).order_by(SensorReading.timestamp.asc())),
+
+        ('alerts by farm', db.select(Alert).filter(
+            Alert.farm_id == farm_id,
+            Alert.created_at >= since
+        ).order_by(desc(Alert.created_at), desc(Alert.id)).limit(50)),
+
+        ('alerts page after cursor', db.select(Alert).filter(
+            Alert.farm_id == farm_id,
+            Alert.created_at >= since,
+            keyset_after((Alert.created_at, Alert.id), (since, 1))
+        ).order_by(desc(Alert.created_at), desc(Alert.id)).limit(50)),
+
+        ('recommendations page after cursor', db.select(Recommendation).filter(
+            Recommendation.farm_id == farm_id,
+            keyset_after(
+                (Recommendation.priority, Recommendation.created_at, Recommendation.id), ('medium', since, 1)
+            )
+        ).order_by(
+            Recommendation.priority.desc(), Recommendation.created_at.desc(), Recommendation.id.desc()
+        ).limit(20)),
+
+        ('unresolved alert count', db.select(db.func.count(Alert.id)).filter(
+            Alert.farm_id == farm_id,
+            Alert.is_resolved == False
+        )),
+
+        ('alert summary counts', db.select(
+            Alert.farm_id, db.func.count(),
+            db.func.count().filter(Alert.is_read == False),
+            db.func.count().filter(Alert.is_resolved == False),
+            db.func.count().filter(Alert.created_at >= since)
+        ).filter(Alert.farm_id.in_([farm_id])).group_by(Alert.farm_id)),
+
+        ('open threshold alerts', db.select(Alert.farm_id, Alert.sensor_id).filter(
+            Alert.farm_id.in_([farm_id]),
+            Alert.sensor_id.in_([sensor_id]),
+            Alert.alert_type == 'threshold',
+            Alert.is_resolved == False,
+            Alert.created_at > since
+        )),
+    ])
+
+
+def explain(statement):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    compiled = statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    return [row[-1] for row in rows]
+
+
+def test_every_hot_query_is_checked(farm, sensors):
+    assert tuple(hot_queries(farm.id, sensors[0].id)) == HOT_QUERIES
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_an_index(farm, sensors, name):
+    plan = explain(hot_queries(farm.id, sensors[0].id)[name])
+    scans = [line for line in plan if FULL_SCAN.match(line)]
+    assert not scans, f'{name} fell back to a full scan:\n' + '\n'.join(plan)
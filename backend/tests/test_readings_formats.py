@@ -0,0 +1,47 @@
+"""Tests of the unpaged ``columnar`` and ``binary`` readings formats."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models import db, SensorReading
+from services.hot_window import hot_window
+from services.ingest_codecs import READ_RECORD_DTYPE, decode_binary_frame
+
+VALUE = 6.123456789
+
+
+@pytest.fixture
+def readings(farm, sensors, monkeypatch):
+    """Ten readings per sensor over the last hour, read from the database."""
+    monkeypatch.setattr(hot_window, 'enabled', False)
+    now = datetime.utcnow()
+    db.session.execute(insert(SensorReading), [{
+        'sensor_id': sensor.id, 'farm_id': farm.id, 'value': VALUE, 'timestamp': now - timedelta(minutes=i + 1)
+    } for sensor in sensors for i in range(10)])
+    db.session.commit()
+    return 10 * len(sensors)
+
+
+def test_binary_format_returns_values_at_full_precision(client, auth_headers, farm, readings):
+    response = client.get(f'/api/v1/farms/{farm.id}/readings?hours=2&format=binary', headers=auth_headers)
+
+    assert response.status_code == 200
+    frame = decode_binary_frame(response.data, READ_RECORD_DTYPE)
+    assert len(frame.values) == readings
+    assert frame.values.tolist() == [VALUE] * readings
+
+
+@pytest.mark.parametrize('response_format', ['columnar', 'binary'])
+def test_unpaged_formats_refuse_ranges_over_the_point_limit(client, auth_headers, farm, readings,
+                                                            monkeypatch, response_format):
+    path = f'/api/v1/farms/{farm.id}/readings?hours=2&format={response_format}'
+    monkeypatch.setattr('routes.readings.MAX_RAW_POINTS', readings)
+    assert client.get(path, headers=auth_headers).status_code == 200
+
+    monkeypatch.setattr('routes.readings.MAX_RAW_POINTS', readings - 1)
+    response = client.get(path, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert 'points' in response.get_json()['error']
@@ -0,0 +1,19 @@
+"""Tests of readings served from the rollups."""
+
+import pytest
+
+
+@pytest.mark.parametrize('resolution, hours, status', [
+    ('1m', 8760, 400),
+    ('1m', 166, 200),
+    ('1h', 8760, 200),
+    ('auto', 8760, 200),
+])
+def test_rollup_readings_cap_the_bucket_count(client, auth_headers, farm, sensors, resolution, hours, status):
+    response = client.get(
+        f'/api/v1/farms/{farm.id}/readings?resolution={resolution}&hours={hours}', headers=auth_headers
+    )
+
+    assert response.status_code == status
+    if status == 400:
+        assert 'coarser resolution' in response.get_json()['error']
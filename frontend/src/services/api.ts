@@ -99,6 +99,7 @@ export const api = {
 
   // Dashboard
   dashboard: {
+    get: () => apiClient.get('/dashboard'),
     getStats: () => apiClient.get('/dashboard/stats'),
     getOverview: (farmId?: number) => 
       apiClient.get('/dashboard/overview', { params: { farmId } }),